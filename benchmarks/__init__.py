@@ -0,0 +1,4 @@
+import os
+
+# Settings are read on import, so defaults have to be in place before http_quest
+os.environ.setdefault("BUGSNAG_API_KEY", "secret")
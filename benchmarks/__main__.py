@@ -0,0 +1,154 @@
+"""
+Compare tracked benchmarks of the working tree with a base revision.
+
+    python -m benchmarks                # fail if anything is slower than in HEAD
+    python -m benchmarks --base main    # compare with another revision
+    python -m benchmarks level:plain    # run only given benchmarks
+
+Times measured on one machine can't be compared with another, not even relative
+to a calibration loop, which doesn't scale like the measured code. So nothing
+is stored: the base revision is checked out to a temporary git worktree, and
+both trees are measured on the same machine in the same run. Each tree is
+measured in a subprocess with a fixed hash seed. Every benchmark is timed
+relative to a calibration loop, which runs in turns with it. A benchmark that
+looks slower is measured several more times in both trees, taking turns, and
+the medians are compared.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+ROOT = Path(__file__).parent.parent
+HARNESS_PATH = Path(__file__).parent / "harness.py"
+# Runs of a suspected regression in each tree
+RUNS = 3
+
+Results = Dict[str, Dict[str, float]]
+
+
+def measure(tree: Path, names: List[str]) -> Results:
+    output = subprocess.run(
+        [sys.executable, str(HARNESS_PATH), str(tree), *names],
+        check=True,
+        cwd=ROOT,
+        env={**os.environ, "PYTHONHASHSEED": "0"},
+        stdout=subprocess.PIPE,
+    ).stdout
+    results: Results = json.loads(output)
+
+    return results
+
+
+def measure_median(trees: List[Path], names: List[str], runs: int) -> List[Results]:
+    """Measure trees in turns and return median results of each tree."""
+
+    runs_of_trees: List[List[Results]] = [[] for _ in trees]
+
+    for _ in range(runs):
+        for tree, tree_runs in zip(trees, runs_of_trees):
+            tree_runs.append(measure(tree, names))
+
+    return [
+        {
+            name: {
+                key: statistics.median(result[name][key] for result in tree_runs)
+                for key in ("time", "relative")
+            }
+            for name in tree_runs[0]
+        }
+        for tree_runs in runs_of_trees
+    ]
+
+
+@contextmanager
+def checkout(revision: str) -> Iterator[Path]:
+    """Check out revision to a temporary worktree, which is removed afterwards."""
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "base"
+        subprocess.run(
+            ["git", "worktree", "add", "--detach", "--quiet", str(path), revision],
+            check=True,
+            cwd=ROOT,
+        )
+
+        try:
+            yield path
+        finally:
+            subprocess.run(
+                ["git", "worktree", "remove", "--force", str(path)],
+                check=True,
+                cwd=ROOT,
+            )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=float(os.environ.get("BENCH_THRESHOLD", "0.3")),
+        help="allowed slowdown compared with base revision, 0.3 means 30%%",
+    )
+    parser.add_argument(
+        "--base",
+        default=os.environ.get("BENCH_BASE", "HEAD"),
+        help="git revision to compare with",
+    )
+    parser.add_argument("names", nargs="*", help="run only given benchmarks")
+    args = parser.parse_args()
+
+    with checkout(args.base) as base_tree:
+        trees = [base_tree, ROOT]
+        base, current = [measure(tree, args.names) for tree in trees]
+        suspects = [
+            name
+            for name, result in current.items()
+            if name in base
+            and result["relative"] / base[name]["relative"] - 1 > args.threshold
+        ]
+
+        if suspects:
+            base_medians, current_medians = measure_median(trees, suspects, RUNS)
+            base.update(base_medians)
+            current.update(current_medians)
+
+    regressions = 0
+
+    print(f"{'benchmark':<28} {'base, us':>14} {'current, us':>14} {'change':>8}")
+
+    for name, result in current.items():
+        expected = base.get(name)
+
+        if expected is None:
+            print(f"{name:<28} {'-':>14} {result['time']:>14.3f} {'new':>8}")
+            continue
+
+        change = result["relative"] / expected["relative"] - 1
+        is_regression = change > args.threshold
+        regressions += is_regression
+        print(
+            f"{name:<28} {expected['time']:>14.3f} {result['time']:>14.3f}"
+            f" {change:>+8.0%}" + (" REGRESSION" if is_regression else "")
+        )
+
+    if regressions:
+        print(
+            f"\n{regressions} benchmark(s) are more than {args.threshold:.0%} slower "
+            f"than {args.base}",
+            file=sys.stderr,
+        )
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Measure tracked benchmarks of a source tree and print results as JSON.
+
+    python benchmarks/harness.py <tree> [names...]
+
+It's run in a subprocess for both the base revision and the working tree, so
+they are measured by the same code, even if the base revision has an older one.
+Only the standard library is imported here, the suite comes from the tree.
+"""
+import json
+import statistics
+import sys
+import timeit
+from typing import Any, Callable, Dict, List, Tuple
+
+
+def calibration() -> None:
+    data = {}
+    for index in range(100):
+        data[str(index)] = index * 2
+    sorted(data.values())
+
+
+def measure_relative_time(
+    func: Callable[[], Any], reference: Callable[[], Any], repeat: int = 9
+) -> Tuple[float, float]:
+    """
+    Return best time of a single call in microseconds and its ratio to reference.
+    Repeats are interleaved, so both functions see the same CPU conditions, and
+    median ratio is taken to ignore short bursts of noise.
+    """
+
+    timers = [timeit.Timer(func), timeit.Timer(reference)]
+    numbers = []
+
+    for timer in timers:
+        number = 1
+        while timer.timeit(number) < 0.02:
+            number *= 2
+        numbers.append(number)
+
+    times = []
+    ratios = []
+
+    for _ in range(repeat):
+        time, reference_time = [
+            timer.timeit(number) / number for timer, number in zip(timers, numbers)
+        ]
+        times.append(time)
+        ratios.append(time / reference_time)
+
+    return min(times) * 1_000_000, statistics.median(ratios)
+
+
+def measure(tree: str, names: List[str]) -> Dict[str, Dict[str, float]]:
+    # Directory of this script would shadow packages of the tree
+    sys.path[0] = tree
+
+    from benchmarks.suite import get_benchmarks
+
+    benchmarks = get_benchmarks()
+    results = {}
+
+    for name in names or list(benchmarks):
+        # Benchmark may be missing in the base revision
+        if name in benchmarks:
+            time, relative = measure_relative_time(benchmarks[name], calibration)
+            results[name] = {"time": round(time, 3), "relative": round(relative, 4)}
+
+    return results
+
+
+if __name__ == "__main__":
+    json.dump(measure(sys.argv[1], sys.argv[2:]), sys.stdout)
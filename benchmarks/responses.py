@@ -0,0 +1,67 @@
+"""
+Compare rendering PasswordResponse on every request with replaying CachedResponse.
+
+    python -m benchmarks.responses
+"""
+from typing import Any, Callable, List, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import request_response
+from starlette.types import Message
+
+from http_quest import levels, passwords
+from http_quest.app import get_application
+from http_quest.decorators import require_password
+from http_quest.quests import DEFAULT_QUEST
+from http_quest.responses import PasswordResponse
+
+from .utils import call, get_scope, measure_allocations, measure_time, run
+
+
+async def _receive() -> Message:
+    return {"type": "http.request"}
+
+
+async def _send(message: Message) -> None:
+    pass
+
+
+@require_password(4)
+async def header_uncached(_request: Request) -> Response:
+    return PasswordResponse("qwerty", headers={"X-Real-Password": passwords.DELETE})
+
+
+def render_password_response() -> None:
+    response = PasswordResponse("qwerty", headers={"X-Real-Password": passwords.DELETE})
+    run(response({}, _receive, _send))
+
+
+def replay_cached_response() -> None:
+    run(DEFAULT_QUEST.responses[3]({}, _receive, _send))
+
+
+def main() -> None:
+    scope = get_scope(path="/level/4", headers={"X-Password": passwords.HEADERS})
+    # Levels look up tracking of reached levels in state of the application
+    scope["app"] = get_application()
+    uncached_app = request_response(header_uncached)
+    cached_app = request_response(levels.header)
+
+    cases: List[Tuple[str, Callable[[], Any]]] = [
+        ("PasswordResponse", render_password_response),
+        ("CachedResponse", replay_cached_response),
+        ("level:header uncached", lambda: call(uncached_app, scope)),
+        ("level:header cached", lambda: call(cached_app, scope)),
+    ]
+
+    print(f"{'case':<24} {'time, us':>10} {'peak alloc, B':>15}")
+
+    for name, func in cases:
+        time = measure_time(func)
+        allocations = measure_allocations(func)
+        print(f"{name:<24} {time:>10.2f} {allocations:>15}")
+
+
+if __name__ == "__main__":
+    main()
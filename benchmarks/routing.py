@@ -0,0 +1,69 @@
+"""
+Compare route matching cost of Starlette Mount with DispatchMount.
+
+    python -m benchmarks.routing
+"""
+from typing import List, Type
+
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import BaseRoute, Mount, Route, Router
+
+from http_quest.app import get_application
+from http_quest.responses import CachedResponse
+from http_quest.routing import DispatchMount
+
+from .utils import call, get_scope, measure_time
+
+EMPTY_RESPONSE = CachedResponse(Response())
+
+
+async def endpoint(_request: Request) -> Response:
+    return EMPTY_RESPONSE
+
+
+def get_router(mount_class: Type[Mount]) -> Router:
+    """Build router with the same table as application, but with empty endpoints."""
+
+    routes: List[BaseRoute] = []
+
+    for route in get_application().routes:
+        if isinstance(route, Mount):
+            level_routes = [
+                Route(
+                    level_route.path,
+                    endpoint,
+                    methods=list(getattr(level_route, "methods") or []),
+                    name=level_route.name,
+                )
+                for level_route in route.routes
+                if isinstance(level_route, Route)
+            ]
+            routes.append(mount_class(route.path, routes=level_routes, name="level"))
+        elif isinstance(route, Route):
+            routes.append(Route(route.path, endpoint, name=route.name))
+
+    return Router(routes=routes)
+
+
+def main() -> None:
+    cases = [
+        ("/level/1", get_scope(path="/level/1")),
+        ("/level/12", get_scope(path="/level/12")),
+        ("/level/5 (405)", get_scope(path="/level/5")),
+        ("/level/13 (404)", get_scope(path="/level/13")),
+    ]
+    routers = [
+        ("Mount", get_router(Mount)),
+        ("DispatchMount", get_router(DispatchMount)),
+    ]
+
+    print(f"{'case':<16}" + "".join(f"{name + ', us':>20}" for name, _ in routers))
+
+    for name, scope in cases:
+        times = [measure_time(lambda: call(router, scope)) for _, router in routers]
+        print(f"{name:<16}" + "".join(f"{time:>20.2f}" for time in times))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""Tracked hot paths, see benchmarks/__main__.py for the regression gate."""
+import json
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import request_response
+from starlette.types import ASGIApp, Message
+
+from http_quest import endpoints, headers, levels, passwords, secrets
+from http_quest.accesslog import AccessLog, get_endpoint_levels
+from http_quest.analytics import Analytics
+from http_quest.app import get_application
+from http_quest.decorators import LevelTracker, require_password
+from http_quest.leaderboard import Leaderboard
+from http_quest.metrics import Metrics, get_endpoint_names
+from http_quest.progress import ProgressStore
+from http_quest.quests import DEFAULT_QUEST, QuestMiddleware, QuestStore, parse_quest
+from http_quest.ratelimit import RateLimiter
+from http_quest.responses import PasswordResponse
+from http_quest.shedding import LoadShedder
+from http_quest.utils import (
+    add_query_params,
+    base64_decode,
+    base64_encode,
+    get_masked_password,
+)
+
+from .utils import call, get_scope, run
+
+Benchmark = Callable[[], Any]
+
+_app = get_application()
+_router = _app.router
+
+# Same routes, but reached levels are recorded for players
+_tracking_app = get_application()
+_tracking_app.state.progress = ProgressStore(":memory:")
+_tracking_app.state.tracker = LevelTracker(_tracking_app.state.progress, None)
+
+
+async def _receive() -> Message:
+    return {"type": "http.request"}
+
+
+async def _send(message: Message) -> None:
+    pass
+
+
+@require_password(1)
+async def _protected(_request: Request) -> Response:
+    return DEFAULT_QUEST.responses[0]
+
+
+def _level(
+    app: ASGIApp,
+    path: str,
+    password: str,
+    method: str = "GET",
+    headers: Optional[Dict[str, str]] = None,
+    query_string: bytes = b"",
+    json_body: Any = None,
+    application: Starlette = _app,
+) -> Benchmark:
+    scope = get_scope(
+        method=method,
+        path=path,
+        headers={"X-Password": password, **(headers or {})},
+        query_string=query_string,
+    )
+    # Level redirect builds its URL with url_for, which needs the router
+    scope["router"] = _router
+    scope["app"] = application
+    body = b"" if json_body is None else json.dumps(json_body).encode("utf-8")
+
+    def benchmark() -> None:
+        call(app, scope, body)
+
+    return benchmark
+
+
+def _render_password_response() -> None:
+    response = PasswordResponse(passwords.REVERSE)
+    run(response({}, _receive, _send))
+
+
+def _observe_metrics() -> Benchmark:
+    metrics = Metrics(get_endpoint_names(_router.routes))
+
+    def benchmark() -> None:
+        metrics.observe(levels.mask, 200, 0.0042)
+
+    return benchmark
+
+
+def _log_access() -> Benchmark:
+    access_log = AccessLog(
+        get_endpoint_names(_router.routes), get_endpoint_levels(_router.routes)
+    )
+    scope = get_scope("POST", "/level/11", {"X-Player-Token": "d1b9c6a0"})
+    scope["endpoint"] = levels.mask
+
+    def benchmark() -> None:
+        access_log.log(scope, 403, 0.0042)
+
+    return benchmark
+
+
+def _check_shedding() -> Benchmark:
+    shedder = LoadShedder(max_lag=0.5, max_in_flight=100, priority_paths=["/level/12"])
+    shedder.lag = 0.01
+    shedder.in_flight = 10
+
+    def benchmark() -> None:
+        shedder.should_shed("/level/11")
+
+    return benchmark
+
+
+_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/83.0.4103.116 Safari/537.36"
+)
+_ACCEPT_LANGUAGE = "en-US,en;q=0.9,ru;q=0.8"
+_header_scope = get_scope(
+    headers={"User-Agent": _USER_AGENT, "Accept-Language": _ACCEPT_LANGUAGE}
+)
+
+
+def _user_agent_string_ops() -> None:
+    # Substring check, which user agent level did before the parser
+    "msie 6.0" in Request(_header_scope).headers.get("user-agent", "").lower()
+
+
+def _accept_language_string_ops() -> None:
+    "ru" in Request(_header_scope).headers.get("accept-language", "").lower()
+
+
+def _select_quest(count: int) -> Benchmark:
+    # Quests are loaded up front, so only the per-request lookup is measured
+    store = QuestStore("", cache_size=count)
+    definition = {
+        "passwords": list(passwords.LEVELS),
+        "secrets": {"robots": "robots", "mask": secrets.MASK, "redirect": ["hop"]},
+    }
+
+    for index in range(count):
+        store._quests.set(f"quest-{index}", parse_quest(f"quest-{index}", definition))
+
+    app = QuestMiddleware(request_response(levels.plain), store, path_prefix="/q")
+    path = f"/q/quest-{count // 2}/level/1"
+
+    return _level(app, path, passwords.PLAIN)
+
+
+def _record_progress() -> Benchmark:
+    progress = ProgressStore(":memory:")
+
+    def benchmark() -> None:
+        progress.record("d1b9c6a0", 1)
+
+    return benchmark
+
+
+def _add_to_leaderboard() -> Benchmark:
+    leaderboard = Leaderboard(size=10)
+    leaderboard.load((f"player-{index}", float(index)) for index in range(10000))
+
+    def benchmark() -> None:
+        # Worse result of a known player, the most common case
+        leaderboard.add("player-5000", 9000.0)
+        leaderboard.add("newcomer", 5000.5)
+        # Newcomer is removed, so every run inserts in the middle of results
+        del leaderboard.best["newcomer"]
+        del leaderboard.results[bisect_left(leaderboard.results, (5000.5, "newcomer"))]
+
+    return benchmark
+
+
+def _get_leaderboard() -> Benchmark:
+    leaderboard = Leaderboard(size=10)
+    leaderboard.load((f"player-{index}", float(index)) for index in range(10000))
+    endpoint = request_response(endpoints.leaderboard)
+    scope = get_scope(path="/leaderboard")
+    # Own application, so levels of the shared one keep the default path
+    application = get_application()
+    application.state.leaderboard = leaderboard
+    scope["app"] = application
+
+    def benchmark() -> None:
+        call(endpoint, scope, b"")
+
+    return benchmark
+
+
+def _record_analytics() -> Benchmark:
+    analytics = Analytics(len(passwords.LEVELS))
+
+    def benchmark() -> None:
+        analytics.record(10, "ip:127.0.0.1")
+
+    return benchmark
+
+
+def _acquire_rate_limit() -> Benchmark:
+    limiter = RateLimiter(rate=1e9, burst=10)
+
+    def benchmark() -> None:
+        limiter.acquire("127.0.0.1")
+
+    return benchmark
+
+
+def get_benchmarks() -> Dict[str, Benchmark]:
+    protected = request_response(_protected)
+    level = request_response
+
+    return {
+        "require_password:missing": _level(protected, "/", ""),
+        "require_password:wrong": _level(protected, "/", "qwerty"),
+        "require_password:correct": _level(protected, "/", passwords.PLAIN),
+        "level:plain": _level(level(levels.plain), "/level/1", passwords.PLAIN),
+        "level:plain:player": _level(
+            level(levels.plain),
+            "/level/1",
+            passwords.PLAIN,
+            headers={"X-Player-Token": "d1b9c6a0"},
+            application=_tracking_app,
+        ),
+        "level:reverse": _level(level(levels.reverse), "/level/2", passwords.REVERSE),
+        "level:base64": _level(level(levels.base64), "/level/3", passwords.BASE64),
+        "level:header": _level(level(levels.header), "/level/4", passwords.HEADERS),
+        "level:delete": _level(
+            level(levels.delete), "/level/5", passwords.DELETE, method="DELETE"
+        ),
+        "level:user_agent": _level(
+            level(levels.user_agent),
+            "/level/6",
+            passwords.USER_AGENT,
+            headers={
+                "User-Agent": "Mozilla/4.0 (compatible; MSIE 6.0; Windows NT 5.1)"
+            },
+        ),
+        "level:accept_language": _level(
+            level(levels.accept_language),
+            "/level/7",
+            passwords.ACCEPT_LANGUAGE,
+            headers={"Accept-Language": "ru-RU,ru;q=0.9"},
+        ),
+        "level:redirect": _level(
+            level(levels.redirect),
+            "/level/8",
+            passwords.REDIRECT,
+            query_string=f"secret={secrets.REDIRECT[5]}".encode("ascii"),
+        ),
+        "level:robots": _level(
+            level(levels.robots),
+            "/level/9",
+            passwords.ROBOTS,
+            method="POST",
+            json_body={"secret": secrets.ROBOTS},
+        ),
+        "level:guess_number": _level(
+            level(levels.guess_number),
+            "/level/10",
+            passwords.GUESS_NUMBER,
+            method="POST",
+            json_body={"number": 372},
+        ),
+        "level:mask": _level(
+            level(levels.mask),
+            "/level/11",
+            passwords.MASK,
+            method="POST",
+            json_body={"secret": "e" * len(secrets.MASK)},
+        ),
+        "level:finish": _level(level(levels.finish), "/level/12", passwords.FINISH),
+        "PasswordResponse": _render_password_response,
+        "add_query_params": lambda: add_query_params(
+            "http://testserver/level/8", secret=secrets.REDIRECT[0]
+        ),
+        "base64_encode": lambda: base64_encode(passwords.HEADERS),
+        "base64_decode": lambda: base64_decode("REg5c3g1clMyYVVMeHNxQWNSVm8="),
+        "get_masked_password": lambda: get_masked_password(
+            passwords.FINISH, secrets.MASK, "e" * len(secrets.MASK)
+        ),
+        "metrics:observe": _observe_metrics(),
+        "accesslog:log": _log_access(),
+        "headers:user_agent:string_ops": _user_agent_string_ops,
+        "headers:user_agent:parse": lambda: headers.parse_user_agent(_USER_AGENT),
+        "headers:user_agent:cached": lambda: headers.get_user_agent(_header_scope),
+        "headers:accept_language:string_ops": _accept_language_string_ops,
+        "headers:accept_language:parse": lambda: headers.parse_accept_language(
+            _ACCEPT_LANGUAGE
+        ),
+        "headers:accept_language:cached": lambda: headers.get_languages(_header_scope),
+        "shedding:should_shed": _check_shedding(),
+        "quests:level:1": _select_quest(1),
+        "quests:level:5000": _select_quest(5000),
+        "progress:record": _record_progress(),
+        "analytics:record": _record_analytics(),
+        "ratelimit:acquire": _acquire_rate_limit(),
+        "leaderboard:add": _add_to_leaderboard(),
+        "leaderboard:get": _get_leaderboard(),
+    }
@@ -0,0 +1,96 @@
+import timeit
+import tracemalloc
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from starlette.types import ASGIApp, Message, Scope
+
+
+def get_scope(
+    method: str = "GET",
+    path: str = "/",
+    headers: Optional[Dict[str, str]] = None,
+    query_string: bytes = b"",
+) -> Scope:
+    raw_headers = [
+        (key.lower().encode("latin-1"), value.encode("latin-1"))
+        for key, value in (headers or {}).items()
+    ]
+
+    return {
+        "type": "http",
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 12345),
+        "root_path": "",
+        "path": path,
+        "raw_path": path.encode("latin-1"),
+        "query_string": query_string,
+        "headers": raw_headers,
+    }
+
+
+def run(coroutine: Awaitable[Any]) -> Any:
+    """
+    Run coroutine that never suspends without an event loop.
+    Keeps loop overhead out of the measurements.
+    """
+
+    try:
+        coroutine.__await__().send(None)
+    except StopIteration as exc:
+        return exc.value
+
+    raise RuntimeError("Coroutine was suspended")
+
+
+def call(app: ASGIApp, scope: Scope, body: bytes = b"") -> List[Message]:
+    """Call ASGI application directly and return sent messages."""
+
+    messages: List[Message] = []
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+
+    run(app(dict(scope), receive, send))
+
+    return messages
+
+
+def measure_time(
+    func: Callable[[], Any], number: Optional[int] = None, repeat: int = 5
+) -> float:
+    """
+    Return best time of a single call in microseconds.
+    If number of calls is not given, it's picked to take at least 50ms.
+    """
+
+    timer = timeit.Timer(func)
+
+    if number is None:
+        number = 1
+        while timer.timeit(number) < 0.05:
+            number *= 2
+
+    best = min(timer.repeat(repeat=repeat, number=number))
+
+    return best / number * 1_000_000
+
+
+def measure_allocations(func: Callable[[], Any]) -> int:
+    """Return peak bytes allocated during a single call."""
+
+    func()  # warm up caches, so only steady state allocations are traced
+
+    tracemalloc.start()
+    try:
+        func()
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return peak
@@ -0,0 +1,71 @@
+"""
+Compare per-request marshmallow Schema with compiled validators.
+
+    python -m benchmarks.validators
+"""
+import json
+from json import JSONDecodeError
+from typing import Any, Dict, Tuple, Type
+
+from marshmallow import Schema, ValidationError
+
+from http_quest.schemas import Level8Schema
+from http_quest.validators import Validator, compile_schema
+
+from .utils import measure_allocations, measure_time
+
+
+def parse(body: bytes) -> Any:
+    try:
+        return json.loads(body)
+    except JSONDecodeError:
+        return {}
+
+
+def load_with_marshmallow(schema_class: Type[Schema], body: bytes) -> Tuple[Any, Any]:
+    try:
+        return schema_class().load(parse(body)), {}
+    except ValidationError as exc:
+        return {}, exc.messages
+
+
+def load_with_validator(validator: Validator, body: bytes) -> Tuple[Any, Any]:
+    return validator(parse(body))
+
+
+def main() -> None:
+    validator = compile_schema(Level8Schema)
+    bodies: Dict[str, bytes] = {
+        "valid": b'{"number": 372}',
+        "invalid": b'{"number": "foobar"}',
+        "out of range": b'{"number": 1001}',
+        "malformed": b'{"number": ',
+    }
+
+    print(
+        f"{'body':<14} {'marshmallow, us':>16} {'compiled, us':>14}"
+        f" {'marshmallow, B':>16} {'compiled, B':>14}"
+    )
+
+    for name, body in bodies.items():
+        assert load_with_marshmallow(Level8Schema, body) == load_with_validator(
+            validator, body
+        )
+
+        def marshmallow_case() -> None:
+            load_with_marshmallow(Level8Schema, body)
+
+        def compiled_case() -> None:
+            load_with_validator(validator, body)
+
+        print(
+            f"{name:<14}"
+            f" {measure_time(marshmallow_case, number=2000):>16.2f}"
+            f" {measure_time(compiled_case, number=2000):>14.2f}"
+            f" {measure_allocations(marshmallow_case):>16}"
+            f" {measure_allocations(compiled_case):>14}"
+        )
+
+
+if __name__ == "__main__":
+    main()
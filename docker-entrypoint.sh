@@ -2,13 +2,15 @@
 
 set -e
 
-if [ "$1" = "gunicorn" ]; then
-	exec gunicorn http_quest.asgi:application \
-	  --worker-class uvicorn.workers.UvicornWorker \
-	  --bind 0.0.0.0:8000 \
-	  --access-logfile "-" \
-	  --error-logfile "-" \
-	  --forwarded-allow-ips "*"
+if [ "$1" = "serve" ]; then
+	# Workers share metrics through files, stale ones belong to dead processes
+	export METRICS_DIR="${METRICS_DIR:-/tmp/http-quest-metrics}"
+	rm -rf "$METRICS_DIR"
+	mkdir -p "$METRICS_DIR"
+	export ANALYTICS_DIR="${ANALYTICS_DIR:-$METRICS_DIR}"
+
+	shift
+	exec python -m http_quest serve "$@"
 fi
 
 exec "$@"
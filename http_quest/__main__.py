@@ -0,0 +1,77 @@
+"""
+Command line interface.
+
+    python -m http_quest serve               # run production server
+    python -m http_quest serve --workers 4   # override number of workers
+"""
+import argparse
+
+from . import settings
+from .server import Server, get_options
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m http_quest")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="run production server")
+    serve.add_argument("--bind", default=settings.SERVER_BIND)
+    serve.add_argument(
+        "--workers",
+        type=int,
+        default=settings.SERVER_WORKERS,
+        help="number of worker processes, 0 means one per available CPU",
+    )
+    serve.add_argument(
+        "--keepalive",
+        type=int,
+        default=settings.SERVER_KEEPALIVE,
+        help="seconds to keep idle connection open",
+    )
+    serve.add_argument(
+        "--backlog",
+        type=int,
+        default=settings.SERVER_BACKLOG,
+        help="maximum number of pending connections",
+    )
+    serve.add_argument(
+        "--max-requests",
+        type=int,
+        default=settings.SERVER_MAX_REQUESTS,
+        help="restart worker after this many requests, 0 means never",
+    )
+    serve.add_argument(
+        "--max-requests-jitter",
+        type=int,
+        default=settings.SERVER_MAX_REQUESTS_JITTER,
+        help="random addition to max requests, so workers don't restart together",
+    )
+    serve.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=settings.SERVER_GRACEFUL_TIMEOUT,
+        help="seconds to drain and stop worker before it's killed",
+    )
+    serve.add_argument(
+        "--forwarded-allow-ips",
+        default=settings.SERVER_FORWARDED_ALLOW_IPS,
+        help="comma separated addresses of trusted proxies, * trusts any",
+    )
+    args = parser.parse_args()
+
+    options = get_options(
+        args.bind,
+        args.workers,
+        args.keepalive,
+        args.backlog,
+        args.max_requests,
+        args.max_requests_jitter,
+        graceful_timeout=args.graceful_timeout,
+        access_log=not settings.ACCESS_LOG_ENABLED,
+        forwarded_allow_ips=args.forwarded_allow_ips,
+    )
+    Server(options).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Structured access log, which is written off the request path.
+
+Middleware only appends a tuple to a ring buffer, if the buffer is full the
+oldest record is overwritten and counted as dropped. Background task takes all
+buffered records once per flush interval, formats them as JSON lines and writes
+them in one call from a thread. Every status code or class of codes may be
+sampled with its own rate, so noisy 403s don't hide rare 5xx.
+"""
+import asyncio
+import json
+import logging
+import random
+import sys
+from collections import deque
+from time import perf_counter, time
+from typing import IO, Any, Deque, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.routing import BaseRoute, Mount, Route
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .leaderboard import get_player_name
+from .metrics import key_by_id
+from .progress import get_player
+
+# Time, method, path, endpoint, status, duration, client address, raw headers
+Record = Tuple[float, str, str, Any, int, float, str, List[Tuple[bytes, bytes]]]
+
+logger = logging.getLogger(__name__)
+
+
+def parse_status_rates(rates: Dict[str, float]) -> Dict[int, float]:
+    """
+    Convert rates like {"403": 0.01, "2xx": 0.1} to rates by status code and
+    by class, class of 2xx is stored under 2, so it can't clash with codes.
+    """
+
+    status_rates = {}
+
+    for name, rate in rates.items():
+        if len(name) == 3 and name[0].isdigit() and name[1:].lower() == "xx":
+            status_rates[int(name[0])] = rate
+        elif name.isdigit():
+            status_rates[int(name)] = rate
+        else:
+            raise ValueError(f"Sample rate {name!r} should be a status like 403 or 4xx")
+
+    return status_rates
+
+
+def get_endpoint_levels(routes: List[BaseRoute]) -> Dict[Any, int]:
+    """Return level numbers by endpoint, levels are mounted at /level/<number>."""
+
+    levels = {}
+
+    for route in routes:
+        if isinstance(route, Mount) and route.name == "level":
+            for level_route in route.routes or []:
+                if isinstance(level_route, Route):
+                    levels[level_route.endpoint] = int(level_route.path.strip("/"))
+
+    return levels
+
+
+class AccessLog:
+    def __init__(
+        self,
+        endpoint_names: Dict[Any, str],
+        endpoint_levels: Dict[Any, int],
+        stream: IO[str] = sys.stdout,
+        buffer_size: int = 10000,
+        flush_interval: float = 1.0,
+        sample_rates: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.names = key_by_id(endpoint_names)
+        self.levels = key_by_id(endpoint_levels)
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.sample_rates = parse_status_rates(sample_rates or {})
+        self.records: Deque[Record] = deque(maxlen=buffer_size)
+        self.counters = {"logged": 0, "sampled_out": 0, "dropped": 0}
+        self._task: Optional["asyncio.Future[None]"] = None
+
+    def get_sample_rate(self, status: int) -> float:
+        # Rate of the exact code wins over rate of its class
+        rate = self.sample_rates.get(status)
+
+        return rate if rate is not None else self.sample_rates.get(status // 100, 1.0)
+
+    def log(self, scope: Scope, status: int, duration: float) -> None:
+        """Buffer request for the log, this is called in request path."""
+
+        if self.sample_rates:
+            rate = self.get_sample_rate(status)
+
+            if rate < 1.0 and random.random() >= rate:
+                self.counters["sampled_out"] += 1
+                return
+
+        if len(self.records) == self.buffer_size:
+            self.counters["dropped"] += 1
+
+        client = scope.get("client")
+        self.records.append(
+            (
+                time(),
+                scope["method"],
+                # Mount moves matched prefix of the path to the root path
+                scope.get("root_path", "") + scope["path"],
+                scope.get("endpoint"),
+                status,
+                duration,
+                client[0] if client else "",
+                # Player is found in headers later, when the record is formatted
+                scope["headers"],
+            )
+        )
+
+    def format(self, record: Record) -> str:
+        timestamp, method, path, endpoint, status, duration, address, headers = record
+        player = get_player(Request({"type": "http", "headers": headers}))
+
+        return json.dumps(
+            {
+                "time": round(timestamp, 3),
+                "method": method,
+                "path": path,
+                "route": self.names.get(id(endpoint)),
+                "level": self.levels.get(id(endpoint)),
+                "status": status,
+                "duration_ms": round(duration * 1000, 3),
+                "client": address,
+                "player": get_player_name(player) if player else None,
+            },
+            separators=(",", ":"),
+        )
+
+    def write(self, records: List[Record]) -> None:
+        self.stream.write("".join(self.format(record) + "\n" for record in records))
+        self.stream.flush()
+        self.counters["logged"] += len(records)
+
+    async def flush(self) -> None:
+        # Records are taken in the event loop, so no request appends to them later
+        records = list(self.records)
+        self.records.clear()
+
+        if records:
+            await run_in_threadpool(self.write, records)
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+
+            try:
+                await self.flush()
+            except (OSError, ValueError):
+                logger.exception("Failed to write access log")
+
+    async def start(self) -> None:
+        self._task = asyncio.ensure_future(self._flush_periodically())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        await self.flush()
+
+    def collect(self) -> List[str]:
+        """Return counters in Prometheus format for /metrics."""
+
+        lines = [
+            "# HELP access_log_records_total Access log records by outcome.",
+            "# TYPE access_log_records_total counter",
+        ]
+        lines.extend(
+            f'access_log_records_total{{outcome="{outcome}"}} {count}'
+            for outcome, count in self.counters.items()
+        )
+
+        return lines
+
+
+class AccessLogMiddleware:
+    """Pure ASGI middleware, which passes finished requests to the access log."""
+
+    def __init__(self, app: ASGIApp, access_log: AccessLog) -> None:
+        self.app = app
+        self.access_log = access_log
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started_at = perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.access_log.log(scope, status, perf_counter() - started_at)
@@ -0,0 +1,306 @@
+"""
+Funnel analytics in fixed memory.
+
+For every level there is a HyperLogLog of unique clients, which reached it,
+a count-min sketch of attempts per client and a HyperLogLog of clients, which
+made too many attempts. Sketches of a level take a few KB no matter how many
+clients there are, and they are merged by taking maximum of registers and sum
+of counters, so snapshots of workers and pods can be combined. Workers, which
+share a directory, also read counters of each other, so clients are counted as
+struggling by their attempts in all workers, not in the one they hit.
+"""
+import asyncio
+import hashlib
+import math
+from pathlib import Path
+from time import monotonic
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    MutableSequence,
+    Optional,
+    Sequence,
+    Tuple,
+    cast,
+)
+
+from starlette.concurrency import run_in_threadpool
+
+from .shared import get_path, map_buffers, open_buffer, read_buffers, reopen_after_fork
+
+# HyperLogLog with 2 ** 10 registers has standard error of about 3%
+HLL_PRECISION = 10
+HLL_REGISTERS = 1 << HLL_PRECISION
+HLL_RANK_BITS = 64 - HLL_PRECISION
+CMS_DEPTH = 4
+CMS_INDEX_BITS = 10
+CMS_WIDTH = 1 << CMS_INDEX_BITS
+# Counters are 16 bit and stop at the maximum instead of overflowing
+CMS_MAX_COUNT = 0xFFFF
+
+# Level layout: visitors registers, struggling registers, counters, total attempts
+_VISITORS_OFFSET = 0
+_STRUGGLING_OFFSET = HLL_REGISTERS
+_COUNTERS_OFFSET = 2 * HLL_REGISTERS
+_TOTAL_OFFSET = _COUNTERS_OFFSET + CMS_DEPTH * CMS_WIDTH * 2
+LEVEL_SIZE = _TOTAL_OFFSET + 8
+# Files of workers, which are started later, are found after at most that time
+PEERS_REFRESH_INTERVAL = 1.0
+
+Sketch = MutableSequence[int]
+
+
+def hash_client(client: str) -> bytes:
+    """Return stable hash of a client, built-in hash differs between processes."""
+
+    return hashlib.blake2b(client.encode("utf-8"), digest_size=16).digest()
+
+
+def hll_add(registers: Sketch, digest: bytes) -> None:
+    value = int.from_bytes(digest[:8], "little")
+    index = value >> HLL_RANK_BITS
+    rank = HLL_RANK_BITS - (value & ((1 << HLL_RANK_BITS) - 1)).bit_length() + 1
+
+    if registers[index] < rank:
+        registers[index] = rank
+
+
+def hll_count(registers: Sequence[int]) -> int:
+    alpha = 0.7213 / (1 + 1.079 / HLL_REGISTERS)
+    estimate = alpha * HLL_REGISTERS ** 2 / sum(2.0 ** -rank for rank in registers)
+    zeros = list(registers).count(0)
+
+    # Linear counting is more precise for small cardinalities
+    if estimate <= 2.5 * HLL_REGISTERS and zeros:
+        estimate = HLL_REGISTERS * math.log(HLL_REGISTERS / zeros)
+
+    return round(estimate)
+
+
+def get_cms_indexes(digest: bytes) -> List[int]:
+    """Return counter index in every row, rows take 10 bits each after HLL bits."""
+
+    value = int.from_bytes(digest[8:], "little")
+
+    return [
+        row * CMS_WIDTH + (value >> (row * CMS_INDEX_BITS) & (CMS_WIDTH - 1))
+        for row in range(CMS_DEPTH)
+    ]
+
+
+def cms_add(counters: Sketch, digest: bytes) -> int:
+    """
+    Increment count of the client and return its new estimate.
+    Only the smallest counters are increased, which keeps overestimation low.
+    """
+
+    indexes = get_cms_indexes(digest)
+    estimate = min(CMS_MAX_COUNT, min([counters[index] for index in indexes]) + 1)
+
+    for index in indexes:
+        if counters[index] < estimate:
+            counters[index] = estimate
+
+    return estimate
+
+
+def cms_estimate(counters: Sequence[int], digest: bytes) -> int:
+    return min(counters[index] for index in get_cms_indexes(digest))
+
+
+def get_sketches(data: memoryview, level: int) -> Tuple[Sketch, Sketch, Sketch, Sketch]:
+    """Return visitors, struggling clients, attempt counters and total of a level."""
+
+    start = level * LEVEL_SIZE
+    sketches = (
+        data[start + _VISITORS_OFFSET : start + _STRUGGLING_OFFSET],
+        data[start + _STRUGGLING_OFFSET : start + _COUNTERS_OFFSET],
+        data[start + _COUNTERS_OFFSET : start + _TOTAL_OFFSET].cast("H"),
+        data[start + _TOTAL_OFFSET : start + LEVEL_SIZE].cast("Q"),
+    )
+
+    return cast(Tuple[Sketch, Sketch, Sketch, Sketch], sketches)
+
+
+def merge(snapshots: Iterable[bytes], levels: int) -> bytes:
+    """Merge snapshots of several processes or pods into one."""
+
+    merged = memoryview(bytearray(levels * LEVEL_SIZE))
+
+    for snapshot in snapshots:
+        if len(snapshot) != len(merged):
+            raise ValueError("Snapshot has wrong size.")
+
+        for level in range(levels):
+            *registers, counters, total = get_sketches(merged, level)
+            *other_registers, other_counters, other_total = get_sketches(
+                memoryview(snapshot), level
+            )
+
+            for target, source in zip(registers, other_registers):
+                target[:] = bytes(max(pair) for pair in zip(target, source))
+
+            for index, value in enumerate(other_counters):
+                if value:
+                    counters[index] = min(CMS_MAX_COUNT, counters[index] + value)
+
+            total[0] += other_total[0]
+
+    return merged.tobytes()
+
+
+class Analytics:
+    def __init__(
+        self,
+        levels: int,
+        struggle_attempts: int = 10,
+        directory: Optional[str] = None,
+        filename: Optional[str] = None,
+        snapshot_ttl: float = 5.0,
+        clock: Callable[[], float] = monotonic,
+    ) -> None:
+        self.levels = levels
+        self.struggle_attempts = struggle_attempts
+        self.size = levels * LEVEL_SIZE
+        self.directory = Path(directory) if directory else None
+        self.filename = filename
+        self.buffer = memoryview(bytearray())
+        self.sketches: List[Tuple[Sketch, Sketch, Sketch, Sketch]] = []
+        self.path: Optional[Path] = None
+        # Buffers of all workers, which share the directory, and their counters
+        self.buffers: Dict[Path, memoryview] = {}
+        self.peer_counters: List[Sequence[int]] = []
+        self.peers_checked = -math.inf
+        # Merged snapshot served to endpoints, so requests don't merge files each
+        self.snapshot_ttl = snapshot_ttl
+        self.clock = clock
+        self._snapshot: Optional[bytes] = None
+        self._snapshot_at = -math.inf
+        self._snapshot_lock: Optional[asyncio.Lock] = None
+        self.reopen()
+
+        if filename is None:
+            reopen_after_fork(self)
+
+    def reopen(self) -> None:
+        """Start from empty sketches in a new file, used in forked workers."""
+
+        self.buffer = open_buffer(self.size, "analytics", self.directory, self.filename)
+        self.sketches = [
+            get_sketches(self.buffer, level) for level in range(self.levels)
+        ]
+
+        if self.directory is not None:
+            self.path = get_path(self.directory, "analytics", self.filename)
+            self.buffers = {}
+            self.peer_counters = []
+            self.peers_checked = -math.inf
+
+    def get_peer_counters(self) -> List[Sequence[int]]:
+        """Return counters of other workers, new files are looked up once a second."""
+
+        now = self.clock()
+
+        if self.directory is not None and now - self.peers_checked >= (
+            PEERS_REFRESH_INTERVAL
+        ):
+            self.peers_checked = now
+            self.buffers = map_buffers(
+                self.directory, "analytics", self.size, self.buffers
+            )
+            # Whole files are cast, so counters of a level are found by offset
+            self.peer_counters = [
+                cast(Sequence[int], buffer.cast("H"))
+                for path, buffer in self.buffers.items()
+                if path != self.path
+            ]
+
+        return self.peer_counters
+
+    def estimate_all(self, level: int, digest: bytes) -> int:
+        """Return estimated attempts of a client on a level in all workers."""
+
+        offset = ((level - 1) * LEVEL_SIZE + _COUNTERS_OFFSET) // 2
+        counters = self.sketches[level - 1][2]
+        peers = self.get_peer_counters()
+
+        return min(
+            counters[index] + sum(peer[offset + index] for peer in peers)
+            for index in get_cms_indexes(digest)
+        )
+
+    def record(self, level: int, client: str) -> None:
+        """Record attempt of a client on a level, levels are numbered from 1."""
+
+        visitors, struggling, counters, total = self.sketches[level - 1]
+        digest = hash_client(client)
+        hll_add(visitors, digest)
+        total[0] += 1
+
+        estimate = cms_add(counters, digest)
+
+        # Other workers are read only while attempts in this one aren't enough
+        if estimate < self.struggle_attempts and self.directory is not None:
+            estimate = self.estimate_all(level, digest)
+
+        if estimate >= self.struggle_attempts:
+            hll_add(struggling, digest)
+
+    def snapshot(self) -> bytes:
+        """Return sketches of all workers merged together."""
+
+        if self.directory is None:
+            return self.buffer.tobytes()
+
+        return merge(read_buffers(self.directory, "analytics", self.size), self.levels)
+
+    async def get_snapshot(self) -> bytes:
+        """Return merged snapshot, it's rebuilt in a thread at most once per TTL."""
+
+        # Lock is created in the running loop, concurrent requests wait for one merge
+        if self._snapshot_lock is None:
+            self._snapshot_lock = asyncio.Lock()
+
+        async with self._snapshot_lock:
+            now = self.clock()
+
+            if (
+                self._snapshot is not None
+                and now - self._snapshot_at < self.snapshot_ttl
+            ):
+                return self._snapshot
+
+            snapshot = await run_in_threadpool(self.snapshot)
+            self._snapshot = snapshot
+            self._snapshot_at = now
+
+            return snapshot
+
+    def get_stats(self, snapshot: Optional[bytes] = None) -> Dict[str, Any]:
+        data = memoryview(snapshot if snapshot is not None else self.snapshot())
+        levels = []
+
+        for level in range(self.levels):
+            visitors, struggling, _counters, total = get_sketches(data, level)
+            levels.append(
+                {
+                    "level": level + 1,
+                    "unique_clients": hll_count(visitors),
+                    "attempts": total[0],
+                    "struggling_clients": hll_count(struggling),
+                }
+            )
+
+        return {"struggle_attempts": self.struggle_attempts, "levels": levels}
+
+    def get_attempts(self, level: int, client: str) -> int:
+        """Return estimated number of attempts of a client, never less than real."""
+
+        _visitors, _struggling, counters, _total = get_sketches(
+            memoryview(self.snapshot()), level - 1
+        )
+
+        return cms_estimate(counters, hash_client(client))
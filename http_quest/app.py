@@ -1,16 +1,34 @@
+from typing import Callable, List
+
 from starlette.applications import Starlette
 from starlette.middleware import Middleware
 from starlette.routing import Mount, Route
-from starlette_x_bugsnag.middleware import BugsnagMiddleware
 
-from . import __version__, endpoints, levels, settings
+from . import endpoints, headers, levels, passwords, settings
+from .accesslog import AccessLog, AccessLogMiddleware, get_endpoint_levels
+from .analytics import Analytics
+from .decorators import LevelTracker
+from .errors import ErrorReporter, ErrorReportingMiddleware
+from .health import Drainer, HealthMiddleware
+from .leaderboard import Leaderboard, LeaderboardSync
+from .memory import MemoryTracker
+from .metrics import Metrics, MetricsMiddleware, get_endpoint_names
+from .profiler import Profiler, ProfilerMiddleware
+from .progress import ProgressStore
+from .quests import QuestMiddleware, QuestStore
+from .ratelimit import RateLimiter, parse_rate_limits
+from .routing import DispatchMount
+from .shedding import LoadShedder, LoadSheddingMiddleware
+from .utils import parse_sample_rates
 
 
 def get_application() -> Starlette:
+    mount_class = DispatchMount if settings.FAST_ROUTER else Mount
+
     routes = [
         Route("/", endpoints.home, name="home"),
         Route("/robots.txt", endpoints.robots, name="robots"),
-        Mount(
+        mount_class(
             "/level",
             name="level",
             routes=[
@@ -32,18 +50,183 @@ def get_application() -> Starlette:
         ),
     ]
 
-    release_stage = "development" if settings.DEBUG else "production"
+    on_startup: List[Callable] = []
+    on_shutdown: List[Callable] = []
+    progress = None
+    leaderboard = None
+
+    if settings.PROGRESS_ENABLED:
+        progress = ProgressStore(
+            settings.PROGRESS_DATABASE,
+            flush_interval=settings.PROGRESS_FLUSH_INTERVAL,
+            queue_size=settings.PROGRESS_QUEUE_SIZE,
+            cache_size=settings.PROGRESS_CACHE_SIZE,
+        )
+        # Completion times are known only for players with tracked progress
+        leaderboard = Leaderboard(
+            size=settings.LEADERBOARD_SIZE,
+            refresh_interval=settings.LEADERBOARD_REFRESH_INTERVAL,
+        )
+        leaderboard_sync = LeaderboardSync(
+            leaderboard, progress, interval=settings.LEADERBOARD_SYNC_INTERVAL
+        )
+        routes.append(Route("/leaderboard", endpoints.leaderboard, name="leaderboard"))
+        on_startup.append(progress.start)
+        on_startup.append(leaderboard_sync.start)
+        # Sync is stopped first, so it doesn't reopen closed database
+        on_shutdown.append(leaderboard_sync.stop)
+        on_shutdown.append(progress.stop)
+
+    rate_limiters = {
+        name: RateLimiter(rate, burst, max_keys=settings.RATE_LIMIT_MAX_KEYS)
+        for name, (rate, burst) in parse_rate_limits(settings.RATE_LIMITS).items()
+    }
+    analytics = None
+
+    if settings.ANALYTICS_ENABLED:
+        analytics = Analytics(
+            len(passwords.LEVELS),
+            struggle_attempts=settings.ANALYTICS_STRUGGLE_ATTEMPTS,
+            directory=settings.ANALYTICS_DIR,
+            snapshot_ttl=settings.ANALYTICS_SNAPSHOT_TTL,
+        )
+        routes.append(Route("/stats", endpoints.stats, name="stats"))
+        routes.append(
+            Route("/stats/sketch", endpoints.stats_sketch, name="stats_sketch")
+        )
+
+    tracker = None
+
+    if progress is not None or analytics is not None:
+        tracker = LevelTracker(progress, analytics)
+
+    # Health checks are answered before any other middleware
+    drainer = Drainer(timeout=settings.DRAIN_TIMEOUT)
+    middleware: List[Middleware] = [Middleware(HealthMiddleware, drainer=drainer)]
+    metrics = None
+
+    if settings.METRICS_ENABLED:
+        routes.append(Route("/metrics", endpoints.metrics, name="metrics"))
+        metrics = Metrics(get_endpoint_names(routes), directory=settings.METRICS_DIR)
+        middleware.append(Middleware(MetricsMiddleware, metrics=metrics))
+
+    access_log = None
+
+    if settings.ACCESS_LOG_ENABLED:
+        access_log = AccessLog(
+            get_endpoint_names(routes),
+            get_endpoint_levels(routes),
+            buffer_size=settings.ACCESS_LOG_BUFFER_SIZE,
+            flush_interval=settings.ACCESS_LOG_FLUSH_INTERVAL,
+            sample_rates=parse_sample_rates(settings.ACCESS_LOG_SAMPLE_RATES),
+        )
+        middleware.append(Middleware(AccessLogMiddleware, access_log=access_log))
+        on_startup.append(access_log.start)
+        on_shutdown.append(access_log.stop)
+
+    profiler = None
+    memory = None
+
+    # Admin endpoints exist only if there is a token to protect them
+    if str(settings.ADMIN_TOKEN):
+        routes.append(Route("/admin/profile", endpoints.profile, name="profile"))
+        routes.append(Route("/admin/memory", endpoints.memory, name="memory"))
+        memory = MemoryTracker(frames=settings.MEMORY_TRACE_FRAMES)
+        profiler = Profiler(
+            get_endpoint_names(routes),
+            interval=settings.PROFILER_INTERVAL,
+            max_seconds=settings.PROFILER_MAX_SECONDS,
+        )
+        middleware.append(Middleware(ProfilerMiddleware, profiler=profiler))
+
+    shedder = None
 
-    return Starlette(
+    if settings.SHEDDING_ENABLED:
+        shedder = LoadShedder(
+            max_lag=settings.SHEDDING_MAX_LAG,
+            max_in_flight=settings.SHEDDING_MAX_IN_FLIGHT,
+            priority_paths=settings.SHEDDING_PRIORITY_PATHS,
+            priority_factor=settings.SHEDDING_PRIORITY_FACTOR,
+            interval=settings.SHEDDING_CHECK_INTERVAL,
+            retry_after=settings.SHEDDING_RETRY_AFTER,
+            quest_path_prefix=settings.QUESTS_PATH_PREFIX
+            if settings.QUESTS_DIR
+            else "",
+        )
+        # Shed requests are still seen by metrics and access log
+        middleware.append(Middleware(LoadSheddingMiddleware, shedder=shedder))
+        on_startup.append(shedder.start)
+        on_shutdown.append(shedder.stop)
+
+    reporter = ErrorReporter(
+        str(settings.BUGSNAG_API_KEY),
+        url=settings.ERROR_REPORTING_URL,
+        release_stage="development" if settings.DEBUG else "production",
+        queue_size=settings.ERROR_QUEUE_SIZE,
+        batch_size=settings.ERROR_BATCH_SIZE,
+        flush_interval=settings.ERROR_FLUSH_INTERVAL,
+        dedup_window=settings.ERROR_DEDUP_WINDOW,
+        sample_rates=parse_sample_rates(settings.ERROR_SAMPLE_RATES),
+    )
+    middleware.append(Middleware(ErrorReportingMiddleware, reporter=reporter))
+    on_startup.append(reporter.start)
+    on_shutdown.append(reporter.stop)
+
+    quests = None
+
+    if settings.QUESTS_DIR:
+        quests = QuestStore(
+            settings.QUESTS_DIR,
+            key=passwords.KEY,
+            cache_size=settings.QUESTS_CACHE_SIZE,
+            missing_cache_size=settings.QUESTS_MISSING_CACHE_SIZE,
+            missing_ttl=settings.QUESTS_MISSING_TTL,
+        )
+        # Quest is selected last, so invalid quest files are reported as errors
+        middleware.append(
+            Middleware(
+                QuestMiddleware,
+                store=quests,
+                path_prefix=settings.QUESTS_PATH_PREFIX,
+                host_suffix=settings.QUESTS_HOST_SUFFIX,
+            )
+        )
+
+    if metrics is not None:
+        metrics.add_collector(reporter.collect)
+        metrics.add_collector(headers.collect)
+
+        if access_log is not None:
+            metrics.add_collector(access_log.collect)
+
+        if shedder is not None:
+            metrics.add_collector(shedder.collect)
+
+        if quests is not None:
+            metrics.add_collector(quests.collect)
+
+    # Worker is ready, when all other startup handlers have finished
+    on_startup.append(drainer.start)
+
+    app = Starlette(
         debug=settings.DEBUG,
         routes=routes,
-        middleware=[
-            Middleware(
-                BugsnagMiddleware,
-                api_key=str(settings.BUGSNAG_API_KEY),
-                app_version=__version__,
-                project_root=None,
-                release_stage=release_stage,
-            ),
-        ],
+        middleware=middleware,
+        on_startup=on_startup,
+        on_shutdown=on_shutdown,
     )
+    app.state.metrics = metrics
+    app.state.access_log = access_log
+    app.state.shedder = shedder
+    app.state.drainer = drainer
+    app.state.profiler = profiler
+    app.state.memory = memory
+    app.state.progress = progress
+    app.state.leaderboard = leaderboard
+    app.state.analytics = analytics
+    app.state.tracker = tracker
+    app.state.rate_limiters = rate_limiters
+    app.state.reporter = reporter
+    app.state.quests = quests
+
+    return app
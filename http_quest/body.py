@@ -0,0 +1,75 @@
+import json
+from typing import Any, List
+
+from starlette import status
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+
+from . import settings
+
+
+async def read_body(request: Request, limit: int) -> bytes:
+    """
+    Read request body, but no more than limit bytes.
+    Declared Content-Length is checked before reading anything, otherwise chunks
+    are counted as they arrive and reading stops as soon as limit is exceeded.
+    """
+
+    content_length = request.headers.get("content-length")
+
+    if content_length is not None:
+        try:
+            declared_length = int(content_length)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Content-Length header is invalid.",
+            )
+
+        if declared_length > limit:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail="Request body is too large.",
+            )
+
+    chunks: List[bytes] = []
+    length = 0
+
+    async for chunk in request.stream():
+        length += len(chunk)
+
+        if length > limit:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail="Request body is too large.",
+            )
+
+        chunks.append(chunk)
+
+    return b"".join(chunks)
+
+
+async def read_json(request: Request) -> Any:
+    """
+    Read request body limited by MAX_BODY_SIZE setting and parse it as JSON.
+    Malformed or empty body is treated as an empty object.
+    """
+
+    content_type = request.headers.get("content-type")
+
+    if content_type is not None:
+        media_type = content_type.partition(";")[0].strip().lower()
+
+        if media_type != "application/json":
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Content-Type header should be application/json.",
+            )
+
+    body = await read_body(request, settings.MAX_BODY_SIZE)
+
+    try:
+        return json.loads(body)
+    except ValueError:
+        # Covers JSONDecodeError and UnicodeDecodeError for non UTF-8 bodies
+        return {}
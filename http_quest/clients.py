@@ -0,0 +1,17 @@
+from starlette.requests import Request
+
+from .progress import get_player
+
+
+def get_client(request: Request) -> str:
+    """
+    Return key of a client: player token if it's given, otherwise IP address.
+    Behind a proxy, server puts forwarded address to the scope already.
+    """
+
+    player = get_player(request)
+
+    if player is not None:
+        return f"player:{player}"
+
+    return f"ip:{request.client.host}"
@@ -1,28 +1,112 @@
+import hmac
 from functools import wraps
-from typing import Any, Callable
+from typing import TYPE_CHECKING, Any, Callable, Optional
 
-from starlette.exceptions import HTTPException
 from starlette.requests import Request
-from starlette.responses import Response
+from starlette.responses import PlainTextResponse, Response
 from starlette.status import HTTP_403_FORBIDDEN
 
+from . import settings
+from .clients import get_client
+from .progress import get_player
+from .quests import get_quest
+from .ratelimit import get_rate_limited_response, get_retry_after
+from .responses import CachedResponse
+
+if TYPE_CHECKING:
+    from .analytics import Analytics
+    from .progress import ProgressStore
+
+PASSWORD_REQUIRED_RESPONSE = CachedResponse(
+    PlainTextResponse("X-Password header is required", status_code=HTTP_403_FORBIDDEN)
+)
+PASSWORD_WRONG_RESPONSE = CachedResponse(
+    PlainTextResponse("X-Password header is wrong", status_code=HTTP_403_FORBIDDEN)
+)
+ADMIN_TOKEN_WRONG_RESPONSE = CachedResponse(
+    PlainTextResponse("X-Admin-Token header is wrong", status_code=HTTP_403_FORBIDDEN)
+)
+PLAYER_REQUIRED_RESPONSE = CachedResponse(
+    PlainTextResponse(
+        "X-Player-Token header is required", status_code=HTTP_403_FORBIDDEN
+    )
+)
+
+
+def get_rate_limit_key(request: Request) -> str:
+    """
+    Return IP address of the client, unless limits are set per player.
+    Players can change their tokens, so IP address is the default.
+    """
+
+    if settings.RATE_LIMIT_KEY == "client":
+        return get_client(request)
+
+    host: str = request.client.host
+
+    return host
+
+
+class LevelTracker:
+    """
+    Records progress and analytics of clients, which reach levels.
+    Application has no tracker, if both are disabled, so levels check it once.
+    """
+
+    def __init__(
+        self, progress: Optional["ProgressStore"], analytics: Optional["Analytics"]
+    ) -> None:
+        self.progress = progress
+        self.analytics = analytics
+
+    def track(self, request: Request, level: int, player: Optional[str]) -> None:
+        if self.progress is not None:
+            player = player or get_player(request)
+
+            if player:
+                self.progress.record(player, level)
+
+        if self.analytics is not None:
+            self.analytics.record(level, get_client(request))
+
+
+def require_password(level: int) -> Callable:
+    """
+    Check X-Password header against password of the level in quest of the request,
+    reached level is recorded if progress is tracked.
+    If passwords are derived for players, level password of the player is expected.
+    """
 
-def require_password(password: str) -> Callable:
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         async def wrapper(request: Request, *args: Any, **kwargs: Any) -> Response:
             provided_password = request.headers.get("x-password", "")
 
             if not provided_password:
-                raise HTTPException(
-                    status_code=HTTP_403_FORBIDDEN,
-                    detail="X-Password header is required",
-                )
+                return PASSWORD_REQUIRED_RESPONSE
+
+            player = None
+            quest = get_quest(request)
+            expected_password = quest.expected_passwords[level - 1]
+
+            if quest.key:
+                player = get_player(request)
+
+                if player is None:
+                    return PLAYER_REQUIRED_RESPONSE
+
+                expected_password = quest.get_password(level, player).encode()
 
-            if provided_password != password:
-                raise HTTPException(
-                    status_code=HTTP_403_FORBIDDEN, detail="X-Password header is wrong"
-                )
+            # Headers are decoded as latin-1, so encoding back gives raw header bytes
+            if not hmac.compare_digest(
+                provided_password.encode("latin-1"), expected_password
+            ):
+                return PASSWORD_WRONG_RESPONSE
+
+            tracker = request.app.state.tracker
+
+            if tracker is not None:
+                tracker.track(request, level, player)
 
             response: Response = await func(request, *args, **kwargs)
 
@@ -31,3 +115,61 @@ def require_password(password: str) -> Callable:
         return wrapper
 
     return decorator
+
+
+def check_rate_limit(
+    request: Request, name: str, tokens: int = 1
+) -> Optional[Response]:
+    """Take tokens of the client, return response if it's over the limit."""
+
+    limiter = request.app.state.rate_limiters.get(name)
+
+    if limiter is not None:
+        wait = limiter.acquire(get_rate_limit_key(request), tokens)
+
+        if wait:
+            return get_rate_limited_response(get_retry_after(wait))
+
+    return None
+
+
+def rate_limit(name: str) -> Callable:
+    """
+    Limit request rate of every client, if limit for the name is configured.
+    Limits apply per worker process, see http_quest.ratelimit.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(request: Request, *args: Any, **kwargs: Any) -> Response:
+            limited = check_rate_limit(request, name)
+
+            if limited is not None:
+                return limited
+
+            response: Response = await func(request, *args, **kwargs)
+
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def require_admin_token(func: Callable) -> Callable:
+    """Allow only requests with X-Admin-Token header equal to ADMIN_TOKEN."""
+
+    @wraps(func)
+    async def wrapper(request: Request, *args: Any, **kwargs: Any) -> Response:
+        token = str(settings.ADMIN_TOKEN).encode("utf-8")
+        provided_token = request.headers.get("x-admin-token", "").encode("latin-1")
+
+        # Empty token would let everybody in, so it's never accepted
+        if not token or not hmac.compare_digest(provided_token, token):
+            return ADMIN_TOKEN_WRONG_RESPONSE
+
+        response: Response = await func(request, *args, **kwargs)
+
+        return response
+
+    return wrapper
@@ -1,12 +1,114 @@
+import os
+
+from starlette.concurrency import run_in_threadpool
 from starlette.requests import Request
-from starlette.responses import PlainTextResponse
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.status import HTTP_400_BAD_REQUEST, HTTP_409_CONFLICT
+
+from .decorators import PLAYER_REQUIRED_RESPONSE, require_admin_token
+from .memory import get_rss
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from .progress import get_player
+from .quests import get_quest
+
+
+async def home(request: Request) -> Response:
+    quest = get_quest(request)
+
+    if not quest.key:
+        return PlainTextResponse(quest.passwords[0])
+
+    player = get_player(request)
+
+    if player is None:
+        return PLAYER_REQUIRED_RESPONSE
+
+    return PlainTextResponse(quest.get_password(1, player))
+
+
+async def robots(request: Request) -> PlainTextResponse:
+    secret = get_quest(request).robots_secret
+
+    return PlainTextResponse(f"User-agent: *\nDisallow:\n\n# {secret}\n")
+
+
+async def metrics(request: Request) -> Response:
+    content = request.app.state.metrics.render()
+
+    return Response(content, headers={"Content-Type": METRICS_CONTENT_TYPE})
+
+
+async def leaderboard(request: Request) -> Response:
+    response: Response = request.app.state.leaderboard.get_response()
+
+    return response
+
+
+async def stats(request: Request) -> JSONResponse:
+    analytics = request.app.state.analytics
+    snapshot = await analytics.get_snapshot()
+
+    return JSONResponse(await run_in_threadpool(analytics.get_stats, snapshot))
+
+
+async def stats_sketch(request: Request) -> Response:
+    """Return raw sketches, which can be merged with sketches of other pods."""
+
+    return Response(
+        await request.app.state.analytics.get_snapshot(),
+        media_type="application/octet-stream",
+    )
+
+
+@require_admin_token
+async def profile(request: Request) -> Response:
+    """Profile this worker for ?seconds=N and return collapsed stacks by route."""
+
+    profiler = request.app.state.profiler
+
+    try:
+        seconds = float(request.query_params.get("seconds", "10"))
+    except ValueError:
+        seconds = 0
+
+    if not 0 < seconds <= profiler.max_seconds:
+        return PlainTextResponse(
+            f"Seconds should be between 0 and {profiler.max_seconds:g}",
+            status_code=HTTP_400_BAD_REQUEST,
+        )
+
+    if profiler.running:
+        return PlainTextResponse(
+            "Profiler is already running", status_code=HTTP_409_CONFLICT
+        )
+
+    stacks = await profiler.profile(seconds)
+
+    return PlainTextResponse(profiler.render(stacks))
+
+
+@require_admin_token
+async def memory(request: Request) -> Response:
+    """
+    Start tracing allocations of this worker on the first call, return growth
+    since the previous call after that. Tracing is stopped with ?stop=1.
+    """
+
+    tracker = request.app.state.memory
 
-from . import passwords, secrets
+    if request.query_params.get("stop"):
+        tracker.stop()
 
+        return JSONResponse({"pid": os.getpid(), "rss": get_rss(), "stopped": True})
 
-async def home(_request: Request) -> PlainTextResponse:
-    return PlainTextResponse(passwords.PLAIN)
+    try:
+        limit = int(request.query_params.get("limit", "20"))
+    except ValueError:
+        return PlainTextResponse(
+            "Limit should be a number", status_code=HTTP_400_BAD_REQUEST
+        )
 
+    # Snapshots of a big heap take a while, comparing them takes even longer
+    report = await run_in_threadpool(tracker.get_report, limit)
 
-async def robots(_request: Request) -> PlainTextResponse:
-    return PlainTextResponse(f"User-agent: *\nDisallow:\n\n# {secrets.ROBOTS}\n")
+    return JSONResponse(report)
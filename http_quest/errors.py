@@ -0,0 +1,253 @@
+"""
+Error reporting to Bugsnag, which never blocks requests.
+
+Request path only puts exception to a bounded queue, if the queue is full the
+exception is dropped and counted. Background thread formats queued exceptions and
+delivers them in batches. Repeated errors with the same fingerprint are sent once
+per dedup window, and every error class may be sampled with its own rate.
+"""
+import json
+import logging
+import queue
+import random
+import threading
+from time import monotonic
+from traceback import extract_tb
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from . import __version__
+
+NOTIFIER = {
+    "name": "http-quest",
+    "version": __version__,
+    "url": "https://github.com/2tunnels/http-quest",
+}
+
+Fingerprint = Tuple[str, str, int]
+Report = Tuple[BaseException, Dict[str, str], int]
+
+logger = logging.getLogger(__name__)
+
+
+def get_fingerprint(exc: BaseException) -> Fingerprint:
+    """Return error class and place, where it was raised."""
+
+    traceback = exc.__traceback__
+
+    while traceback is not None and traceback.tb_next is not None:
+        traceback = traceback.tb_next
+
+    if traceback is None:
+        return type(exc).__qualname__, "", 0
+
+    code = traceback.tb_frame.f_code
+
+    return type(exc).__qualname__, code.co_filename, traceback.tb_lineno
+
+
+class ErrorReporter:
+    def __init__(
+        self,
+        api_key: str,
+        url: str = "https://notify.bugsnag.com",
+        release_stage: str = "production",
+        queue_size: int = 1000,
+        batch_size: int = 50,
+        flush_interval: float = 1.0,
+        dedup_window: float = 60.0,
+        sample_rates: Optional[Dict[str, float]] = None,
+        timeout: float = 5.0,
+    ) -> None:
+        self.api_key = api_key
+        self.url = url
+        self.release_stage = release_stage
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dedup_window = dedup_window
+        self.sample_rates = sample_rates or {}
+        self.timeout = timeout
+        self.queue: "queue.Queue[Optional[Report]]" = queue.Queue(queue_size)
+        self.counters = {
+            "queued": 0,
+            "dropped": 0,
+            "deduplicated": 0,
+            "sampled_out": 0,
+            "sent": 0,
+            "failed": 0,
+        }
+        self._seen: Dict[Fingerprint, List[float]] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def report(self, exc: BaseException, scope: Scope) -> None:
+        """Queue exception for delivery, this is called in request path."""
+
+        rate = self.sample_rates.get(type(exc).__qualname__, 1.0)
+
+        if rate < 1.0 and random.random() >= rate:
+            self.counters["sampled_out"] += 1
+            return
+
+        now = monotonic()
+        fingerprint = get_fingerprint(exc)
+        seen = self._seen.get(fingerprint)
+
+        if seen is not None and now - seen[0] < self.dedup_window:
+            seen[1] += 1
+            self.counters["deduplicated"] += 1
+            return
+
+        duplicates = int(seen[1]) if seen is not None else 0
+        self._remember(fingerprint, now)
+        request = {
+            "httpMethod": scope.get("method", ""),
+            "url": scope.get("path", ""),
+        }
+
+        try:
+            self.queue.put_nowait((exc, request, duplicates))
+        except queue.Full:
+            self.counters["dropped"] += 1
+        else:
+            self.counters["queued"] += 1
+
+    def _remember(self, fingerprint: Fingerprint, now: float) -> None:
+        # Fingerprints are forgotten after dedup window, so the dict stays small
+        if len(self._seen) >= 1000:
+            self._seen = {
+                key: value
+                for key, value in self._seen.items()
+                if now - value[0] < self.dedup_window
+            }
+
+        self._seen[fingerprint] = [now, 0]
+
+    def format(self, report: Report) -> Dict[str, Any]:
+        exc, request, duplicates = report
+        stacktrace = [
+            {"file": frame.filename, "lineNumber": frame.lineno, "method": frame.name}
+            for frame in reversed(extract_tb(exc.__traceback__))
+        ]
+
+        return {
+            "exceptions": [
+                {
+                    "errorClass": type(exc).__qualname__,
+                    "message": str(exc),
+                    "stacktrace": stacktrace,
+                }
+            ],
+            "context": request["url"],
+            "severity": "error",
+            "unhandled": True,
+            "severityReason": {"type": "unhandledException"},
+            "app": {"version": __version__, "releaseStage": self.release_stage},
+            "request": request,
+            "metaData": {"deduplication": {"suppressed_duplicates": duplicates}},
+        }
+
+    def send(self, reports: List[Report]) -> None:
+        # Imported here, because it's slow to import and used only in the thread
+        import urllib.request
+
+        payload = {
+            "apiKey": self.api_key,
+            "payloadVersion": "5",
+            "notifier": NOTIFIER,
+            "events": [self.format(report) for report in reports],
+        }
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(payload).encode("utf-8"),
+            headers={
+                "Content-Type": "application/json",
+                "Bugsnag-Api-Key": self.api_key,
+                "Bugsnag-Payload-Version": "5",
+            },
+            method="POST",
+        )
+
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout):
+                pass
+        except OSError:
+            self.counters["failed"] += len(reports)
+            logger.warning("Failed to deliver %d error reports", len(reports))
+        else:
+            self.counters["sent"] += len(reports)
+
+    def _deliver(self) -> None:
+        while True:
+            report = self.queue.get()
+
+            if report is None:
+                return
+
+            # Batch collects reports for up to flush interval after the first one
+            reports = [report]
+            deadline = monotonic() + self.flush_interval
+
+            while len(reports) < self.batch_size:
+                try:
+                    report = self.queue.get(timeout=max(0.0, deadline - monotonic()))
+                except queue.Empty:
+                    break
+
+                if report is None:
+                    self.send(reports)
+                    return
+
+                reports.append(report)
+
+            self.send(reports)
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._deliver, name="error-reporter", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Deliver queued reports and stop the thread."""
+
+        if self._thread is None:
+            return
+
+        # Reports queued before the sentinel are sent before the thread stops
+        try:
+            self.queue.put(None, timeout=self.timeout)
+        except queue.Full:
+            pass
+
+        self._thread.join(self.timeout * 2)
+        self._thread = None
+
+    def collect(self) -> List[str]:
+        """Return counters in Prometheus format for /metrics."""
+
+        lines = [
+            "# HELP error_reports_total Error reports by outcome.",
+            "# TYPE error_reports_total counter",
+        ]
+        lines.extend(
+            f'error_reports_total{{outcome="{outcome}"}} {count}'
+            for outcome, count in self.counters.items()
+        )
+
+        return lines
+
+
+class ErrorReportingMiddleware:
+    """Pure ASGI middleware, which reports unhandled exceptions and re-raises them."""
+
+    def __init__(self, app: ASGIApp, reporter: ErrorReporter) -> None:
+        self.app = app
+        self.reporter = reporter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.app(scope, receive, send)
+        except Exception as exc:
+            self.reporter.report(exc, scope)
+            raise
@@ -0,0 +1,164 @@
+"""
+Parsing of Accept-Language and User-Agent headers.
+
+Almost all traffic comes with a handful of distinct header values, so parsed
+values are kept in LRU caches keyed by raw header bytes. Long values are parsed
+every time, so a client can't fill caches with huge keys.
+"""
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from starlette.types import Scope
+
+from . import settings
+from .utils import LRUCache
+
+MAX_CACHED_LENGTH = 512
+
+# RFC 4647 language range and RFC 7231 weight, like "en-US" or "*" and ";q=0.5"
+_LANGUAGE_RANGE = re.compile(r"(?:[a-z]{1,8}(?:-[a-z0-9]{1,8})*|\*)", re.IGNORECASE)
+_WEIGHT = re.compile(r"q=(?:0(?:\.[0-9]{0,3})?|1(?:\.0{0,3})?)", re.IGNORECASE)
+_COMMENT = re.compile(r"\(([^()]*)\)")
+_MSIE = re.compile(r"msie (\d+)\.\d+\w*", re.IGNORECASE)
+# Bare token outside comments, like "MSIE 6.0" set by curl -A
+_MSIE_TOKEN = re.compile(r"(?<!\S)msie (\d+)\.\d+\w*(?!\S)")
+
+Languages = Tuple[Tuple[str, float], ...]
+
+
+class UserAgent(NamedTuple):
+    browser: str
+    major_version: int = 0
+
+
+def parse_accept_language(value: str) -> Languages:
+    """
+    Return language ranges with their weights, the most preferred first.
+    Invalid items are skipped, as if they weren't sent.
+    """
+
+    languages: List[Tuple[str, float]] = []
+
+    for item in value.split(","):
+        language, *parameters = (part.strip() for part in item.split(";"))
+        weight = 1.0
+
+        if not _LANGUAGE_RANGE.fullmatch(language):
+            continue
+
+        if parameters:
+            if len(parameters) > 1 or not _WEIGHT.fullmatch(parameters[0]):
+                continue
+
+            weight = float(parameters[0][2:])
+
+        languages.append((language.lower(), weight))
+
+    # Sort is stable, so ranges of the same weight keep their order
+    languages.sort(key=lambda item: item[1], reverse=True)
+
+    return tuple(languages)
+
+
+def is_language_accepted(languages: Languages, language: str) -> bool:
+    """Check that language is explicitly acceptable, weight of 0 means it isn't."""
+
+    return any(
+        weight > 0 and language_range.split("-")[0] == language
+        for language_range, weight in languages
+    )
+
+
+def parse_user_agent(value: str) -> UserAgent:
+    """
+    Recognise Internet Explorer and Opera, which pretends to be it.
+    MSIE version is found in a comment or in a bare token, like "MSIE 6.0".
+    """
+
+    products = " ".join(_COMMENT.sub(" ", value).lower().split())
+
+    if any(product.split("/")[0] == "opera" for product in products.split()):
+        return UserAgent("opera")
+
+    for comment in _COMMENT.findall(value):
+        for item in comment.split(";"):
+            match = _MSIE.fullmatch(item.strip())
+
+            if match:
+                return UserAgent("msie", int(match.group(1)))
+
+    match = _MSIE_TOKEN.search(products)
+
+    if match:
+        return UserAgent("msie", int(match.group(1)))
+
+    return UserAgent("other")
+
+
+def get_raw_header(scope: Scope, name: bytes) -> bytes:
+    for key, value in scope["headers"]:
+        if key == name:
+            raw: bytes = value
+            return raw
+
+    return b""
+
+
+_languages: LRUCache[bytes, Languages] = LRUCache(settings.HEADER_CACHE_SIZE)
+_user_agents: LRUCache[bytes, UserAgent] = LRUCache(settings.HEADER_CACHE_SIZE)
+
+
+def get_languages(scope: Scope) -> Languages:
+    raw = get_raw_header(scope, b"accept-language")
+
+    if len(raw) > MAX_CACHED_LENGTH:
+        return parse_accept_language(raw.decode("latin-1"))
+
+    languages = _languages.get(raw)
+
+    if languages is None:
+        languages = parse_accept_language(raw.decode("latin-1"))
+        _languages.set(raw, languages)
+
+    return languages
+
+
+def get_user_agent(scope: Scope) -> UserAgent:
+    raw = get_raw_header(scope, b"user-agent")
+
+    if len(raw) > MAX_CACHED_LENGTH:
+        return parse_user_agent(raw.decode("latin-1"))
+
+    user_agent: Optional[UserAgent] = _user_agents.get(raw)
+
+    if user_agent is None:
+        user_agent = parse_user_agent(raw.decode("latin-1"))
+        _user_agents.set(raw, user_agent)
+
+    return user_agent
+
+
+def collect() -> List[str]:
+    """Return hits and misses of parse caches in Prometheus format for /metrics."""
+
+    lines = [
+        "# HELP header_cache_requests_total Header parse cache lookups by result.",
+        "# TYPE header_cache_requests_total counter",
+    ]
+
+    caches: Dict[str, "LRUCache[bytes, Any]"] = {
+        "accept-language": _languages,
+        "user-agent": _user_agents,
+    }
+
+    for header, cache in caches.items():
+        lines.append(
+            f'header_cache_requests_total{{header="{header}",result="hit"}} '
+            f"{cache.hits}"
+        )
+        lines.append(
+            f'header_cache_requests_total{{header="{header}",result="miss"}} '
+            f"{cache.misses}"
+        )
+
+    return lines
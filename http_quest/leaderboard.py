@@ -0,0 +1,169 @@
+"""
+Leaderboard of the fastest quest completions.
+
+Results are kept sorted all the time, new result is put in place with binary
+search. Endpoint serves pre-serialised snapshot of the top, which is rebuilt only
+if the top has changed and not more often than once per refresh interval.
+
+Every worker has its own leaderboard, completions seen by the worker are added
+at once, and completions stored by other workers in the shared progress database
+are added periodically, only the ones stored since the previous sync.
+"""
+import asyncio
+import hashlib
+import logging
+from bisect import bisect_left
+from time import monotonic
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+
+from .responses import CachedResponse
+
+if TYPE_CHECKING:
+    from .progress import ProgressStore
+
+logger = logging.getLogger(__name__)
+
+Result = Tuple[float, str]
+
+
+def get_player_name(player: str) -> str:
+    """Return public name of a player, tokens are secret, so only hash is shown."""
+
+    return hashlib.sha256(player.encode("utf-8")).hexdigest()[:8]
+
+
+class Leaderboard:
+    def __init__(
+        self,
+        size: int = 10,
+        refresh_interval: float = 5.0,
+        clock: Callable[[], float] = monotonic,
+    ) -> None:
+        self.size = size
+        self.refresh_interval = refresh_interval
+        self.clock = clock
+        self.results: List[Result] = []
+        self.best: Dict[str, float] = {}
+        self.rebuilds = 0
+        self._is_changed = False
+        self._built_at = float("-inf")
+        self._response: Response = self._render()
+
+    def add(self, player: str, seconds: float) -> None:
+        """Add completion time, only the best result of a player is kept."""
+
+        best = self.best.get(player)
+
+        if best is not None:
+            if seconds >= best:
+                return
+
+            del self.results[bisect_left(self.results, (best, player))]
+
+        self.best[player] = seconds
+        index = bisect_left(self.results, (seconds, player))
+        self.results.insert(index, (seconds, player))
+
+        # Better result never moves down, so top changes only if it lands there
+        if index < self.size:
+            self._is_changed = True
+
+    def load(self, results: Iterable[Tuple[str, float]]) -> None:
+        """Add many results, empty leaderboard is filled by a single sort."""
+
+        if self.results:
+            for player, seconds in results:
+                self.add(player, seconds)
+            return
+
+        for player, seconds in results:
+            if seconds < self.best.get(player, float("inf")):
+                self.best[player] = seconds
+
+        self.results = sorted(
+            (seconds, player) for player, seconds in self.best.items()
+        )
+        self._is_changed = bool(self.results)
+
+    def top(self) -> List[Result]:
+        return self.results[: self.size]
+
+    def _render(self) -> Response:
+        return CachedResponse(
+            JSONResponse(
+                {
+                    "leaderboard": [
+                        {
+                            "rank": rank,
+                            "player": get_player_name(player),
+                            "seconds": round(seconds, 3),
+                        }
+                        for rank, (seconds, player) in enumerate(self.top(), 1)
+                    ]
+                }
+            )
+        )
+
+    def get_response(self) -> Response:
+        now = self.clock()
+
+        if self._is_changed and now - self._built_at >= self.refresh_interval:
+            self._response = self._render()
+            self._is_changed = False
+            self._built_at = now
+            self.rebuilds += 1
+
+        return self._response
+
+
+class LeaderboardSync:
+    """Adds completions, which workers stored since the last sync, to leaderboard."""
+
+    def __init__(
+        self,
+        leaderboard: Leaderboard,
+        progress: "ProgressStore",
+        interval: float = 10.0,
+        first_level: int = 1,
+        last_level: int = 12,
+    ) -> None:
+        self.leaderboard = leaderboard
+        self.progress = progress
+        self.interval = interval
+        self.first_level = first_level
+        self.last_level = last_level
+        # Row id of progress, after which completions weren't loaded yet
+        self.last_row = 0
+        self._task: Optional["asyncio.Future[None]"] = None
+
+    async def sync(self) -> None:
+        completions, self.last_row = await run_in_threadpool(
+            self.progress.load_completions,
+            self.first_level,
+            self.last_level,
+            self.last_row,
+        )
+        self.leaderboard.load(completions)
+
+    async def _sync_periodically(self) -> None:
+        import sqlite3
+
+        while True:
+            await asyncio.sleep(self.interval)
+
+            try:
+                await self.sync()
+            except sqlite3.Error:
+                logger.exception("Failed to load leaderboard")
+
+    async def start(self) -> None:
+        await self.sync()
+        self._task = asyncio.ensure_future(self._sync_periodically())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -1,60 +1,110 @@
-from json import JSONDecodeError
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
 
-from marshmallow import ValidationError
 from starlette import status
 from starlette.exceptions import HTTPException
 from starlette.requests import Request
-from starlette.responses import JSONResponse, RedirectResponse, Response
+from starlette.responses import JSONResponse, Response
 
-from . import passwords, secrets
-from .decorators import require_password
-from .responses import FinishResponse, PasswordResponse
-from .schemas import Level8Schema, SecretSchema
-from .utils import add_query_params, base64_encode, get_masked_password
+from .body import read_json
+from .decorators import check_rate_limit, rate_limit, require_password
+from .headers import UserAgent, get_languages, get_user_agent, is_language_accepted
+from .progress import get_player
+from .quests import RENDERERS, get_quest
+from .redirects import get_redirect_response
+from .responses import CachedResponse, FinishResponse, PasswordResponse
+from .utils import get_masked_password, get_masked_passwords
 
+if TYPE_CHECKING:
+    from .validators import Errors, Validator
 
-@require_password(passwords.PLAIN)
-async def plain(_request: Request) -> Response:
+
+INTERNET_EXPLORER_6 = UserAgent("msie", 6)
+
+# Other success responses have passwords, so they are rendered for every quest
+FINISH_RESPONSE = CachedResponse(FinishResponse())
+
+
+def lazy_validator(schema_name: str) -> "Validator":
+    """
+    Return validator, which compiles schema from http_quest.schemas on first call.
+    Marshmallow is a large share of startup time, so it's imported only when needed.
+    """
+
+    validator: Optional["Validator"] = None
+
+    def validate(body: Any) -> Tuple[Dict[str, Any], "Errors"]:
+        nonlocal validator
+
+        if validator is None:
+            from . import schemas
+            from .validators import compile_schema
+
+            validator = compile_schema(getattr(schemas, schema_name))
+
+        return validator(body)
+
+    return validate
+
+
+validate_secret = lazy_validator("SecretSchema")
+validate_number = lazy_validator("Level8Schema")
+validate_secrets = lazy_validator("SecretsSchema")
+
+
+def password_response(request: Request, level: int) -> Response:
+    """
+    Return pre-rendered response of the quest with password for the next level,
+    or render a new one, if passwords are derived for players.
+    """
+
+    quest = get_quest(request)
+
+    if not quest.key:
+        return quest.responses[level - 1]
+
+    return RENDERERS[level - 1](quest.get_password(level + 1, get_player(request)))
+
+
+@require_password(1)
+async def plain(request: Request) -> Response:
     """Return plain password."""
 
-    return PasswordResponse(passwords.REVERSE)
+    return password_response(request, 1)
 
 
-@require_password(passwords.REVERSE)
-async def reverse(_request: Request) -> Response:
+@require_password(2)
+async def reverse(request: Request) -> Response:
     """Return reversed password."""
 
-    return PasswordResponse(passwords.BASE64[::-1], key="password"[::-1])
+    return password_response(request, 2)
 
 
-@require_password(passwords.BASE64)
-async def base64(_request: Request) -> Response:
+@require_password(3)
+async def base64(request: Request) -> Response:
     """Return base64 encoded password."""
 
-    return PasswordResponse(base64_encode(passwords.HEADERS))
+    return password_response(request, 3)
 
 
-@require_password(passwords.HEADERS)
-async def header(_request: Request) -> Response:
+@require_password(4)
+async def header(request: Request) -> Response:
     """Return fake password in body and real one in header."""
 
-    return PasswordResponse("qwerty", headers={"X-Real-Password": passwords.DELETE})
+    return password_response(request, 4)
 
 
-@require_password(passwords.DELETE)
-async def delete(_request: Request) -> Response:
+@require_password(5)
+async def delete(request: Request) -> Response:
     """Return plain password. Endpoint will be available only for DELETE method."""
 
-    return PasswordResponse(passwords.USER_AGENT)
+    return password_response(request, 5)
 
 
-@require_password(passwords.USER_AGENT)
+@require_password(6)
 async def user_agent(request: Request) -> Response:
     """Return plain password for users with Internet Explorer 6 user agent."""
 
-    user_agent_header = request.headers.get("user-agent", "").lower()
-
-    if "msie 6.0" not in user_agent_header:
+    if get_user_agent(request.scope) != INTERNET_EXPLORER_6:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=(
@@ -63,123 +113,145 @@ async def user_agent(request: Request) -> Response:
             ),
         )
 
-    return PasswordResponse(passwords.ACCEPT_LANGUAGE)
+    return password_response(request, 6)
 
 
-@require_password(passwords.ACCEPT_LANGUAGE)
+@require_password(7)
 async def accept_language(request: Request) -> Response:
     """Return plain password only for russian Accept-Language header."""
 
-    accept_language_header = request.headers.get("accept-language", "").lower()
-
-    if "ru" not in accept_language_header:
+    if not is_language_accepted(get_languages(request.scope), "ru"):
         raise HTTPException(
             status_code=status.HTTP_406_NOT_ACCEPTABLE,
             detail="Я говорю только по русски, товарищ.",
         )
 
-    return PasswordResponse(passwords.REDIRECT, key="пароль")
+    return password_response(request, 7)
 
 
-@require_password(passwords.REDIRECT)
+@require_password(8)
 async def redirect(request: Request) -> Response:
     """Return plain password if user follows redirect chain."""
 
-    url = request.url_for("level:redirect")
     secret = request.query_params.get("secret", "")
+    redirect_chain = get_quest(request).redirect_chain
 
     # If secret is not given, use first secret in redirect chain
     if not secret:
-        return RedirectResponse(add_query_params(url, secret=secrets.REDIRECT[0]))
+        return get_redirect_response(request, redirect_chain.first)
 
     try:
-        index = secrets.REDIRECT.index(secret)
-    except ValueError:
+        next_secret = redirect_chain.get_next_secret(secret)
+    except KeyError:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Secret is wrong."
         )
 
-    try:
-        next_secret = secrets.REDIRECT[index + 1]
-    except IndexError:
-        return PasswordResponse(passwords.ROBOTS)
+    if next_secret is None:
+        return password_response(request, 8)
 
-    return RedirectResponse(add_query_params(url, secret=next_secret))
+    return get_redirect_response(request, next_secret)
 
 
-@require_password(passwords.ROBOTS)
+@require_password(9)
 async def robots(request: Request) -> Response:
-    try:
-        body = await request.json()
-    except JSONDecodeError:
-        body = {}
+    body = await read_json(request)
 
-    schema = SecretSchema()
+    data, errors = validate_secret(body)
 
-    try:
-        data = schema.load(body)
-    except ValidationError as exc:
-        return JSONResponse(
-            {"errors": exc.messages}, status_code=status.HTTP_400_BAD_REQUEST
-        )
+    if errors:
+        return JSONResponse({"errors": errors}, status_code=status.HTTP_400_BAD_REQUEST)
 
-    if data["secret"] != secrets.ROBOTS:
+    if data["secret"] != get_quest(request).robots_secret:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Secret is wrong, human."
         )
 
-    return PasswordResponse(passwords.GUESS_NUMBER)
+    return password_response(request, 9)
 
 
-@require_password(passwords.GUESS_NUMBER)
+@rate_limit("level:guess_number")
+@require_password(10)
 async def guess_number(request: Request) -> Response:
     """Return plain password for users who guessed the secret number."""
 
-    try:
-        body = await request.json()
-    except JSONDecodeError:
-        body = {}
+    body = await read_json(request)
 
-    schema = Level8Schema()
+    data, errors = validate_number(body)
 
-    try:
-        data = schema.load(body)
-    except ValidationError as exc:
-        return JSONResponse(
-            {"errors": exc.messages}, status_code=status.HTTP_400_BAD_REQUEST
-        )
+    if errors:
+        return JSONResponse({"errors": errors}, status_code=status.HTTP_400_BAD_REQUEST)
 
     if data["number"] != 372:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Number is wrong."
         )
 
-    return JSONResponse({"password": passwords.MASK})
+    return password_response(request, 10)
 
 
-@require_password(passwords.MASK)
+@rate_limit("level:mask")
+@require_password(11)
 async def mask(request: Request) -> Response:
-    """Return masked password, based on correctness of given secret."""
+    """
+    Return masked password, based on correctness of given secret.
+    Many secrets can be checked at once, if list of secrets is given.
+    """
 
-    try:
-        body = await request.json()
-    except JSONDecodeError:
-        body = {}
+    body = await read_json(request)
+    quest = get_quest(request)
+    password = quest.get_password(12, get_player(request))
 
-    schema = SecretSchema()
+    if isinstance(body, dict) and "secrets" in body:
+        data, errors = validate_secrets(body)
+
+        if errors:
+            return JSONResponse(
+                {"errors": errors}, status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Every secret is a guess, the request itself has paid for the first one
+        limited = check_rate_limit(request, "level:mask", len(data["secrets"]) - 1)
+
+        if limited is not None:
+            return limited
 
-    try:
-        data = schema.load(body)
-    except ValidationError as exc:
         return JSONResponse(
-            {"errors": exc.messages}, status_code=status.HTTP_400_BAD_REQUEST
+            {
+                "passwords": get_masked_passwords(
+                    password, quest.mask_secret, data["secrets"]
+                )
+            }
         )
 
+    data, errors = validate_secret(body)
+
+    if errors:
+        return JSONResponse({"errors": errors}, status_code=status.HTTP_400_BAD_REQUEST)
+
     return PasswordResponse(
-        get_masked_password(passwords.FINISH, secrets.MASK, data["secret"])
+        get_masked_password(password, quest.mask_secret, data["secret"])
     )
 
 
-@require_password(passwords.FINISH)
+@require_password(12)
 async def finish(request: Request) -> Response:
-    return FinishResponse()
+    leaderboard = request.app.state.leaderboard
+
+    # Player is parsed only if there is a leaderboard, finish is a hot path
+    if leaderboard is None:
+        return FINISH_RESPONSE
+
+    player = get_player(request)
+
+    # Only progress in memory is used, completions through several workers are
+    # added by leaderboard sync, so finish never waits for the database
+    if player is not None:
+        progress = request.app.state.progress
+        started = progress.get_first_visit(player, 1)
+        finished = progress.get_first_visit(player, 12)
+
+        if started is not None and finished is not None:
+            leaderboard.add(player, finished - started)
+
+    return FINISH_RESPONSE
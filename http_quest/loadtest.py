@@ -0,0 +1,492 @@
+"""
+Load generator, which plays the whole quest with many concurrent virtual players.
+
+    python -m http_quest.loadtest --players 5000 --concurrency 200
+    python -m http_quest.loadtest --url http://127.0.0.1:8000 --players 1000
+
+Without --url application is called in-process through ASGI, otherwise requests
+are sent over keep-alive HTTP/1.1 connections, one per player.
+"""
+import argparse
+import asyncio
+import json
+import string
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from uuid import uuid4
+
+from starlette.applications import Starlette
+from starlette.types import ASGIApp, Message
+
+from .utils import base64_decode
+
+IE6_USER_AGENT = "Mozilla/4.0 (compatible; MSIE 6.0; Windows NT 5.1; SV1)"
+MASK_ALPHABET = string.ascii_letters + string.digits
+
+
+@dataclass
+class Response:
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+    @property
+    def text(self) -> str:
+        return self.body.decode("utf-8")
+
+
+class Client(ABC):
+    @abstractmethod
+    async def request(
+        self,
+        method: str,
+        path: str,
+        headers: Optional[Dict[str, str]] = None,
+        body: bytes = b"",
+    ) -> Response:
+        """Send request and return response with the whole body."""
+
+    async def close(self) -> None:
+        pass
+
+
+class ASGIClient(Client):
+    """Client, which calls ASGI application directly without network."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        headers: Optional[Dict[str, str]] = None,
+        body: bytes = b"",
+    ) -> Response:
+        path, _, query_string = path.partition("?")
+        raw_headers = [(b"host", b"testserver")] + [
+            (key.lower().encode("latin-1"), value.encode("latin-1"))
+            for key, value in (headers or {}).items()
+        ]
+        scope = {
+            "type": "http",
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "server": ("testserver", 80),
+            "client": ("127.0.0.1", 50000),
+            "root_path": "",
+            "path": path,
+            "raw_path": path.encode("latin-1"),
+            "query_string": query_string.encode("latin-1"),
+            "headers": raw_headers,
+        }
+        status = 500
+        response_headers: Dict[str, str] = {}
+        chunks: List[bytes] = []
+        request_complete = False
+
+        async def receive() -> Message:
+            nonlocal request_complete
+
+            if request_complete:
+                # Wait forever, like server does while connection is open
+                await asyncio.Future()
+
+            request_complete = True
+
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message: Message) -> None:
+            nonlocal status
+
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for key, value in message.get("headers", []):
+                    response_headers[key.decode("latin-1")] = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+
+        return Response(status, response_headers, b"".join(chunks))
+
+
+class HTTPClient(Client):
+    """Minimal HTTP/1.1 client with a single keep-alive connection."""
+
+    def __init__(self, url: str) -> None:
+        parts = urlsplit(url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.host_header = parts.netloc
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        headers: Optional[Dict[str, str]] = None,
+        body: bytes = b"",
+    ) -> Response:
+        if self.reader is None or self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host_header}"]
+        lines += [f"{key}: {value}" for key, value in (headers or {}).items()]
+        lines.append(f"Content-Length: {len(body)}")
+        head = "\r\n".join(lines) + "\r\n\r\n"
+        self.writer.write(head.encode("latin-1") + body)
+
+        response = await read_response(self.reader)
+
+        if response.headers.get("connection", "").lower() == "close":
+            await self.close()
+
+        return response
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def read_response(reader: asyncio.StreamReader) -> Response:
+    """Read HTTP/1.1 response with either Content-Length or chunked body."""
+
+    head = await reader.readuntil(b"\r\n\r\n")
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    status = int(status_line.split(" ", 2)[1])
+    headers = {}
+
+    for line in header_lines:
+        if line:
+            key, _, value = line.partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks = []
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            chunk = await reader.readexactly(size + 2)
+            if size == 0:
+                break
+            chunks.append(chunk[:-2])
+        body = b"".join(chunks)
+    else:
+        body = await reader.readexactly(int(headers.get("content-length", "0")))
+
+    return Response(status, headers, body)
+
+
+class PlayerError(Exception):
+    pass
+
+
+@dataclass
+class Stats:
+    latencies: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
+    completed: int = 0
+    failed: int = 0
+    errors: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+
+class Player:
+    """Virtual player, which walks through all levels the same way tests do."""
+
+    def __init__(
+        self,
+        client: Client,
+        stats: Stats,
+        batch_mask: bool = False,
+        token: Optional[str] = None,
+    ):
+        self.client = client
+        self.stats = stats
+        self.batch_mask = batch_mask
+        self.token = token
+
+    async def request(
+        self,
+        name: str,
+        method: str,
+        path: str,
+        password: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
+        json_body: Any = None,
+        expected_status: Optional[int] = 200,
+    ) -> Response:
+        headers = dict(headers or {})
+        body = b""
+
+        if password is not None:
+            headers["X-Password"] = password
+
+        if self.token is not None:
+            headers["X-Player-Token"] = self.token
+
+        if json_body is not None:
+            headers["Content-Type"] = "application/json"
+            body = json.dumps(json_body).encode("utf-8")
+
+        started_at = time.perf_counter()
+        response = await self.client.request(method, path, headers, body)
+        self.stats.latencies[name].append(time.perf_counter() - started_at)
+
+        if expected_status is not None and response.status != expected_status:
+            raise PlayerError(f"{name} returned {response.status}")
+
+        return response
+
+    async def play(self) -> None:
+        password = (await self.request("home", "GET", "/")).text
+
+        response = await self.request("level:plain", "GET", "/level/1", password)
+        password = response.json()["password"]
+
+        response = await self.request("level:reverse", "GET", "/level/2", password)
+        password = response.json()["drowssap"][::-1]
+
+        response = await self.request("level:base64", "GET", "/level/3", password)
+        password = base64_decode(response.json()["password"])
+
+        response = await self.request("level:header", "GET", "/level/4", password)
+        password = response.headers["x-real-password"]
+
+        response = await self.request("level:delete", "DELETE", "/level/5", password)
+        password = response.json()["password"]
+
+        response = await self.request(
+            "level:user_agent",
+            "GET",
+            "/level/6",
+            password,
+            headers={"User-Agent": IE6_USER_AGENT},
+        )
+        password = response.json()["password"]
+
+        response = await self.request(
+            "level:accept_language",
+            "GET",
+            "/level/7",
+            password,
+            headers={"Accept-Language": "ru"},
+        )
+        password = response.json()["пароль"]
+
+        password = await self.play_redirect(password)
+
+        response = await self.request("robots", "GET", "/robots.txt")
+        secret = response.text.rstrip().rsplit("# ", 1)[1]
+        response = await self.request(
+            "level:robots", "POST", "/level/9", password, json_body={"secret": secret}
+        )
+        password = response.json()["password"]
+
+        password = await self.play_guess_number(password)
+        password = await self.play_mask(password)
+
+        await self.request("level:finish", "GET", "/level/12", password)
+
+    async def play_redirect(self, password: str) -> str:
+        path = "/level/8"
+
+        while True:
+            response = await self.request(
+                "level:redirect", "GET", path, password, expected_status=None
+            )
+
+            if response.status == 200:
+                return str(response.json()["password"])
+
+            if response.status not in (301, 302, 303, 307, 308):
+                raise PlayerError(f"level:redirect returned {response.status}")
+
+            location = urlsplit(response.headers["location"])
+            path = f"{location.path}?{location.query}"
+
+    async def play_guess_number(self, password: str) -> str:
+        for number in range(1, 1001):
+            response = await self.request(
+                "level:guess_number",
+                "POST",
+                "/level/10",
+                password,
+                json_body={"number": number},
+                expected_status=None,
+            )
+
+            if response.status == 200:
+                return str(response.json()["password"])
+
+        raise PlayerError("level:guess_number has no right number")
+
+    async def play_mask(self, password: str) -> str:
+        """Unmask password by sending secrets made of a single repeated character."""
+
+        # Empty secret shows how long the password is
+        response = await self.request(
+            "level:mask", "POST", "/level/11", password, json_body={"secret": ""}
+        )
+        length = len(response.json()["password"])
+        candidates = [character * length for character in MASK_ALPHABET]
+        unmasked = ["*"] * length
+
+        if self.batch_mask:
+            response = await self.request(
+                "level:mask",
+                "POST",
+                "/level/11",
+                password,
+                json_body={"secrets": candidates},
+            )
+            for masked_password in response.json()["passwords"]:
+                _merge_masked(unmasked, masked_password)
+        else:
+            for candidate in candidates:
+                response = await self.request(
+                    "level:mask",
+                    "POST",
+                    "/level/11",
+                    password,
+                    json_body={"secret": candidate},
+                )
+                if "*" not in _merge_masked(unmasked, response.json()["password"]):
+                    break
+
+        if "*" in unmasked:
+            raise PlayerError("level:mask can't be unmasked")
+
+        return "".join(unmasked)
+
+
+def _merge_masked(unmasked: List[str], masked_password: str) -> List[str]:
+    for index, character in enumerate(masked_password):
+        if character != "*":
+            unmasked[index] = character
+
+    return unmasked
+
+
+async def run(
+    client_factory: Callable[[], Client],
+    players: int,
+    concurrency: int,
+    batch_mask: bool = False,
+) -> Tuple[Stats, float]:
+    stats = Stats()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def play() -> None:
+        async with semaphore:
+            client: Client = client_factory()
+            try:
+                player = Player(client, stats, batch_mask=batch_mask, token=uuid4().hex)
+                await player.play()
+            except (PlayerError, OSError, ValueError, KeyError) as exc:
+                stats.failed += 1
+                stats.errors[type(exc).__name__ + ": " + str(exc)] += 1
+            else:
+                stats.completed += 1
+            finally:
+                await client.close()
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(play() for _ in range(players)))
+
+    return stats, time.perf_counter() - started_at
+
+
+async def run_in_process(
+    app: Starlette, players: int, concurrency: int, batch_mask: bool = False
+) -> Tuple[Stats, float]:
+    """Run players against application in-process, like server does with lifespan."""
+
+    def client_factory() -> Client:
+        return ASGIClient(app)
+
+    await app.router.startup()
+    try:
+        return await run(client_factory, players, concurrency, batch_mask)
+    finally:
+        await app.router.shutdown()
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """Return percentile of sorted values using nearest rank."""
+
+    index = max(0, min(len(values) - 1, int(round(percent / 100 * len(values))) - 1))
+
+    return values[index]
+
+
+def report(stats: Stats, elapsed: float) -> str:
+    requests = sum(len(latencies) for latencies in stats.latencies.values())
+    lines = [
+        f"players: {stats.completed} completed, {stats.failed} failed "
+        f"in {elapsed:.2f}s",
+        f"throughput: {stats.completed / elapsed:.1f} playthroughs/s, "
+        f"{requests / elapsed:.0f} requests/s",
+        "",
+        f"{'route':<24} {'requests':>9} {'p50, ms':>9} {'p95, ms':>9} {'p99, ms':>9}",
+    ]
+
+    for name, latencies in stats.latencies.items():
+        values = sorted(latencies)
+        lines.append(
+            f"{name:<24} {len(values):>9}"
+            + "".join(
+                f" {percentile(values, percent) * 1000:>9.2f}"
+                for percent in (50, 95, 99)
+            )
+        )
+
+    for error, count in stats.errors.items():
+        lines.append(f"error: {error} ({count})")
+
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m http_quest.loadtest")
+    parser.add_argument("--players", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument(
+        "--url", help="base URL of running server, application is called in-process"
+    )
+    parser.add_argument(
+        "--batch-mask",
+        action="store_true",
+        help="send all level 11 candidates in a single request",
+    )
+    args = parser.parse_args()
+
+    if args.url:
+
+        def client_factory() -> Client:
+            return HTTPClient(args.url)
+
+        stats, elapsed = asyncio.run(
+            run(client_factory, args.players, args.concurrency, args.batch_mask)
+        )
+    else:
+        from .asgi import application
+
+        stats, elapsed = asyncio.run(
+            run_in_process(application, args.players, args.concurrency, args.batch_mask)
+        )
+    print(report(stats, elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Memory snapshots of a long-running worker.
+
+Tracing allocations slows everything down, so tracemalloc is started only by the
+first request to the admin endpoint. Every next request takes a snapshot and
+compares it with the previous one. Growth is grouped by the innermost http_quest
+module in the allocation traceback, so memory allocated by libraries on behalf
+of a level is attributed to the level. Allocations, which don't come from
+http_quest, are grouped by top-level package.
+"""
+import os
+import sys
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+PACKAGE = __name__.split(".")[0]
+FILTERS = [
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+    tracemalloc.Filter(False, tracemalloc.__file__),
+]
+
+
+def get_rss() -> Optional[int]:
+    """Return resident set size of this process in bytes, None if it's unknown."""
+
+    try:
+        with open("/proc/self/statm") as file:
+            resident_pages = int(file.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def get_module_names() -> Dict[str, str]:
+    """Return module names by file names of all loaded modules."""
+
+    return {
+        module.__file__: name
+        for name, module in list(sys.modules.items())
+        if getattr(module, "__file__", None)
+    }
+
+
+def get_group(traceback: tracemalloc.Traceback, module_names: Dict[str, str]) -> str:
+    # Frames are sorted from the oldest, so the innermost one is the last
+    for frame in reversed(traceback):
+        name = module_names.get(frame.filename)
+
+        if name is not None and name.split(".")[0] == PACKAGE:
+            return name
+
+    filename = traceback[-1].filename
+    name = module_names.get(filename)
+
+    return name.split(".")[0] if name is not None else filename
+
+
+class MemoryTracker:
+    def __init__(self, frames: int = 10) -> None:
+        self.frames = frames
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def take_snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(FILTERS)
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+        self.snapshot = self.take_snapshot()
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        self.snapshot = None
+
+    def diff(self, limit: int = 20) -> Dict[str, Any]:
+        """Compare new snapshot with the previous one, which it replaces."""
+
+        if self.snapshot is None:
+            raise RuntimeError("Tracing is not started.")
+
+        snapshot = self.take_snapshot()
+        module_names = get_module_names()
+        groups: Dict[str, List[int]] = {}
+
+        for stat in snapshot.compare_to(self.snapshot, "traceback"):
+            group = groups.setdefault(get_group(stat.traceback, module_names), [0] * 4)
+            group[0] += stat.size_diff
+            group[1] += stat.count_diff
+            group[2] += stat.size
+            group[3] += stat.count
+
+        sites = snapshot.compare_to(self.snapshot, "lineno")[:limit]
+        self.snapshot = snapshot
+        modules = sorted(groups.items(), key=lambda item: item[1][0], reverse=True)
+
+        return {
+            "modules": [
+                {
+                    "module": name,
+                    "size_diff": size_diff,
+                    "count_diff": count_diff,
+                    "size": size,
+                    "count": count,
+                }
+                for name, (size_diff, count_diff, size, count) in modules[:limit]
+            ],
+            "sites": [
+                {
+                    "file": stat.traceback[-1].filename,
+                    "line": stat.traceback[-1].lineno,
+                    "size_diff": stat.size_diff,
+                    "count_diff": stat.count_diff,
+                    "size": stat.size,
+                    "count": stat.count,
+                }
+                for stat in sites
+            ],
+        }
+
+    def get_report(self, limit: int = 20) -> Dict[str, Any]:
+        """Start tracing on the first call, return growth since previous call after."""
+
+        report: Dict[str, Any] = {"pid": os.getpid(), "rss": get_rss()}
+
+        if self.snapshot is None:
+            self.start()
+            report["started"] = True
+        else:
+            report.update(self.diff(limit))
+
+        current, peak = tracemalloc.get_traced_memory()
+        report["traced"] = {"current": current, "peak": peak}
+
+        return report
@@ -0,0 +1,241 @@
+"""
+Request metrics per route in Prometheus text format.
+
+Every route has a fixed record of float64 counters: one per tracked status code,
+one per latency bucket and a latency sum. Records live in a flat array, so
+observing a request is a few index increments. If METRICS_DIR is set, each worker
+process keeps its array in a memory mapped file there, and /metrics sums files of
+all workers. Lines of other collectors are values of the worker, which answers
+the scrape, so they get a pid label: counters of different workers are separate
+series, instead of one series, which jumps between workers and looks reset.
+"""
+import os
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from time import perf_counter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    MutableSequence,
+    Optional,
+    TypeVar,
+    cast,
+)
+
+from starlette.routing import BaseRoute, Mount, Route
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .shared import open_buffer, read_buffers, reopen_after_fork
+
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+STATUS_CODES = (200, 301, 302, 307, 400, 403, 404, 405, 406, 413, 415, 429, 500, 503)
+UNMATCHED_ROUTE = "unmatched"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Record layout: status counters, other status, latency buckets, +Inf bucket, sum
+_HISTOGRAM_OFFSET = len(STATUS_CODES) + 1
+_SUM_OFFSET = _HISTOGRAM_OFFSET + len(LATENCY_BUCKETS) + 1
+_RECORD_SIZE = _SUM_OFFSET + 1
+_STATUS_SLOTS = {status: slot for slot, status in enumerate(STATUS_CODES)}
+
+Collector = Callable[[], Iterable[str]]
+V = TypeVar("V")
+
+
+def get_endpoint_names(routes: Iterable[BaseRoute], prefix: str = "") -> Dict[Any, str]:
+    """Return route names by endpoint, names of mounted routes are prefixed."""
+
+    names = {}
+
+    for route in routes:
+        if isinstance(route, Mount):
+            mount_prefix = f"{prefix}{route.name}:" if route.name else prefix
+            names.update(get_endpoint_names(route.routes or [], mount_prefix))
+        elif isinstance(route, Route):
+            names[route.endpoint] = prefix + route.name
+
+    return names
+
+
+def key_by_id(values: Dict[Any, V]) -> Dict[int, V]:
+    """Return values by endpoint id, because some endpoints aren't hashable."""
+
+    return {id(endpoint): value for endpoint, value in values.items()}
+
+
+def add_label(line: str, name: str, value: str) -> str:
+    """Add label to a sample line, comment lines are returned as is."""
+
+    if line.startswith("#"):
+        return line
+
+    metric, separator, rest = line.partition("{")
+
+    if separator:
+        return f'{metric}{{{name}="{value}",{rest}'
+
+    metric, _, sample = line.partition(" ")
+
+    return f'{metric}{{{name}="{value}"}} {sample}'
+
+
+class Metrics:
+    def __init__(
+        self,
+        endpoint_names: Dict[Any, str],
+        directory: Optional[str] = None,
+        filename: Optional[str] = None,
+    ) -> None:
+        self.route_names: List[str] = [*dict.fromkeys(endpoint_names.values())]
+        self.route_names.append(UNMATCHED_ROUTE)
+        self.offsets = key_by_id(
+            {
+                endpoint: self.route_names.index(name) * _RECORD_SIZE
+                for endpoint, name in endpoint_names.items()
+            }
+        )
+        self.unmatched_offset = (len(self.route_names) - 1) * _RECORD_SIZE
+        self.size = len(self.route_names) * _RECORD_SIZE
+        self.directory = Path(directory) if directory else None
+        self.filename = filename
+        self.collectors: List[Collector] = []
+        self.values: MutableSequence[float] = []
+        self.reopen()
+
+        if filename is None:
+            reopen_after_fork(self)
+
+    def reopen(self) -> None:
+        """Start counting from zero in a new file, used in forked workers."""
+
+        buffer = open_buffer(self.size * 8, "metrics", self.directory, self.filename)
+        self.values = cast(MutableSequence[float], buffer.cast("d"))
+
+    def observe(self, endpoint: Any, status: int, duration: float) -> None:
+        offset = self.offsets.get(id(endpoint), self.unmatched_offset)
+        values = self.values
+        values[offset + _STATUS_SLOTS.get(status, len(STATUS_CODES))] += 1
+        values[offset + _HISTOGRAM_OFFSET + bisect_left(LATENCY_BUCKETS, duration)] += 1
+        values[offset + _SUM_OFFSET] += duration
+
+    def add_collector(self, collector: Collector) -> None:
+        """
+        Add function, which returns extra lines for /metrics output.
+        Its values are of the current worker and are labeled with its pid.
+        """
+
+        self.collectors.append(collector)
+
+    def collect(self) -> array:
+        """Return values of all workers summed together."""
+
+        if self.directory is None:
+            return array("d", self.values)
+
+        total = array("d", bytes(self.size * 8))
+
+        for data in read_buffers(self.directory, "metrics", self.size * 8):
+            for index, value in enumerate(array("d", data)):
+                if value:
+                    total[index] += value
+
+        return total
+
+    def render(self) -> str:
+        values = self.collect()
+        requests = [
+            "# HELP http_requests_total Total number of HTTP requests.",
+            "# TYPE http_requests_total counter",
+        ]
+        durations = [
+            "# HELP http_request_duration_seconds HTTP request latency.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        statuses = [*map(str, STATUS_CODES), "other"]
+        buckets = [*map(str, LATENCY_BUCKETS), "+Inf"]
+
+        for index, route in enumerate(self.route_names):
+            offset = index * _RECORD_SIZE
+
+            for slot, status in enumerate(statuses):
+                count = values[offset + slot]
+                if count:
+                    requests.append(
+                        f'http_requests_total{{route="{route}",status="{status}"}} '
+                        f"{count:.0f}"
+                    )
+
+            total = 0.0
+
+            for slot, bucket in enumerate(buckets):
+                total += values[offset + _HISTOGRAM_OFFSET + slot]
+                durations.append(
+                    f"http_request_duration_seconds_bucket"
+                    f'{{route="{route}",le="{bucket}"}} {total:.0f}'
+                )
+
+            durations.append(
+                f'http_request_duration_seconds_sum{{route="{route}"}} '
+                f"{values[offset + _SUM_OFFSET]}"
+            )
+            durations.append(
+                f'http_request_duration_seconds_count{{route="{route}"}} {total:.0f}'
+            )
+
+        lines = requests + durations
+        pid = str(os.getpid())
+
+        for collector in self.collectors:
+            lines.extend(add_label(line, "pid", pid) for line in collector())
+
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, which records status and latency of every request."""
+
+    def __init__(self, app: ASGIApp, metrics: Metrics) -> None:
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started_at = perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Router puts matched endpoint to scope, which is shared with middleware
+            self.metrics.observe(
+                scope.get("endpoint"), status, perf_counter() - started_at
+            )
@@ -1,3 +1,10 @@
+import hashlib
+import hmac
+import string
+from functools import lru_cache
+
+from . import settings
+
 PLAIN = "8NhWsgbWTg4mPtSJfVJq"
 REVERSE = "seP7fsDziycSw9z6Q37J"
 BASE64 = "e8dTLGBjD24B4gtvh8Yw"
@@ -10,3 +17,35 @@ ROBOTS = "rR5L65SG9RAx4ko3UK4u"
 GUESS_NUMBER = "8RnG3Wj56Lwii9yGvKvY"
 MASK = "YW8yG3DaepyGQYXnJBed"
 FINISH = "ddkud59j74i94yku86e9"
+
+LEVELS = (
+    PLAIN,
+    REVERSE,
+    BASE64,
+    HEADERS,
+    DELETE,
+    USER_AGENT,
+    ACCEPT_LANGUAGE,
+    REDIRECT,
+    ROBOTS,
+    GUESS_NUMBER,
+    MASK,
+    FINISH,
+)
+
+# Derived passwords look like static ones: 20 letters and digits
+ALPHABET = string.ascii_letters + string.digits
+LENGTH = 20
+
+# If key is set, every player gets own passwords, so they can't be shared
+KEY = str(settings.PASSWORD_KEY).encode("utf-8")
+
+
+@lru_cache(maxsize=settings.PASSWORD_CACHE_SIZE)
+def derive_password(key: bytes, player: str, level: int) -> str:
+    """Derive password from HMAC of player and level, any replica gets the same."""
+
+    message = f"{level}:{player}".encode("utf-8")
+    digest = hmac.new(key, message, hashlib.sha256).digest()
+
+    return "".join(ALPHABET[byte % len(ALPHABET)] for byte in digest[:LENGTH])
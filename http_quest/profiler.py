@@ -0,0 +1,146 @@
+"""
+Sampling CPU profiler, which runs inside a worker on demand.
+
+While profiling, a thread takes the stack of the event loop thread every few
+milliseconds and prefixes it with the route of the request, which is running at
+the moment. Requests are found by their asyncio tasks, middleware remembers the
+scope of every task only while profiler is running. Result is in collapsed stack
+format, which is accepted by flamegraph.pl, speedscope and similar tools.
+"""
+import asyncio
+import sys
+import threading
+from types import CodeType, FrameType
+from typing import Any, Counter, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .metrics import UNMATCHED_ROUTE, key_by_id
+
+IDLE = "(idle)"
+BACKGROUND = "(background)"
+MAX_DEPTH = 128
+
+Stacks = Counter[str]
+
+
+class Profiler:
+    def __init__(
+        self,
+        endpoint_names: Dict[Any, str],
+        interval: float = 0.005,
+        max_seconds: float = 60.0,
+    ) -> None:
+        self.names = key_by_id(endpoint_names)
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.running = False
+        self.scopes: Dict["asyncio.Task[Any]", Scope] = {}
+        self._labels: Dict[CodeType, str] = {}
+
+    def get_route(self, loop: asyncio.AbstractEventLoop) -> str:
+        task = asyncio.current_task(loop)
+
+        if task is None:
+            return IDLE
+
+        scope = self.scopes.get(task)
+
+        if scope is None:
+            return BACKGROUND
+
+        return self.names.get(id(scope.get("endpoint")), UNMATCHED_ROUTE)
+
+    def get_label(self, frame: FrameType) -> str:
+        code = frame.f_code
+        label = self._labels.get(code)
+
+        if label is None:
+            label = f"{frame.f_globals.get('__name__', '?')}:{code.co_name}"
+            self._labels[code] = label
+
+        return label
+
+    def sample(
+        self, thread_id: int, loop: asyncio.AbstractEventLoop, stacks: Stacks
+    ) -> None:
+        frame: Optional[FrameType] = sys._current_frames().get(thread_id)
+        route = self.get_route(loop)
+        labels: List[str] = []
+
+        while frame is not None and len(labels) < MAX_DEPTH:
+            labels.append(self.get_label(frame))
+            frame = frame.f_back
+
+        labels.append(route)
+        stacks[";".join(reversed(labels))] += 1
+
+    def _sample_until(
+        self,
+        stop: threading.Event,
+        thread_id: int,
+        loop: asyncio.AbstractEventLoop,
+        stacks: Stacks,
+    ) -> None:
+        while not stop.wait(self.interval):
+            self.sample(thread_id, loop, stacks)
+
+    async def profile(self, seconds: float) -> Stacks:
+        """Sample event loop thread of this worker for given number of seconds."""
+
+        if self.running:
+            raise RuntimeError("Profiler is already running.")
+
+        stacks: Stacks = Counter()
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=self._sample_until,
+            args=(stop, threading.get_ident(), asyncio.get_event_loop(), stacks),
+            name="profiler",
+            daemon=True,
+        )
+        self.running = True
+        thread.start()
+
+        try:
+            await asyncio.sleep(min(seconds, self.max_seconds))
+        finally:
+            stop.set()
+            await run_in_threadpool(thread.join)
+            self.running = False
+            self.scopes.clear()
+
+        return stacks
+
+    @staticmethod
+    def render(stacks: Stacks) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class ProfilerMiddleware:
+    """Pure ASGI middleware, which maps tasks to requests while profiler is running."""
+
+    def __init__(self, app: ASGIApp, profiler: Profiler) -> None:
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profiler = self.profiler
+
+        if not profiler.running or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        task = asyncio.current_task()
+
+        if task is None:
+            await self.app(scope, receive, send)
+            return
+
+        profiler.scopes[task] = scope
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.scopes.pop(task, None)
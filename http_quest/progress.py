@@ -0,0 +1,244 @@
+"""
+Player progress tracking.
+
+Progress of recently active players is kept in memory. Changes are collected in a
+bounded buffer and written to SQLite by a background task, so requests never wait
+for disk.
+"""
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass, field
+from time import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+
+from .utils import LRUCache
+
+# SQLite is imported only when progress is actually written
+if TYPE_CHECKING:
+    import sqlite3
+
+PLAYER_HEADER = "x-player-token"
+PLAYER_COOKIE = "player_token"
+MAX_PLAYER_LENGTH = 64
+
+logger = logging.getLogger(__name__)
+
+Visit = Tuple[float, float]
+Completion = Tuple[str, float]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS progress (
+    player TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (player, level)
+)
+"""
+# Leaderboard sync looks up new rows of a level
+INDEX = "CREATE INDEX IF NOT EXISTS progress_level ON progress (level)"
+UPSERT = """
+INSERT INTO progress (player, level, first_seen, last_seen) VALUES (?, ?, ?, ?)
+ON CONFLICT (player, level) DO UPDATE SET
+    first_seen = min(first_seen, excluded.first_seen),
+    last_seen = max(last_seen, excluded.last_seen)
+"""
+
+
+def get_player(request: Request) -> Optional[str]:
+    """Return player token from header or cookie, too long tokens are ignored."""
+
+    player = request.headers.get(PLAYER_HEADER) or request.cookies.get(PLAYER_COOKIE)
+
+    if not player or len(player) > MAX_PLAYER_LENGTH:
+        return None
+
+    return player
+
+
+@dataclass
+class PlayerProgress:
+    highest_level: int = 0
+    visits: Dict[int, Visit] = field(default_factory=dict)
+
+
+class ProgressStore:
+    def __init__(
+        self,
+        database: str,
+        flush_interval: float = 1.0,
+        queue_size: int = 10000,
+        cache_size: int = 10000,
+    ) -> None:
+        self.database = database
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.players: LRUCache[str, PlayerProgress] = LRUCache(cache_size)
+        self.dropped = 0
+        self._pending: Dict[Tuple[str, int], Visit] = {}
+        self._connection: Optional["sqlite3.Connection"] = None
+        self._lock = threading.Lock()
+        self._task: Optional["asyncio.Future[None]"] = None
+
+    def get(self, player: str) -> Optional[PlayerProgress]:
+        return self.players.get(player)
+
+    def get_first_visit(self, player: str, level: int) -> Optional[float]:
+        """
+        Return time of the first visit of a level, if it's in memory of the worker.
+        Visits through other workers are known only to the database.
+        """
+
+        progress = self.players.get(player)
+        visit = progress.visits.get(level) if progress is not None else None
+
+        return visit[0] if visit is not None else None
+
+    def record(self, player: str, level: int, now: Optional[float] = None) -> None:
+        """Remember that player has reached a level, doesn't touch disk."""
+
+        if now is None:
+            now = time()
+
+        progress = self.players.get(player)
+
+        if progress is None:
+            progress = PlayerProgress()
+            self.players.set(player, progress)
+
+        visit = progress.visits.get(level)
+        progress.visits[level] = (visit[0] if visit else now, now)
+        progress.highest_level = max(progress.highest_level, level)
+
+        # Repeated visits are merged, so buffer grows only with new pairs
+        key = (player, level)
+        pending = self._pending.get(key)
+
+        if pending is not None:
+            self._pending[key] = (pending[0], now)
+        elif len(self._pending) < self.queue_size:
+            self._pending[key] = (now, now)
+        else:
+            self.dropped += 1
+
+    def connect(self) -> "sqlite3.Connection":
+        import sqlite3
+
+        if self._connection is None:
+            connection = sqlite3.connect(self.database, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(SCHEMA)
+            connection.execute(INDEX)
+            self._connection = connection
+
+        return self._connection
+
+    def write(self, rows: List[Tuple[str, int, float, float]]) -> None:
+        # Cancelled flush keeps running in its thread, so writes may overlap
+        with self._lock:
+            connection = self.connect()
+
+            with connection:
+                connection.executemany(UPSERT, rows)
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        rows = [
+            (player, level, first_seen, last_seen)
+            for (player, level), (first_seen, last_seen) in pending.items()
+        ]
+
+        import sqlite3
+
+        try:
+            await run_in_threadpool(self.write, rows)
+        except sqlite3.Error:
+            self.dropped += len(rows)
+            raise
+
+    async def _flush_periodically(self) -> None:
+        import sqlite3
+
+        while True:
+            await asyncio.sleep(self.flush_interval)
+
+            try:
+                await self.flush()
+            except sqlite3.Error:
+                logger.exception("Failed to write player progress")
+
+    async def start(self) -> None:
+        self._task = asyncio.ensure_future(self._flush_periodically())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        await self.flush()
+
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def load_completions(
+        self, first_level: int, last_level: int, after: int = 0
+    ) -> Tuple[List[Completion], int]:
+        """
+        Return time between first visits of two levels for players, who have a row
+        of either level added after the given row id, and the last row id.
+        Row ids only grow, so repeated calls return only new completions.
+        """
+
+        with self._lock:
+            connection = self.connect()
+            (last_row,) = connection.execute(
+                "SELECT coalesce(max(rowid), 0) FROM progress"
+            ).fetchone()
+            rows = connection.execute(
+                """
+                SELECT last.player, last.first_seen - first.first_seen
+                FROM progress AS last
+                JOIN progress AS first ON first.player = last.player AND first.level = ?
+                WHERE last.level = ? AND last.rowid > ? AND last.rowid <= ?
+                UNION
+                SELECT last.player, last.first_seen - first.first_seen
+                FROM progress AS first
+                JOIN progress AS last ON last.player = first.player AND last.level = ?
+                WHERE first.level = ? AND first.rowid > ? AND first.rowid <= ?
+                """,
+                (first_level, last_level, after, last_row)
+                + (last_level, first_level, after, last_row),
+            ).fetchall()
+
+        return rows, last_row
+
+    def load(self, player: str) -> PlayerProgress:
+        """Read stored progress of a player, which may be written by other workers."""
+
+        with self._lock:
+            rows = (
+                self.connect()
+                .execute(
+                    "SELECT level, first_seen, last_seen FROM progress WHERE player = ?",
+                    (player,),
+                )
+                .fetchall()
+            )
+
+        progress = PlayerProgress()
+
+        for level, first_seen, last_seen in rows:
+            progress.visits[level] = (first_seen, last_seen)
+            progress.highest_level = max(progress.highest_level, level)
+
+        return progress
@@ -0,0 +1,354 @@
+"""
+Many quests served by one process.
+
+The default quest has passwords and secrets from http_quest.passwords and
+http_quest.secrets. Other quests are defined by JSON files in a directory and
+selected by path prefix, like /q/<name>/level/1, or by host, like
+<name>.quest.example.com. A quest is loaded on its first request, and its
+responses are rendered at that moment, so serving a level costs the same dict
+lookup no matter how many quests are loaded. Names of missing and invalid quests
+are remembered for a while in a separate small cache, so requests for them don't
+read files on every request and don't evict loaded quests.
+"""
+import hashlib
+import hmac
+import json
+import os
+import re
+from time import monotonic
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.status import HTTP_404_NOT_FOUND
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from . import passwords, secrets
+from .headers import get_raw_header
+from .redirects import RedirectChain, StaticRedirectChain, get_redirect_chain
+from .responses import CachedResponse, PasswordResponse
+from .utils import LRUCache, base64_encode
+
+# Quest names are used as file names and host labels
+NAME = re.compile(r"[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?")
+
+QUEST_NOT_FOUND_RESPONSE = CachedResponse(
+    PlainTextResponse("Quest is not found", status_code=HTTP_404_NOT_FOUND)
+)
+
+
+def render_password(password: str) -> Response:
+    return PasswordResponse(password)
+
+
+def render_reversed_password(password: str) -> Response:
+    return PasswordResponse(password[::-1], key="password"[::-1])
+
+
+def render_base64_password(password: str) -> Response:
+    return PasswordResponse(base64_encode(password))
+
+
+def render_header_password(password: str) -> Response:
+    return PasswordResponse("qwerty", headers={"X-Real-Password": password})
+
+
+def render_russian_password(password: str) -> Response:
+    return PasswordResponse(password, key="пароль")
+
+
+# How each level renders password of the next one, mask and finish don't
+RENDERERS: Tuple[Callable[[str], Response], ...] = (
+    render_password,
+    render_reversed_password,
+    render_base64_password,
+    render_header_password,
+    render_password,
+    render_password,
+    render_russian_password,
+    render_password,
+    render_password,
+    render_password,
+)
+
+
+class Quest:
+    """Passwords, secrets and pre-rendered responses of a quest."""
+
+    __slots__ = (
+        "name",
+        "passwords",
+        "expected_passwords",
+        "key",
+        "robots_secret",
+        "mask_secret",
+        "redirect_chain",
+        "responses",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        level_passwords: Sequence[str],
+        robots_secret: str,
+        mask_secret: str,
+        redirect_chain: RedirectChain,
+        key: bytes = b"",
+    ) -> None:
+        if len(level_passwords) != len(passwords.LEVELS):
+            raise ValueError(f"Quest should have {len(passwords.LEVELS)} passwords")
+
+        # Mask is applied to password of the last level, derived or static
+        mask_length = passwords.LENGTH if key else len(level_passwords[-1])
+
+        if len(mask_secret) != mask_length:
+            raise ValueError(f"Mask secret should be {mask_length} characters long")
+
+        self.name = name
+        self.passwords = tuple(level_passwords)
+        self.expected_passwords = tuple(
+            password.encode("utf-8") for password in level_passwords
+        )
+        self.key = key
+        self.robots_secret = robots_secret
+        self.mask_secret = mask_secret
+        self.redirect_chain = redirect_chain
+        self.responses = tuple(
+            CachedResponse(render(password))
+            for render, password in zip(RENDERERS, level_passwords[1:])
+        )
+
+    def get_password(self, level: int, player: Optional[str] = None) -> str:
+        """Return password of a level, levels are numbered from 1."""
+
+        if self.key and player is not None:
+            password: str = passwords.derive_password(self.key, player, level)
+            return password
+
+        return self.passwords[level - 1]
+
+
+def get_default_quest() -> Quest:
+    return Quest(
+        "",
+        passwords.LEVELS,
+        secrets.ROBOTS,
+        secrets.MASK,
+        get_redirect_chain(),
+        key=passwords.KEY,
+    )
+
+
+DEFAULT_QUEST = get_default_quest()
+
+
+def get_quest(request: Request) -> Quest:
+    quest: Quest = request.scope.get("quest", DEFAULT_QUEST)
+
+    return quest
+
+
+def parse_quest(name: str, data: Any, key: bytes = b"") -> Quest:
+    """
+    Build quest from its JSON definition, raise ValueError if it's invalid.
+    If quest has no password key of its own, it's derived from the given one.
+    """
+
+    try:
+        level_passwords = data["passwords"]
+        quest_secrets = data["secrets"]
+        robots_secret = quest_secrets["robots"]
+        mask_secret = quest_secrets["mask"]
+        redirect_secrets = quest_secrets["redirect"]
+        quest_key = data.get("password_key", "")
+    except (KeyError, TypeError) as error:
+        raise ValueError(f"Quest {name} has no {error}")
+
+    if not isinstance(level_passwords, list) or not isinstance(redirect_secrets, list):
+        raise ValueError(f"Quest {name} should have lists of passwords and redirects")
+
+    values = [*level_passwords, robots_secret, mask_secret, *redirect_secrets]
+
+    if not redirect_secrets or not all(
+        isinstance(value, str) and value for value in values
+    ):
+        raise ValueError(f"Quest {name} should have non-empty string secrets")
+
+    if quest_key:
+        key = str(quest_key).encode("utf-8")
+    elif key:
+        key = hmac.new(key, name.encode("utf-8"), hashlib.sha256).digest()
+
+    try:
+        return Quest(
+            name,
+            level_passwords,
+            robots_secret,
+            mask_secret,
+            StaticRedirectChain(redirect_secrets),
+            key=key,
+        )
+    except ValueError as error:
+        raise ValueError(f"Quest {name} is invalid: {error}")
+
+
+class QuestStore:
+    """Quests from JSON files in a directory, which are loaded on first use."""
+
+    def __init__(
+        self,
+        directory: str,
+        key: bytes = b"",
+        cache_size: int = 4096,
+        missing_cache_size: int = 1024,
+        missing_ttl: float = 10.0,
+        clock: Callable[[], float] = monotonic,
+    ):
+        self.directory = directory
+        self.key = key
+        self.loads = 0
+        self.missing_ttl = missing_ttl
+        self.clock = clock
+        self._quests: LRUCache[str, Quest] = LRUCache(cache_size)
+        # Expiration time and error of quests, which are missing or invalid
+        self._missing: LRUCache[str, Tuple[float, Optional[str]]] = LRUCache(
+            missing_cache_size
+        )
+
+    def load(self, name: str) -> Optional[Quest]:
+        path = os.path.join(self.directory, f"{name}.json")
+
+        try:
+            with open(path, encoding="utf-8") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return None
+
+        self.loads += 1
+
+        return parse_quest(name, data, self.key)
+
+    async def get(self, name: str) -> Optional[Quest]:
+        if not NAME.fullmatch(name):
+            return None
+
+        quest = self._quests.get(name)
+
+        if quest is None:
+            quest = await self._load_unless_missing(name)
+
+            if quest is not None:
+                self._quests.set(name, quest)
+
+        return quest
+
+    async def _load_unless_missing(self, name: str) -> Optional[Quest]:
+        now = self.clock()
+        missing = self._missing.get(name)
+
+        if missing is not None and now < missing[0]:
+            error = missing[1]
+
+            # New exception every time, raising the same one grows its traceback
+            if error is not None:
+                raise ValueError(error)
+
+            return None
+
+        try:
+            quest = await run_in_threadpool(self.load, name)
+        except ValueError as error:
+            self._missing.set(name, (now + self.missing_ttl, str(error)))
+            raise
+
+        if quest is None:
+            self._missing.set(name, (now + self.missing_ttl, None))
+
+        return quest
+
+    def collect(self) -> List[str]:
+        """Return loaded quests and cache lookups of this worker for /metrics."""
+
+        cache = self._quests
+        missing = self._missing
+        counts: Dict[str, int] = {"hit": cache.hits, "miss": cache.misses}
+        lines = [
+            "# HELP quests_loaded Quests in memory of the worker.",
+            "# TYPE quests_loaded gauge",
+            f"quests_loaded {len(cache)}",
+            "# HELP quest_loads_total Quest definitions read from files.",
+            "# TYPE quest_loads_total counter",
+            f"quest_loads_total {self.loads}",
+            "# HELP quests_missing Missing and invalid quests known to the worker.",
+            "# TYPE quests_missing gauge",
+            f"quests_missing {len(missing)}",
+            "# HELP quest_cache_requests_total Quest cache lookups by result.",
+            "# TYPE quest_cache_requests_total counter",
+        ]
+        lines.extend(
+            f'quest_cache_requests_total{{result="{result}"}} {count}'
+            for result, count in counts.items()
+        )
+
+        return lines
+
+
+class QuestMiddleware:
+    """
+    Pure ASGI middleware, which selects quest by path prefix or host.
+    Prefix is moved from path to root path, so routes and url_for work as usual.
+    Requests, which don't name a quest, get the default one.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: QuestStore,
+        path_prefix: str = "",
+        host_suffix: str = "",
+    ) -> None:
+        self.app = app
+        self.store = store
+        self.path_prefix = path_prefix.rstrip("/") + "/" if path_prefix else ""
+        self.host_suffix = "." + host_suffix.lstrip(".") if host_suffix else ""
+
+    def get_name(self, scope: Scope) -> Optional[str]:
+        path_prefix = self.path_prefix
+        path: str = scope["path"]
+
+        if path_prefix and path.startswith(path_prefix):
+            name, _, path = path[len(path_prefix) :].partition("/")
+            # Path and root path are changed in place, like Mount does it
+            scope["root_path"] = scope.get("root_path", "") + path_prefix + name
+            scope["path"] = "/" + path
+            return name
+
+        if self.host_suffix:
+            host = get_raw_header(scope, b"host").decode("latin-1").lower()
+            host = host.split(":")[0]
+
+            if host.endswith(self.host_suffix):
+                return host[: -len(self.host_suffix)]
+
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        name = self.get_name(scope)
+
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        quest = await self.store.get(name)
+
+        if quest is None:
+            await QUEST_NOT_FOUND_RESPONSE(scope, receive, send)
+            return
+
+        scope["quest"] = quest
+        await self.app(scope, receive, send)
@@ -0,0 +1,135 @@
+"""
+Token bucket rate limiter.
+
+Buckets are spread over sharded ordered dicts, so every shard stays small.
+Buckets aren't refilled by a timer, their tokens are computed from the time of
+the last request when they're used. Bucket, which was refilled completely, is
+the same as a missing one, so such buckets are dropped from the least recently
+used end of a shard once it's full.
+
+Buckets live in memory of a worker, so limits apply per worker process. With
+several workers and no sticky balancing a client may get up to workers times
+the configured rate and burst.
+"""
+import math
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import islice, takewhile
+from time import monotonic
+from typing import Callable, Dict, List, Tuple
+
+from starlette.responses import PlainTextResponse, Response
+from starlette.status import HTTP_429_TOO_MANY_REQUESTS
+
+from .responses import CachedResponse
+
+Bucket = List[float]
+
+
+def parse_rate_limits(value: str) -> Dict[str, Tuple[float, int]]:
+    """
+    Parse limits like "level:guess_number=5:20,level:mask=2:10",
+    where numbers are rate in requests per second and burst size.
+    """
+
+    limits = {}
+
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        try:
+            name, limit = item.split("=")
+            rate, burst = limit.split(":")
+            limits[name.strip()] = (float(rate), int(burst))
+        except ValueError:
+            raise ValueError(f"Rate limit {item!r} should look like name=rate:burst")
+
+    return limits
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        shards: int = 64,
+        max_keys: int = 1_000_000,
+        clock: Callable[[], float] = monotonic,
+    ) -> None:
+        if rate <= 0 or burst < 1:
+            raise ValueError("Rate should be positive and burst at least 1.")
+
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.shard_size = max(1, max_keys // shards)
+        self.shards: List["OrderedDict[str, Bucket]"] = [
+            OrderedDict() for _ in range(shards)
+        ]
+        # Time after which untouched bucket is full again
+        self.refill_time = burst / rate
+
+    def __len__(self) -> int:
+        return sum(map(len, self.shards))
+
+    def acquire(self, key: str, tokens: int = 1) -> float:
+        """
+        Take tokens, return 0 if request is allowed or seconds to wait.
+        Nothing is taken from a bucket, which has fewer tokens than requested.
+        """
+
+        now = self.clock()
+        shard = self.shards[hash(key) % len(self.shards)]
+        bucket = shard.get(key)
+
+        if bucket is None:
+            if len(shard) >= self.shard_size:
+                self._expire(shard, now)
+
+            # Missing bucket is a full one
+            bucket = shard[key] = [self.burst, now]
+        else:
+            shard.move_to_end(key)
+
+        available = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+
+        if available >= tokens:
+            bucket[0] = available - tokens
+            return 0.0
+
+        bucket[0] = available
+
+        return (tokens - available) / self.rate
+
+    def _expire(self, shard: "OrderedDict[str, Bucket]", now: float) -> None:
+        # Least recently used buckets come first, refilled ones can be dropped
+        expired = [
+            key
+            for key, _bucket in takewhile(
+                lambda item: now - item[1][1] >= self.refill_time,
+                islice(shard.items(), 8),
+            )
+        ]
+
+        for key in expired:
+            del shard[key]
+
+        # Memory bound wins over fairness, the oldest active bucket is dropped
+        if len(shard) >= self.shard_size:
+            shard.popitem(last=False)
+
+
+@lru_cache(maxsize=128)
+def get_rate_limited_response(retry_after: int) -> Response:
+    return CachedResponse(
+        PlainTextResponse(
+            "Too many requests, slow down",
+            status_code=HTTP_429_TOO_MANY_REQUESTS,
+            headers={"Retry-After": str(retry_after)},
+        )
+    )
+
+
+def get_retry_after(seconds: float) -> int:
+    """Return value of Retry-After header, which is whole seconds."""
+
+    return max(1, math.ceil(seconds))
@@ -0,0 +1,114 @@
+import hmac
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Sequence, Tuple
+
+from starlette.requests import Request
+from starlette.responses import RedirectResponse, Response
+
+from . import secrets, settings
+from .responses import CachedResponse
+from .utils import LRUCache, add_query_params
+
+
+class RedirectChain(ABC):
+    """Chain of secrets that player should follow to pass redirect level."""
+
+    first: str
+
+    @abstractmethod
+    def get_next_secret(self, secret: str) -> Optional[str]:
+        """
+        Return secret of the next hop, or None if given secret is the last one.
+        Raise KeyError if secret is not part of the chain.
+        """
+
+
+class StaticRedirectChain(RedirectChain):
+    """Chain of predefined secrets with precomputed next hops."""
+
+    def __init__(self, chain: Sequence[str]) -> None:
+        self.first = chain[0]
+        self._next_secrets: Dict[str, Optional[str]] = dict(
+            zip(chain, [*chain[1:], None])
+        )
+
+    def get_next_secret(self, secret: str) -> Optional[str]:
+        return self._next_secrets[secret]
+
+
+class SignedRedirectChain(RedirectChain):
+    """
+    Chain of any length, where each secret is hop index signed with a key.
+    Nothing is stored per hop, secrets are verified and derived on the fly.
+    """
+
+    signature_length = 10
+
+    def __init__(self, key: bytes, length: int) -> None:
+        if length < 1:
+            raise ValueError("Redirect chain should have at least one hop")
+
+        self.key = key
+        self.length = length
+        self.first = self.get_secret(0)
+
+    def get_secret(self, index: int) -> str:
+        digest = hmac.new(self.key, str(index).encode("ascii"), "sha256").hexdigest()
+
+        return digest[: self.signature_length] + str(index)
+
+    def get_next_secret(self, secret: str) -> Optional[str]:
+        try:
+            index = int(secret[self.signature_length :])
+        except ValueError:
+            raise KeyError(secret)
+
+        if not 0 <= index < self.length:
+            raise KeyError(secret)
+
+        if not hmac.compare_digest(
+            secret.encode("utf-8"), self.get_secret(index).encode("ascii")
+        ):
+            raise KeyError(secret)
+
+        if index + 1 == self.length:
+            return None
+
+        return self.get_secret(index + 1)
+
+
+def get_redirect_chain() -> RedirectChain:
+    key = str(settings.REDIRECT_CHAIN_KEY)
+
+    if key:
+        return SignedRedirectChain(key.encode("utf-8"), settings.REDIRECT_CHAIN_LENGTH)
+
+    return StaticRedirectChain(secrets.REDIRECT)
+
+
+_responses: LRUCache[Tuple, Response] = LRUCache(settings.REDIRECT_CACHE_SIZE)
+
+
+def get_redirect_response(request: Request, secret: str) -> Response:
+    """
+    Return redirect to the hop with given secret.
+    Responses are cached per host and root path, because Location is absolute.
+    """
+
+    scope = request.scope
+    key = (
+        scope["scheme"],
+        request.headers.get("host") or str(scope.get("server")),
+        scope.get("app_root_path", scope.get("root_path", "")),
+        secret,
+    )
+    response = _responses.get(key)
+
+    if response is None:
+        url = request.url_for("level:redirect")
+        response = CachedResponse(
+            RedirectResponse(add_query_params(url, secret=secret))
+        )
+        _responses.set(key, response)
+
+    return response
@@ -1,6 +1,7 @@
 import typing
 
-from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.types import Receive, Scope, Send
 
 
 class PasswordResponse(JSONResponse):
@@ -22,3 +23,26 @@ class FinishResponse(PlainTextResponse):
             "https://github.com/2tunnels/http-quest\n\n"
             "Thank you for your time!"
         )
+
+
+class CachedResponse(Response):
+    """
+    Response that is rendered once and replayed for every request.
+    Body and headers are already encoded, so sending it costs two ASGI messages.
+    """
+
+    def __init__(self, response: Response) -> None:
+        self.status_code = response.status_code
+        self.body = response.body
+        self.raw_headers = response.raw_headers
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Headers list is copied, so middleware can't modify the shared instance
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": list(self.raw_headers),
+            }
+        )
+        await send({"type": "http.response.body", "body": self.body})
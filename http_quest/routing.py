@@ -0,0 +1,77 @@
+import typing
+
+from starlette.datastructures import URL
+from starlette.responses import RedirectResponse
+from starlette.routing import BaseRoute, Match, Mount, Route, Router
+from starlette.types import Receive, Scope, Send
+
+
+class DispatchMount(Mount):
+    """
+    Mount that finds its route with a single dict lookup on path, instead of
+    matching every route regex in order. Only routes without path parameters are
+    supported. Route names keep working with url_path_for and url_for.
+    """
+
+    def __init__(
+        self, path: str, routes: typing.Sequence[BaseRoute], name: str,
+    ) -> None:
+        super().__init__(path, routes=routes, name=name)
+
+        self.prefix = self.path + "/"
+        self.table: typing.Dict[str, Route] = {}
+        self.methods: typing.Dict[str, typing.FrozenSet[str]] = {}
+
+        for route in routes:
+            assert isinstance(route, Route), "Only Route instances can be dispatched"
+            assert not route.param_convertors, "Path parameters are not supported"
+            self.table[route.path] = route
+            self.methods[route.path] = frozenset(getattr(route, "methods") or ())
+
+    def matches(self, scope: Scope) -> typing.Tuple[Match, Scope]:
+        if scope["type"] != "http":
+            return Match.NONE, {}
+
+        path = scope["path"]
+
+        if not path.startswith(self.prefix):
+            return Match.NONE, {}
+
+        remaining_path = path[len(self.path) :]
+        route = self.table.get(remaining_path)
+        root_path = scope.get("root_path", "")
+        child_scope = {
+            "path_params": {},
+            "app_root_path": scope.get("app_root_path", root_path),
+            "root_path": root_path + self.path,
+            "path": remaining_path,
+            "endpoint": self.app if route is None else route.endpoint,
+        }
+
+        methods = self.methods.get(remaining_path)
+
+        if methods and scope["method"] not in methods:
+            return Match.PARTIAL, child_scope
+
+        return Match.FULL, child_scope
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        path = scope["path"]
+        route = self.table.get(path)
+
+        if route is not None:
+            await route.handle(scope, receive, send)
+            return
+
+        # Same trailing slash redirect as Router does, but without regexes
+        redirect_path = path.rstrip("/") if path.endswith("/") else path + "/"
+
+        if redirect_path in self.table:
+            redirect_scope = dict(scope)
+            redirect_scope["path"] = redirect_path
+            response = RedirectResponse(url=str(URL(scope=redirect_scope)))
+            await response(scope, receive, send)
+            return
+
+        router = typing.cast(Router, self.app)
+        await router.not_found(scope, receive, send)
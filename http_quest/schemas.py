@@ -1,5 +1,7 @@
 from marshmallow import Schema, fields, validate
 
+from . import settings
+
 
 class Level8Schema(Schema):
     number = fields.Integer(required=True, validate=validate.Range(min=1, max=1000))
@@ -7,3 +9,11 @@ class Level8Schema(Schema):
 
 class SecretSchema(Schema):
     secret = fields.String(required=True)
+
+
+class SecretsSchema(Schema):
+    secrets = fields.List(
+        fields.String(),
+        required=True,
+        validate=validate.Length(min=1, max=settings.MASK_BATCH_SIZE),
+    )
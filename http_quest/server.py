@@ -0,0 +1,179 @@
+"""
+Production server, which is gunicorn with uvicorn workers.
+
+Application is loaded in the master process before workers are forked, so they
+start faster and share its memory copy-on-write. Number of workers follows CPU
+quota of the container instead of number of CPUs of the host, which is what
+os.cpu_count() returns inside a container.
+"""
+import asyncio
+import logging
+import os
+from pathlib import Path
+from types import FrameType
+from typing import Any, Dict, Optional
+
+from gunicorn.app.base import BaseApplication
+from uvicorn.config import Config
+from uvicorn.main import Server as UvicornServer
+from uvicorn.workers import UvicornWorker
+
+from . import settings
+from .health import Drainer
+from .memory import get_rss
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+# Server ticks every 0.1 seconds, memory is checked every 10 seconds
+RSS_CHECK_TICKS = 100
+
+logger = logging.getLogger(__name__)
+
+
+class DrainingServer(UvicornServer):
+    """
+    Uvicorn server, which drains requests in flight before it exits.
+    Worker, which has grown over max RSS, is recycled like after max requests.
+    """
+
+    def __init__(
+        self, config: Config, drainer: Optional[Drainer], max_rss: int = 0
+    ) -> None:
+        super().__init__(config)
+        self.drainer = drainer
+        self.max_rss = max_rss
+
+    async def on_tick(self, counter: int) -> bool:
+        should_exit: bool = await super().on_tick(counter)
+
+        # Fresh worker isn't checked, so too low limit can't restart it in a tight loop
+        if should_exit or not self.max_rss or not counter or counter % RSS_CHECK_TICKS:
+            return should_exit
+
+        rss = get_rss()
+
+        if rss is not None and rss > self.max_rss:
+            logger.warning("Worker RSS %d is over the limit, restarting", rss)
+            return True
+
+        return False
+
+    def handle_exit(self, sig: int, frame: Optional[FrameType]) -> None:
+        # Repeated signal exits right away, as it does without draining
+        if self.drainer is None or self.drainer.draining or self.should_exit:
+            super().handle_exit(sig, frame)
+            return
+
+        self.drainer.drain()
+        asyncio.ensure_future(self.exit_after_drain(self.drainer, sig, frame))
+
+    async def exit_after_drain(
+        self, drainer: Drainer, sig: int, frame: Optional[FrameType]
+    ) -> None:
+        is_drained = await drainer.wait()
+        super().handle_exit(sig, frame)
+
+        # Requests, which missed the deadline, aren't waited for
+        if not is_drained:
+            self.force_exit = True
+
+
+class Worker(UvicornWorker):
+    # uvloop and httptools are used if they're installed, asyncio and h11 otherwise
+    CONFIG_KWARGS = {"loop": "auto", "http": "auto"}
+
+    def init_process(self) -> None:
+        # Newer uvloop doesn't create loop implicitly in get_event_loop()
+        self.config.setup_event_loop()
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        super(UvicornWorker, self).init_process()
+
+    def run(self) -> None:
+        self.config.app = self.wsgi
+        server = DrainingServer(
+            self.config,
+            getattr(self.wsgi.state, "drainer", None),
+            max_rss=settings.SERVER_MAX_RSS_MB * 1024 * 1024,
+        )
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(server.serve(sockets=self.sockets))
+
+
+def get_cpu_quota(root: Path = CGROUP_ROOT) -> Optional[float]:
+    """Return CPU limit of the cgroup in CPUs, None if there is no limit."""
+
+    # cgroup v2 has quota and period in one file, quota is "max" without limit
+    try:
+        quota, period = (root / "cpu.max").read_text().split()
+    except (OSError, ValueError):
+        pass
+    else:
+        return None if quota == "max" else int(quota) / int(period)
+
+    # cgroup v1 has quota of -1 without limit
+    try:
+        quota = (root / "cpu" / "cpu.cfs_quota_us").read_text().strip()
+        period = (root / "cpu" / "cpu.cfs_period_us").read_text().strip()
+    except OSError:
+        return None
+
+    return None if int(quota) <= 0 else int(quota) / int(period)
+
+
+def get_workers_count(root: Path = CGROUP_ROOT) -> int:
+    """
+    Return one worker per available CPU. Partial CPU is rounded down, otherwise
+    workers would be throttled by the quota all the time.
+    """
+
+    cpus: float = len(os.sched_getaffinity(0))
+    quota = get_cpu_quota(root)
+
+    if quota is not None:
+        cpus = min(cpus, quota)
+
+    return max(1, int(cpus))
+
+
+def get_options(
+    bind: str,
+    workers: int,
+    keepalive: int,
+    backlog: int,
+    max_requests: int,
+    max_requests_jitter: int,
+    graceful_timeout: int = 30,
+    access_log: bool = True,
+    forwarded_allow_ips: str = "*",
+) -> Dict[str, Any]:
+    return {
+        "bind": bind,
+        "workers": workers or get_workers_count(),
+        "worker_class": "http_quest.server.Worker",
+        "preload_app": True,
+        "keepalive": keepalive,
+        "backlog": backlog,
+        "max_requests": max_requests,
+        "max_requests_jitter": max_requests_jitter,
+        # Worker is killed, if it hasn't drained and stopped after this time
+        "graceful_timeout": graceful_timeout,
+        # Application may write its own access log, then gunicorn one is off
+        "accesslog": "-" if access_log else None,
+        "errorlog": "-",
+        # Proxies, which are trusted to set client address and scheme
+        "forwarded_allow_ips": forwarded_allow_ips,
+    }
+
+
+class Server(BaseApplication):
+    def __init__(self, options: Dict[str, Any]) -> None:
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self) -> Any:
+        from .asgi import application
+
+        return application
@@ -1,7 +1,80 @@
 from starlette.config import Config
-from starlette.datastructures import Secret
+from starlette.datastructures import CommaSeparatedStrings, Secret
 
 config = Config(".env")
 
 DEBUG = config("DEBUG", cast=bool, default=False)
 BUGSNAG_API_KEY = config("BUGSNAG_API_KEY", cast=Secret)
+FAST_ROUTER = config("FAST_ROUTER", cast=bool, default=False)
+REDIRECT_CHAIN_KEY = config("REDIRECT_CHAIN_KEY", cast=Secret, default="")
+REDIRECT_CHAIN_LENGTH = config("REDIRECT_CHAIN_LENGTH", cast=int, default=20)
+REDIRECT_CACHE_SIZE = config("REDIRECT_CACHE_SIZE", cast=int, default=1024)
+MAX_BODY_SIZE = config("MAX_BODY_SIZE", cast=int, default=16384)
+MASK_BATCH_SIZE = config("MASK_BATCH_SIZE", cast=int, default=100)
+METRICS_ENABLED = config("METRICS_ENABLED", cast=bool, default=True)
+METRICS_DIR = config("METRICS_DIR", default=None)
+PROGRESS_ENABLED = config("PROGRESS_ENABLED", cast=bool, default=False)
+PROGRESS_DATABASE = config("PROGRESS_DATABASE", default="progress.db")
+PROGRESS_FLUSH_INTERVAL = config("PROGRESS_FLUSH_INTERVAL", cast=float, default=1.0)
+PROGRESS_QUEUE_SIZE = config("PROGRESS_QUEUE_SIZE", cast=int, default=10000)
+PROGRESS_CACHE_SIZE = config("PROGRESS_CACHE_SIZE", cast=int, default=10000)
+PASSWORD_KEY = config("PASSWORD_KEY", cast=Secret, default="")
+PASSWORD_CACHE_SIZE = config("PASSWORD_CACHE_SIZE", cast=int, default=4096)
+LEADERBOARD_SIZE = config("LEADERBOARD_SIZE", cast=int, default=10)
+LEADERBOARD_REFRESH_INTERVAL = config(
+    "LEADERBOARD_REFRESH_INTERVAL", cast=float, default=5.0
+)
+LEADERBOARD_SYNC_INTERVAL = config(
+    "LEADERBOARD_SYNC_INTERVAL", cast=float, default=10.0
+)
+ANALYTICS_ENABLED = config("ANALYTICS_ENABLED", cast=bool, default=False)
+ANALYTICS_DIR = config("ANALYTICS_DIR", default=None)
+ANALYTICS_STRUGGLE_ATTEMPTS = config(
+    "ANALYTICS_STRUGGLE_ATTEMPTS", cast=int, default=10
+)
+ANALYTICS_SNAPSHOT_TTL = config("ANALYTICS_SNAPSHOT_TTL", cast=float, default=5.0)
+RATE_LIMITS = config("RATE_LIMITS", default="")
+RATE_LIMIT_KEY = config("RATE_LIMIT_KEY", default="ip")
+RATE_LIMIT_MAX_KEYS = config("RATE_LIMIT_MAX_KEYS", cast=int, default=1_000_000)
+ERROR_REPORTING_URL = config(
+    "ERROR_REPORTING_URL", default="https://notify.bugsnag.com"
+)
+ERROR_QUEUE_SIZE = config("ERROR_QUEUE_SIZE", cast=int, default=1000)
+ERROR_BATCH_SIZE = config("ERROR_BATCH_SIZE", cast=int, default=50)
+ERROR_FLUSH_INTERVAL = config("ERROR_FLUSH_INTERVAL", cast=float, default=1.0)
+ERROR_DEDUP_WINDOW = config("ERROR_DEDUP_WINDOW", cast=float, default=60.0)
+ERROR_SAMPLE_RATES = config("ERROR_SAMPLE_RATES", default="")
+SERVER_BIND = config("SERVER_BIND", default="0.0.0.0:8000")
+SERVER_WORKERS = config("SERVER_WORKERS", cast=int, default=0)
+SERVER_KEEPALIVE = config("SERVER_KEEPALIVE", cast=int, default=5)
+SERVER_BACKLOG = config("SERVER_BACKLOG", cast=int, default=2048)
+SERVER_MAX_REQUESTS = config("SERVER_MAX_REQUESTS", cast=int, default=0)
+SERVER_MAX_REQUESTS_JITTER = config("SERVER_MAX_REQUESTS_JITTER", cast=int, default=0)
+SERVER_GRACEFUL_TIMEOUT = config("SERVER_GRACEFUL_TIMEOUT", cast=int, default=30)
+SERVER_MAX_RSS_MB = config("SERVER_MAX_RSS_MB", cast=int, default=0)
+SERVER_FORWARDED_ALLOW_IPS = config("SERVER_FORWARDED_ALLOW_IPS", default="*")
+ACCESS_LOG_ENABLED = config("ACCESS_LOG_ENABLED", cast=bool, default=True)
+ACCESS_LOG_BUFFER_SIZE = config("ACCESS_LOG_BUFFER_SIZE", cast=int, default=10000)
+ACCESS_LOG_FLUSH_INTERVAL = config("ACCESS_LOG_FLUSH_INTERVAL", cast=float, default=1.0)
+ACCESS_LOG_SAMPLE_RATES = config("ACCESS_LOG_SAMPLE_RATES", default="")
+SHEDDING_ENABLED = config("SHEDDING_ENABLED", cast=bool, default=False)
+SHEDDING_MAX_LAG = config("SHEDDING_MAX_LAG", cast=float, default=0.5)
+SHEDDING_MAX_IN_FLIGHT = config("SHEDDING_MAX_IN_FLIGHT", cast=int, default=0)
+SHEDDING_PRIORITY_PATHS = config(
+    "SHEDDING_PRIORITY_PATHS", cast=CommaSeparatedStrings, default="/level/12,/metrics"
+)
+SHEDDING_PRIORITY_FACTOR = config("SHEDDING_PRIORITY_FACTOR", cast=float, default=2.0)
+SHEDDING_CHECK_INTERVAL = config("SHEDDING_CHECK_INTERVAL", cast=float, default=0.1)
+SHEDDING_RETRY_AFTER = config("SHEDDING_RETRY_AFTER", cast=int, default=1)
+DRAIN_TIMEOUT = config("DRAIN_TIMEOUT", cast=float, default=20.0)
+ADMIN_TOKEN = config("ADMIN_TOKEN", cast=Secret, default="")
+PROFILER_INTERVAL = config("PROFILER_INTERVAL", cast=float, default=0.005)
+PROFILER_MAX_SECONDS = config("PROFILER_MAX_SECONDS", cast=float, default=60.0)
+MEMORY_TRACE_FRAMES = config("MEMORY_TRACE_FRAMES", cast=int, default=10)
+HEADER_CACHE_SIZE = config("HEADER_CACHE_SIZE", cast=int, default=256)
+QUESTS_DIR = config("QUESTS_DIR", default=None)
+QUESTS_PATH_PREFIX = config("QUESTS_PATH_PREFIX", default="/q")
+QUESTS_HOST_SUFFIX = config("QUESTS_HOST_SUFFIX", default="")
+QUESTS_CACHE_SIZE = config("QUESTS_CACHE_SIZE", cast=int, default=4096)
+QUESTS_MISSING_CACHE_SIZE = config("QUESTS_MISSING_CACHE_SIZE", cast=int, default=1024)
+QUESTS_MISSING_TTL = config("QUESTS_MISSING_TTL", cast=float, default=10.0)
@@ -0,0 +1,99 @@
+"""
+Per-process buffers, which are readable by other worker processes.
+
+Each process writes only its own memory mapped file, so no locking is needed,
+readers merge files of all processes.
+"""
+import mmap
+import os
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Protocol
+from weakref import WeakSet
+
+
+class Reopenable(Protocol):
+    def reopen(self) -> None:
+        ...
+
+
+def get_path(directory: Path, prefix: str, filename: Optional[str] = None) -> Path:
+    """Return path of the buffer file of this process."""
+
+    return directory / (filename or f"{prefix}-{os.getpid()}.db")
+
+
+def open_buffer(
+    size: int, prefix: str, directory: Optional[Path], filename: Optional[str] = None
+) -> memoryview:
+    """Return zeroed buffer, which is a file in directory, if directory is given."""
+
+    if directory is None:
+        return memoryview(bytearray(size))
+
+    directory.mkdir(parents=True, exist_ok=True)
+    path = get_path(directory, prefix, filename)
+
+    with path.open("a+b") as file:
+        file.truncate(size)
+        memory = mmap.mmap(file.fileno(), size)
+
+    return memoryview(memory)  # type: ignore
+
+
+def read_buffers(directory: Path, prefix: str, size: int) -> Iterator[bytes]:
+    """Yield buffers of all processes, files of different size are skipped."""
+
+    for path in directory.glob(f"{prefix}-*.db"):
+        data = path.read_bytes()
+
+        # File of a different application version, it can't be merged
+        if len(data) == size:
+            yield data
+
+
+def map_buffers(
+    directory: Path, prefix: str, size: int, mapped: Dict[Path, memoryview]
+) -> Dict[Path, memoryview]:
+    """
+    Return read-only views of buffers of all processes, which see their writes.
+    Files from the given dict aren't mapped again, so it's cheap to call it often.
+    """
+
+    buffers = {}
+
+    for path in directory.glob(f"{prefix}-*.db"):
+        buffer = mapped.get(path)
+
+        if buffer is None:
+            try:
+                with path.open("rb") as file:
+                    # File of a different application version or just created
+                    if os.fstat(file.fileno()).st_size != size:
+                        continue
+
+                    memory = mmap.mmap(file.fileno(), size, access=mmap.ACCESS_READ)
+            except OSError:
+                continue
+
+            buffer = memoryview(memory)  # type: ignore
+
+        buffers[path] = buffer
+
+    return buffers
+
+
+_instances: "WeakSet[Reopenable]" = WeakSet()
+
+
+def reopen_after_fork(instance: Reopenable) -> None:
+    """Call reopen of the instance in forked processes, so they get own buffers."""
+
+    _instances.add(instance)
+
+
+def _reopen_instances() -> None:
+    for instance in _instances:
+        instance.reopen()
+
+
+os.register_at_fork(after_in_child=_reopen_instances)
@@ -0,0 +1,151 @@
+"""
+Load shedding by event loop lag and number of requests in flight.
+
+Background task sleeps for a short interval and measures how late it wakes up,
+which is how long callbacks wait for the loop. When lag or number of requests in
+flight of the worker is above its threshold, new requests get immediate 503
+instead of waiting in the queue with everybody else. Priority paths are shed
+only when the load is several times above the thresholds. Quest prefix, like
+/q/<name>, isn't part of a priority path, so /level/12 of every quest has priority.
+"""
+import asyncio
+from time import perf_counter
+from typing import Callable, Iterable, List, Optional
+
+from starlette.responses import PlainTextResponse
+from starlette.status import HTTP_503_SERVICE_UNAVAILABLE
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .responses import CachedResponse
+
+# Weight of the latest measurement, so a single pause doesn't shed requests
+LAG_SMOOTHING = 0.5
+
+
+class LoadShedder:
+    def __init__(
+        self,
+        max_lag: float = 0.5,
+        max_in_flight: int = 0,
+        priority_paths: Iterable[str] = (),
+        priority_factor: float = 2.0,
+        interval: float = 0.1,
+        retry_after: int = 1,
+        quest_path_prefix: str = "",
+        clock: Callable[[], float] = perf_counter,
+    ) -> None:
+        self.max_lag = max_lag
+        self.max_in_flight = max_in_flight
+        self.priority_paths = frozenset(priority_paths)
+        self.quest_path_prefix = (
+            quest_path_prefix.rstrip("/") + "/" if quest_path_prefix else ""
+        )
+        self.priority_factor = priority_factor
+        self.interval = interval
+        self.clock = clock
+        self.lag = 0.0
+        self.in_flight = 0
+        self.shed = {"normal": 0, "priority": 0}
+        self.response = CachedResponse(
+            PlainTextResponse(
+                "Server is overloaded, try again later",
+                status_code=HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(retry_after)},
+            )
+        )
+        self._task: Optional["asyncio.Future[None]"] = None
+
+    def get_pressure(self) -> float:
+        """Return load relative to thresholds, 1 means at threshold, 0 disables it."""
+
+        pressure = self.lag / self.max_lag if self.max_lag else 0.0
+
+        if self.max_in_flight:
+            pressure = max(pressure, self.in_flight / self.max_in_flight)
+
+        return pressure
+
+    def should_shed(self, path: str) -> bool:
+        pressure = self.get_pressure()
+
+        if pressure < 1.0:
+            return False
+
+        # Shedding runs before quest is selected, so its prefix is still in path
+        quest_path_prefix = self.quest_path_prefix
+
+        if quest_path_prefix and path.startswith(quest_path_prefix):
+            path = "/" + path[len(quest_path_prefix) :].partition("/")[2]
+
+        if path in self.priority_paths:
+            if pressure < self.priority_factor:
+                return False
+
+            self.shed["priority"] += 1
+        else:
+            self.shed["normal"] += 1
+
+        return True
+
+    def observe_lag(self, lag: float) -> None:
+        self.lag += (lag - self.lag) * LAG_SMOOTHING
+
+    async def _measure_lag(self) -> None:
+        while True:
+            started_at = self.clock()
+            await asyncio.sleep(self.interval)
+            self.observe_lag(max(0.0, self.clock() - started_at - self.interval))
+
+    async def start(self) -> None:
+        self._task = asyncio.ensure_future(self._measure_lag())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def collect(self) -> List[str]:
+        """Return lag, requests in flight and shed counts of this worker for /metrics."""
+
+        lines = [
+            "# HELP event_loop_lag_seconds Smoothed event loop lag of the worker.",
+            "# TYPE event_loop_lag_seconds gauge",
+            f"event_loop_lag_seconds {self.lag}",
+            "# HELP http_requests_in_flight Requests in flight of the worker.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# HELP http_requests_shed_total Requests rejected because of overload.",
+            "# TYPE http_requests_shed_total counter",
+        ]
+        lines.extend(
+            f'http_requests_shed_total{{priority="{priority}"}} {count}'
+            for priority, count in self.shed.items()
+        )
+
+        return lines
+
+
+class LoadSheddingMiddleware:
+    """Pure ASGI middleware, which counts requests in flight and sheds overload."""
+
+    def __init__(self, app: ASGIApp, shedder: LoadShedder) -> None:
+        self.app = app
+        self.shedder = shedder
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        shedder = self.shedder
+
+        if shedder.should_shed(scope["path"]):
+            await shedder.response(scope, receive, send)
+            return
+
+        shedder.in_flight += 1
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            shedder.in_flight -= 1
@@ -1,4 +1,7 @@
 from base64 import standard_b64decode, standard_b64encode
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Generic, Iterable, List, Optional, TypeVar
 from urllib.parse import urlencode
 
 
@@ -10,10 +13,90 @@ def base64_decode(text: str) -> str:
     return standard_b64decode(text.encode("utf-8")).decode("utf-8")
 
 
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """Parse rates like "KeyError=0.5,2xx=0.1", 1 means keep everything."""
+
+    rates = {}
+
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        try:
+            name, rate = item.split("=")
+            rates[name.strip()] = float(rate)
+        except ValueError:
+            raise ValueError(f"Sample rate {item!r} should look like name=rate")
+
+    return rates
+
+
 def add_query_params(url: str, **params: str) -> str:
     return url + "?" + urlencode(params)
 
 
+# Translates XOR of two byte strings to a mask: 0x00 for same bytes, 0xFF otherwise
+_DIFFERENCE_TABLE = bytes([0x00] + [0xFF] * 255)
+
+
+class PasswordMask:
+    """
+    Precomputed password mask for a password and secret pair.
+    ASCII strings of the same length are compared as big integers, so all characters
+    are masked at once instead of one by one.
+    """
+
+    def __init__(self, password: str, secret: str) -> None:
+        if len(password) != len(secret):
+            raise ValueError("Password and secret should be the same length")
+
+        self.password = password
+        self.secret = secret
+        self.length = len(secret)
+        self.is_ascii = password.isascii() and secret.isascii()
+
+        if self.is_ascii:
+            self._password = int.from_bytes(password.encode("ascii"), "big")
+            self._secret = int.from_bytes(secret.encode("ascii"), "big")
+            self._stars = int.from_bytes(b"*" * self.length, "big")
+
+    def apply(self, given_secret: str) -> str:
+        if given_secret == self.secret:
+            return self.password
+
+        if (
+            not self.is_ascii
+            or len(given_secret) != self.length
+            or not given_secret.isascii()
+        ):
+            return self._apply_by_character(given_secret)
+
+        given = int.from_bytes(given_secret.encode("ascii"), "big")
+        difference = (self._secret ^ given).to_bytes(self.length, "big")
+        mask = int.from_bytes(difference.translate(_DIFFERENCE_TABLE), "big")
+        masked_password = (self._password & ~mask) | (self._stars & mask)
+
+        return masked_password.to_bytes(self.length, "big").decode("ascii")
+
+    def apply_many(self, given_secrets: Iterable[str]) -> List[str]:
+        return [self.apply(given_secret) for given_secret in given_secrets]
+
+    def _apply_by_character(self, given_secret: str) -> str:
+        # zip stops at the shortest string, missing characters are masked by ljust
+        masked_password = "".join(
+            [
+                password_character if secret_character == given_character else "*"
+                for password_character, secret_character, given_character in zip(
+                    self.password, self.secret, given_secret
+                )
+            ]
+        )
+
+        return masked_password.ljust(self.length, "*")
+
+
+@lru_cache(maxsize=64)
+def get_password_mask(password: str, secret: str) -> PasswordMask:
+    return PasswordMask(password, secret)
+
+
 def get_masked_password(password: str, secret: str, given_secret: str) -> str:
     """
     Use secret correctness as a password mask.
@@ -21,22 +104,48 @@ def get_masked_password(password: str, secret: str, given_secret: str) -> str:
     exposed.
     """
 
-    if len(password) != len(secret):
-        raise ValueError("Password and secret should be the same length")
+    return get_password_mask(password, secret).apply(given_secret)
+
 
-    masked_password = ""
+def get_masked_passwords(
+    password: str, secret: str, given_secrets: Iterable[str]
+) -> List[str]:
+    """Same as get_masked_password, but for many given secrets at once."""
 
-    for index in range(len(secret)):
+    return get_password_mask(password, secret).apply_many(given_secrets)
+
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """Dict with bounded size, least recently used items are evicted first."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[K, V]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K) -> Optional[V]:
         try:
-            is_same_character = secret[index] == given_secret[index]
-        except IndexError:
-            masked_password += "*"
-            continue
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._data.move_to_end(key)
 
-        if is_same_character:
-            masked_password += password[index]
-            continue
+        return value
 
-        masked_password += "*"
+    def set(self, key: K, value: V) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
 
-    return masked_password
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
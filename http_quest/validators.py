@@ -0,0 +1,115 @@
+from typing import Any, Callable, Dict, List, Mapping, Tuple, Type, cast
+
+from marshmallow import INCLUDE, RAISE, Schema, ValidationError, fields, missing
+from marshmallow.exceptions import SCHEMA
+
+Errors = Dict[str, Any]
+Validator = Callable[[Any], Tuple[Dict[str, Any], Errors]]
+FieldLoader = Callable[[Any, Mapping, Errors], Any]
+
+
+def _compile_field(name: str, field: Any) -> FieldLoader:
+    """
+    Return loader of a single field value, which stores errors instead of raising.
+    Common types are checked inline, anything else goes through field.deserialize.
+    """
+
+    required_message = field.error_messages["required"]
+    null_message = field.error_messages["null"]
+    has_validators = bool(field.validators)
+
+    if type(field) is fields.String:
+        fast_type: Any = str
+    elif type(field) is fields.Integer and not field.strict:
+        fast_type = int
+    else:
+        fast_type = None
+
+    def load(value: Any, body: Mapping, errors: Errors) -> Any:
+        if value is missing:
+            if field.required:
+                errors[name] = [required_message]
+                return missing
+            default = field.missing
+            return default() if callable(default) else default
+
+        if value is None:
+            if not field.allow_none:
+                errors[name] = [null_message]
+            return None
+
+        try:
+            # bool is subclass of int, so exact type is checked
+            if type(value) is not fast_type:
+                value = field.deserialize(value, name, body)
+            if has_validators:
+                field._validate(value)
+        except ValidationError as exc:
+            errors[name] = exc.messages
+            return missing
+
+        return value
+
+    return load
+
+
+def compile_schema(schema_class: Type[Schema]) -> Validator:
+    """
+    Compile schema into function that returns loaded data and errors.
+    Output is the same as Schema().load() gives, but schema is instantiated only
+    once and loading doesn't raise exceptions for invalid input.
+    Schemas with hooks are loaded with marshmallow as is.
+    """
+
+    schema = schema_class()
+
+    if any(schema._hooks.values()) or schema.unknown not in (RAISE, INCLUDE):
+        return _wrap_schema(schema)
+
+    type_message = schema.error_messages["type"]
+    unknown_message = schema.error_messages["unknown"]
+    raise_unknown = schema.unknown == RAISE
+    loaders: List[Tuple[str, str, FieldLoader]] = [
+        (
+            field.data_key or name,
+            field.attribute or name,
+            _compile_field(field.data_key or name, field),
+        )
+        for name, field in schema.load_fields.items()
+    ]
+    data_keys = frozenset(data_key for data_key, _attribute, _loader in loaders)
+
+    def validate(body: Any) -> Tuple[Dict[str, Any], Errors]:
+        data: Dict[str, Any] = {}
+        errors: Errors = {}
+
+        if not isinstance(body, Mapping):
+            return data, {SCHEMA: [type_message]}
+
+        for data_key, attribute, load in loaders:
+            value = load(body.get(data_key, missing), body, errors)
+            if value is not missing:
+                data[attribute] = value
+
+        if not data_keys.issuperset(body):
+            for key in body:
+                if key in data_keys:
+                    continue
+                if raise_unknown:
+                    errors[key] = [unknown_message]
+                else:
+                    data[key] = body[key]
+
+        return data, errors
+
+    return validate
+
+
+def _wrap_schema(schema: Schema) -> Validator:
+    def validate(body: Any) -> Tuple[Dict[str, Any], Errors]:
+        try:
+            return schema.load(body), {}
+        except ValidationError as exc:
+            return {}, cast(Errors, exc.messages)
+
+    return validate
@@ -1,4 +1,6 @@
+import asyncio
 from dataclasses import dataclass
+from typing import Iterator
 
 import pytest
 from _pytest.fixtures import SubRequest
@@ -56,3 +58,13 @@ def app() -> Starlette:
 @pytest.fixture
 def client(app: Starlette) -> TestClient:
     return TestClient(app)
+
+
+@pytest.fixture
+def loop() -> Iterator[asyncio.AbstractEventLoop]:
+    # Test client runs lifespan events in the current event loop
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    loop.close()
+    asyncio.set_event_loop(None)
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import os
+from io import StringIO
+from typing import Any, Dict, List
+
+import pytest
+from starlette import status
+from starlette.applications import Starlette
+from starlette.testclient import TestClient
+
+from http_quest import levels, passwords
+from http_quest.accesslog import AccessLog, get_endpoint_levels, parse_status_rates
+from http_quest.app import get_application
+from http_quest.leaderboard import get_player_name
+
+
+def get_scope(path: str = "/level/1", player: str = "") -> Dict[str, Any]:
+    headers = [(b"x-player-token", player.encode())] if player else []
+
+    return {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "headers": headers,
+        "client": ("10.0.0.1", 12345),
+        "endpoint": levels.plain,
+    }
+
+
+def read_lines(stream: StringIO) -> List[Dict[str, Any]]:
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def get_access_log(stream: StringIO, **kwargs: Any) -> AccessLog:
+    return AccessLog({levels.plain: "level:plain"}, {levels.plain: 1}, stream, **kwargs)
+
+
+def test_parse_status_rates() -> None:
+    assert parse_status_rates({"403": 0.01, "2xx": 0.1, "5XX": 1}) == {
+        403: 0.01,
+        2: 0.1,
+        5: 1,
+    }
+
+
+@pytest.mark.parametrize("name", ["ok", "4x", "40x", "xx"])
+def test_parse_status_rates_invalid(name: str) -> None:
+    with pytest.raises(ValueError):
+        parse_status_rates({name: 0.5})
+
+
+def test_get_endpoint_levels(app: Starlette) -> None:
+    endpoint_levels = get_endpoint_levels(app.routes)
+
+    assert endpoint_levels[levels.plain] == 1
+    assert endpoint_levels[levels.finish] == 12
+    assert len(endpoint_levels) == len(passwords.LEVELS)
+
+
+def test_flush_writes_json_lines() -> None:
+    stream = StringIO()
+    access_log = get_access_log(stream)
+
+    access_log.log(get_scope(player="token"), 200, 0.0042)
+    access_log.log({**get_scope("/missing"), "endpoint": None}, 404, 0.001)
+
+    assert stream.getvalue() == ""
+
+    asyncio.run(access_log.flush())
+    first, second = read_lines(stream)
+
+    assert first["route"] == "level:plain"
+    assert first["level"] == 1
+    assert first["status"] == 200
+    assert first["duration_ms"] == 4.2
+    assert first["client"] == "10.0.0.1"
+    assert first["player"] == get_player_name("token")
+    assert second["route"] is None
+    assert second["level"] is None
+    assert second["player"] is None
+    assert access_log.counters["logged"] == 2
+    assert len(access_log.records) == 0
+
+
+def test_player_token_is_not_logged() -> None:
+    stream = StringIO()
+    access_log = get_access_log(stream)
+
+    access_log.log(get_scope(player="secret-token"), 200, 0.001)
+    asyncio.run(access_log.flush())
+
+    assert "secret-token" not in stream.getvalue()
+
+
+def test_sampling_by_status() -> None:
+    stream = StringIO()
+    access_log = get_access_log(stream, sample_rates={"403": 0, "4xx": 1, "2xx": 0})
+
+    access_log.log(get_scope(), 403, 0.001)
+    access_log.log(get_scope(), 200, 0.001)
+    access_log.log(get_scope(), 404, 0.001)
+    access_log.log(get_scope(), 500, 0.001)
+    asyncio.run(access_log.flush())
+
+    assert [line["status"] for line in read_lines(stream)] == [404, 500]
+    assert access_log.counters["sampled_out"] == 2
+
+
+def test_full_buffer_drops_oldest() -> None:
+    stream = StringIO()
+    access_log = get_access_log(stream, buffer_size=2)
+
+    for index in range(3):
+        access_log.log(get_scope(f"/level/{index}"), 200, 0.001)
+
+    asyncio.run(access_log.flush())
+
+    assert [line["path"] for line in read_lines(stream)] == ["/level/1", "/level/2"]
+    assert access_log.counters["dropped"] == 1
+
+
+def test_collect() -> None:
+    access_log = get_access_log(StringIO())
+
+    assert 'access_log_records_total{outcome="dropped"} 0' in access_log.collect()
+
+
+def test_application_flushes_on_shutdown(loop: asyncio.AbstractEventLoop) -> None:
+    app = get_application()
+    stream = StringIO()
+    app.state.access_log.stream = stream
+
+    with TestClient(app) as client:
+        client.get("/level/1", headers={"X-Password": passwords.PLAIN})
+        client.get("/level/2")
+
+    assert [
+        (line["path"], line["level"], line["status"]) for line in read_lines(stream)
+    ] == [
+        ("/level/1", 1, status.HTTP_200_OK),
+        ("/level/2", 2, status.HTTP_403_FORBIDDEN),
+    ]
+
+
+def test_access_log_metrics(client: TestClient) -> None:
+    response = client.get("/metrics")
+
+    assert (
+        f'access_log_records_total{{pid="{os.getpid()}",outcome="logged"}}'
+        in response.text
+    )
@@ -0,0 +1,143 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from starlette import status
+from starlette.testclient import TestClient
+
+from http_quest import passwords, settings
+from http_quest.analytics import LEVEL_SIZE, Analytics, merge
+from http_quest.app import get_application
+
+
+def test_record() -> None:
+    analytics = Analytics(2, struggle_attempts=3)
+
+    for index in range(1000):
+        analytics.record(1, f"client-{index}")
+
+    for _ in range(5):
+        analytics.record(2, "stuck")
+
+    analytics.record(2, "lucky")
+
+    first, second = analytics.get_stats()["levels"]
+
+    assert first["attempts"] == 1000
+    assert 950 <= first["unique_clients"] <= 1050
+    assert first["struggling_clients"] == 0
+    assert second == {
+        "level": 2,
+        "unique_clients": 2,
+        "attempts": 6,
+        "struggling_clients": 1,
+    }
+    assert analytics.get_attempts(2, "stuck") == 5
+    assert analytics.get_attempts(2, "lucky") == 1
+
+
+def test_memory_is_fixed() -> None:
+    analytics = Analytics(12)
+
+    for index in range(5000):
+        analytics.record(10, f"client-{index}")
+
+    assert len(analytics.snapshot()) == 12 * LEVEL_SIZE
+    assert LEVEL_SIZE < 16 * 1024
+
+
+def test_merge() -> None:
+    first = Analytics(1)
+    second = Analytics(1)
+
+    for index in range(100):
+        first.record(1, f"client-{index}")
+        second.record(1, f"client-{index + 50}")
+
+    second.record(1, "client-0")
+    stats = first.get_stats(merge([first.snapshot(), second.snapshot()], 1))
+
+    assert stats["levels"][0]["attempts"] == 201
+    assert 145 <= stats["levels"][0]["unique_clients"] <= 155
+
+
+def test_merge_wrong_size() -> None:
+    with pytest.raises(ValueError):
+        merge([b"\x00"], 1)
+
+
+def test_snapshot_merges_workers(tmp_path: Path) -> None:
+    first = Analytics(1, directory=str(tmp_path), filename="analytics-1.db")
+    second = Analytics(1, directory=str(tmp_path), filename="analytics-2.db")
+
+    first.record(1, "alice")
+    second.record(1, "bob")
+    second.record(1, "bob")
+
+    assert first.get_stats()["levels"][0]["unique_clients"] == 2
+    assert first.get_stats()["levels"][0]["attempts"] == 3
+    assert first.get_attempts(1, "bob") == 2
+
+
+def test_struggling_in_all_workers(tmp_path: Path) -> None:
+    # Neither worker alone sees 10 attempts of alice, but together they do
+    first = Analytics(1, 10, directory=str(tmp_path), filename="analytics-1.db")
+    second = Analytics(1, 10, directory=str(tmp_path), filename="analytics-2.db")
+
+    for _ in range(6):
+        first.record(1, "alice")
+        second.record(1, "alice")
+
+    first.record(1, "bob")
+    second.record(1, "bob")
+
+    stats = first.get_stats()["levels"][0]
+
+    assert stats["attempts"] == 14
+    assert stats["unique_clients"] == 2
+    assert stats["struggling_clients"] == 1
+
+
+def test_snapshot_is_cached(loop: asyncio.AbstractEventLoop) -> None:
+    now = [100.0]
+    analytics = Analytics(1, snapshot_ttl=5.0, clock=lambda: now[0])
+    analytics.record(1, "alice")
+    snapshot = loop.run_until_complete(analytics.get_snapshot())
+    analytics.record(1, "bob")
+
+    assert loop.run_until_complete(analytics.get_snapshot()) == snapshot
+
+    now[0] += 5.0
+
+    assert loop.run_until_complete(analytics.get_snapshot()) == analytics.snapshot()
+    assert analytics.snapshot() != snapshot
+
+
+def test_stats_endpoints(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "ANALYTICS_ENABLED", True)
+    app = get_application()
+    client = TestClient(app)
+
+    for number in (1, 2, 3):
+        client.post(
+            app.url_path_for("level:guess_number"),
+            headers={"X-Password": passwords.GUESS_NUMBER},
+            json={"number": number},
+        )
+
+    response = client.get(app.url_path_for("stats"))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["levels"][9] == {
+        "level": 10,
+        "unique_clients": 1,
+        "attempts": 3,
+        "struggling_clients": 0,
+    }
+
+    response = client.get(app.url_path_for("stats_sketch"))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["Content-Type"] == "application/octet-stream"
+    assert response.content == app.state.analytics.snapshot()
@@ -0,0 +1,89 @@
+from typing import Iterator
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from starlette import status
+from starlette.applications import Starlette
+from starlette.testclient import TestClient
+
+from http_quest import passwords, secrets, settings
+
+
+@pytest.fixture(autouse=True)
+def max_body_size(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "MAX_BODY_SIZE", 64)
+
+
+def test_body_is_within_limit(client: TestClient, app: Starlette) -> None:
+    response = client.post(
+        app.url_path_for("level:robots"),
+        headers={"X-Password": passwords.ROBOTS},
+        json={"secret": secrets.ROBOTS},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_content_length_is_too_large(client: TestClient, app: Starlette) -> None:
+    response = client.post(
+        app.url_path_for("level:robots"),
+        headers={"X-Password": passwords.ROBOTS},
+        json={"secret": "x" * 64},
+    )
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert response.text == "Request body is too large."
+
+
+def test_streamed_body_is_too_large(client: TestClient, app: Starlette) -> None:
+    def chunks() -> Iterator[bytes]:
+        yield b'{"secret": "'
+        for _ in range(10):
+            yield b"x" * 16
+        yield b'"}'
+
+    response = client.post(
+        app.url_path_for("level:robots"),
+        headers={"X-Password": passwords.ROBOTS, "Content-Type": "application/json"},
+        data=chunks(),
+    )
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert response.text == "Request body is too large."
+
+
+def test_content_type_is_not_json(client: TestClient, app: Starlette) -> None:
+    response = client.post(
+        app.url_path_for("level:robots"),
+        headers={"X-Password": passwords.ROBOTS},
+        data={"secret": secrets.ROBOTS},
+    )
+
+    assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+    assert response.text == "Content-Type header should be application/json."
+
+
+def test_content_type_with_charset(client: TestClient, app: Starlette) -> None:
+    response = client.post(
+        app.url_path_for("level:robots"),
+        headers={
+            "X-Password": passwords.ROBOTS,
+            "Content-Type": "Application/JSON; charset=utf-8",
+        },
+        data=f'{{"secret": "{secrets.ROBOTS}"}}',
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_body_is_not_utf8(client: TestClient, app: Starlette) -> None:
+    response = client.post(
+        app.url_path_for("level:robots"),
+        headers={"X-Password": passwords.ROBOTS, "Content-Type": "application/json"},
+        data=b"\xff\xfe",
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == {
+        "errors": {"secret": ["Missing data for required field."]}
+    }
@@ -0,0 +1,175 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from http_quest import settings
+from http_quest.app import get_application
+from http_quest.errors import ErrorReporter, ErrorReportingMiddleware, get_fingerprint
+
+
+class Sink:
+    """Local stand-in for Bugsnag, which remembers received payloads."""
+
+    def __init__(self) -> None:
+        self.payloads: List[Dict[str, Any]] = []
+        self.headers: List[Dict[str, str]] = []
+        self.received = threading.Event()
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                length = int(self.headers["Content-Length"])
+                sink.payloads.append(json.loads(self.rfile.read(length)))
+                sink.headers.append(dict(self.headers))
+                self.send_response(200)
+                self.end_headers()
+                sink.received.set()
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+
+    @property
+    def events(self) -> List[Dict[str, Any]]:
+        return [event for payload in self.payloads for event in payload["events"]]
+
+
+@pytest.fixture
+def sink() -> Iterator[Sink]:
+    sink = Sink()
+    thread = threading.Thread(target=sink.server.serve_forever, daemon=True)
+    thread.start()
+    yield sink
+    sink.server.shutdown()
+    sink.server.server_close()
+
+
+def raise_error(message: str) -> None:
+    raise ValueError(message)
+
+
+def get_exception(message: str = "boom") -> Exception:
+    try:
+        raise_error(message)
+    except ValueError as exc:
+        return exc
+
+    raise AssertionError("Exception wasn't raised")
+
+
+SCOPE = {"type": "http", "method": "GET", "path": "/level/1"}
+
+
+def test_get_fingerprint() -> None:
+    first, second = get_exception("one"), get_exception("two")
+
+    assert get_fingerprint(first) == get_fingerprint(second)
+    assert get_fingerprint(first)[0] == "ValueError"
+    assert get_fingerprint(ValueError()) == ("ValueError", "", 0)
+
+
+def test_report_batches(sink: Sink) -> None:
+    reporter = ErrorReporter("key", url=sink.url, flush_interval=0.1, dedup_window=0)
+
+    for _ in range(3):
+        reporter.report(get_exception(), SCOPE)
+
+    reporter.start()
+    reporter.stop()
+
+    assert len(sink.payloads) == 1
+    assert sink.headers[0]["Bugsnag-Api-Key"] == "key"
+    assert len(sink.events) == 3
+    event = sink.events[0]
+    assert event["exceptions"][0]["errorClass"] == "ValueError"
+    assert event["exceptions"][0]["message"] == "boom"
+    assert event["exceptions"][0]["stacktrace"][0]["method"] == "raise_error"
+    assert event["request"] == {"httpMethod": "GET", "url": "/level/1"}
+    assert reporter.counters["sent"] == 3
+
+
+def test_report_deduplicates(sink: Sink) -> None:
+    reporter = ErrorReporter("key", url=sink.url, flush_interval=0.1)
+
+    for _ in range(5):
+        reporter.report(get_exception(), SCOPE)
+
+    reporter.start()
+    reporter.stop()
+
+    assert len(sink.events) == 1
+    assert reporter.counters["deduplicated"] == 4
+
+
+def test_report_samples() -> None:
+    reporter = ErrorReporter("key", sample_rates={"ValueError": 0.0})
+
+    reporter.report(get_exception(), SCOPE)
+    reporter.report(KeyError("key"), SCOPE)
+
+    assert reporter.counters["sampled_out"] == 1
+    assert reporter.queue.qsize() == 1
+
+
+def test_report_drops_when_queue_is_full() -> None:
+    reporter = ErrorReporter("key", queue_size=2, dedup_window=0)
+
+    for _ in range(5):
+        reporter.report(get_exception(), SCOPE)
+
+    assert reporter.counters["queued"] == 2
+    assert reporter.counters["dropped"] == 3
+
+
+def test_send_failure_is_counted() -> None:
+    reporter = ErrorReporter("key", url="http://127.0.0.1:9/", timeout=1)
+
+    reporter.send([(get_exception(), {"httpMethod": "GET", "url": "/"}, 0)])
+
+    assert reporter.counters["failed"] == 1
+
+
+def test_collect() -> None:
+    reporter = ErrorReporter("key")
+
+    assert 'error_reports_total{outcome="dropped"} 0' in reporter.collect()
+
+
+def test_middleware(sink: Sink) -> None:
+    async def fail(request: Request) -> Response:
+        raise_error("endpoint failed")
+        return Response()
+
+    reporter = ErrorReporter("key", url=sink.url, flush_interval=0.1)
+    app = Starlette(routes=[Route("/fail", fail)])
+    app.add_middleware(ErrorReportingMiddleware, reporter=reporter)
+    reporter.start()
+
+    response = TestClient(app, raise_server_exceptions=False).get("/fail")
+
+    assert response.status_code == 500
+    assert sink.received.wait(5)
+    reporter.stop()
+    assert sink.events[0]["exceptions"][0]["message"] == "endpoint failed"
+    assert sink.events[0]["context"] == "/fail"
+
+
+def test_application_reports_to_configured_url(
+    monkeypatch: MonkeyPatch, sink: Sink
+) -> None:
+    monkeypatch.setattr(settings, "ERROR_REPORTING_URL", sink.url)
+    app = get_application()
+
+    assert app.state.reporter.url == sink.url
+    assert app.state.reporter.api_key == "secret"
@@ -0,0 +1,126 @@
+from typing import Any, Dict
+
+import pytest
+
+from http_quest import headers
+from http_quest.headers import (
+    UserAgent,
+    collect,
+    get_languages,
+    get_user_agent,
+    is_language_accepted,
+    parse_accept_language,
+    parse_user_agent,
+)
+
+
+def get_scope(**values: str) -> Dict[str, Any]:
+    return {
+        "type": "http",
+        "headers": [
+            (name.replace("_", "-").encode(), value.encode("latin-1"))
+            for name, value in values.items()
+        ],
+    }
+
+
+@pytest.mark.parametrize(
+    "value, languages",
+    [
+        ("", ()),
+        ("ru-RU", (("ru-ru", 1.0),)),
+        ("en-US,en;q=0.5,ru;q=0.8", (("en-us", 1.0), ("ru", 0.8), ("en", 0.5))),
+        ("da, en-gb;q=0.8, en;q=0.7", (("da", 1.0), ("en-gb", 0.8), ("en", 0.7))),
+        ("*;Q=0.1, fr;q=1.000", (("fr", 1.0), ("*", 0.1))),
+        ("ru;q=0", (("ru", 0.0),)),
+        # Invalid ranges and weights are skipped
+        ("true-ish, ru;q=2, ru;q=0.5;x=1, ru_RU, ru;q=0.1234", (("true-ish", 1.0),)),
+    ],
+)
+def test_parse_accept_language(value: str, languages: headers.Languages) -> None:
+    assert parse_accept_language(value) == languages
+
+
+@pytest.mark.parametrize(
+    "value, is_accepted",
+    [
+        ("ru", True),
+        ("RU-ru", True),
+        ("en-US,en;q=0.9,ru;q=0.1", True),
+        ("ru;q=0", False),
+        ("true-ish", False),
+        ("en-US, *", False),
+        ("rus", False),
+        ("", False),
+    ],
+)
+def test_is_russian_accepted(value: str, is_accepted: bool) -> None:
+    assert is_language_accepted(parse_accept_language(value), "ru") is is_accepted
+
+
+@pytest.mark.parametrize(
+    "value, user_agent",
+    [
+        (
+            "Mozilla/4.0 (compatible; MSIE 6.0; Windows NT 5.1; SV1)",
+            UserAgent("msie", 6),
+        ),
+        ("Mozilla/4.0 (compatible; MSIE 6.0b; Windows NT 5.0)", UserAgent("msie", 6)),
+        ("Mozilla/4.0 (compatible; MSIE 7.0; Windows NT 6.0)", UserAgent("msie", 7)),
+        (
+            "Mozilla/4.0 (compatible; MSIE 6.0; Windows NT 5.1; en) Opera 8.50",
+            UserAgent("opera"),
+        ),
+        ("Opera/9.80 (Windows NT 6.1; U; en) Presto/2.2.15", UserAgent("opera")),
+        # Bare token, like the one set by curl -A, is recognised too
+        ("MSIE 6.0", UserAgent("msie", 6)),
+        ("curl/7.68.0 msie 6.0", UserAgent("msie", 6)),
+        ("Opera/9.80 MSIE 6.0", UserAgent("opera")),
+        # Substring in a product isn't a browser version
+        ("curl/7.68.0-msie 6.0", UserAgent("other")),
+        ("notmsie 6.0", UserAgent("other")),
+        ("Mozilla/5.0 (X11; Linux x86_64; rv:78.0) Firefox/78.0", UserAgent("other")),
+        ("", UserAgent("other")),
+    ],
+)
+def test_parse_user_agent(value: str, user_agent: UserAgent) -> None:
+    assert parse_user_agent(value) == user_agent
+
+
+def test_get_user_agent_is_cached() -> None:
+    scope = get_scope(user_agent="Mozilla/4.0 (compatible; MSIE 6.0; cache test)")
+    hits = headers._user_agents.hits
+    misses = headers._user_agents.misses
+
+    assert get_user_agent(scope) == UserAgent("msie", 6)
+    assert get_user_agent(scope) == UserAgent("msie", 6)
+    assert headers._user_agents.misses == misses + 1
+    assert headers._user_agents.hits == hits + 1
+
+
+def test_get_languages_is_cached() -> None:
+    scope = get_scope(accept_language="ru, cache-test")
+    hits = headers._languages.hits
+
+    assert get_languages(scope) == get_languages(scope)
+    assert headers._languages.hits == hits + 1
+
+
+def test_long_values_are_not_cached() -> None:
+    value = "en;q=0.5, " * 100 + "ru"
+    size = len(headers._languages)
+
+    assert is_language_accepted(get_languages(get_scope(accept_language=value)), "ru")
+    assert len(headers._languages) == size
+
+
+def test_missing_headers() -> None:
+    assert get_user_agent(get_scope()) == UserAgent("other")
+    assert get_languages(get_scope()) == ()
+
+
+def test_collect() -> None:
+    lines = collect()
+
+    assert any('header="user-agent",result="hit"' in line for line in lines)
+    assert any('header="accept-language",result="miss"' in line for line in lines)
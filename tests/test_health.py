@@ -0,0 +1,87 @@
+import asyncio
+
+from _pytest.monkeypatch import MonkeyPatch
+from starlette import status
+from starlette.applications import Starlette
+from starlette.testclient import TestClient
+
+from http_quest import passwords, settings
+from http_quest.app import get_application
+from http_quest.health import Drainer
+
+
+def test_healthz(client: TestClient) -> None:
+    response = client.get("/healthz")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.text == "OK"
+
+
+def test_readyz_after_startup(loop: asyncio.AbstractEventLoop) -> None:
+    app = get_application()
+
+    assert (
+        TestClient(app).get("/readyz").status_code
+        == status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+    with TestClient(app) as client:
+        assert client.get("/readyz").status_code == status.HTTP_200_OK
+
+
+def test_draining(loop: asyncio.AbstractEventLoop) -> None:
+    app = get_application()
+
+    with TestClient(app) as client:
+        app.state.drainer.drain()
+
+        assert client.get("/healthz").status_code == status.HTTP_200_OK
+        assert client.get("/readyz").status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+        response = client.get("/level/1", headers={"X-Password": passwords.PLAIN})
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.headers["connection"] == "close"
+        assert response.headers["retry-after"] == "1"
+
+
+def test_health_checks_skip_metrics() -> None:
+    client = TestClient(get_application())
+    client.get("/healthz")
+    client.get("/readyz")
+
+    assert 'http_requests_total{route="unmatched"' not in client.get("/metrics").text
+
+
+def test_in_flight_requests(client: TestClient, app: Starlette) -> None:
+    client.get("/level/1", headers={"X-Password": passwords.PLAIN})
+
+    assert app.state.drainer.in_flight == 0
+
+
+def test_health_checks_are_not_shed(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "SHEDDING_ENABLED", True)
+    app = get_application()
+    app.state.shedder.lag = 100
+
+    assert TestClient(app).get("/healthz").status_code == status.HTTP_200_OK
+
+
+def test_wait_for_requests_in_flight(loop: asyncio.AbstractEventLoop) -> None:
+    drainer = Drainer(timeout=1.0, poll_interval=0.001)
+    drainer.in_flight = 1
+
+    async def finish_request() -> None:
+        await asyncio.sleep(0.01)
+        drainer.in_flight -= 1
+
+    loop.create_task(finish_request())
+
+    assert loop.run_until_complete(drainer.wait()) is True
+
+
+def test_wait_deadline(loop: asyncio.AbstractEventLoop) -> None:
+    drainer = Drainer(timeout=0.01, poll_interval=0.001)
+    drainer.in_flight = 1
+
+    assert loop.run_until_complete(drainer.wait()) is False
@@ -0,0 +1,175 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from starlette import status
+from starlette.testclient import TestClient
+
+from http_quest import passwords, settings
+from http_quest.app import get_application
+from http_quest.leaderboard import Leaderboard, LeaderboardSync, get_player_name
+from http_quest.loadtest import ASGIClient, Client, run
+from http_quest.progress import ProgressStore
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> Clock:
+    return Clock()
+
+
+@pytest.fixture
+def leaderboard(clock: Clock) -> Leaderboard:
+    return Leaderboard(size=2, refresh_interval=5.0, clock=clock)
+
+
+def test_add(leaderboard: Leaderboard) -> None:
+    leaderboard.add("alice", 30.0)
+    leaderboard.add("bob", 10.0)
+    leaderboard.add("carol", 20.0)
+    leaderboard.add("alice", 40.0)
+    leaderboard.add("alice", 5.0)
+
+    assert leaderboard.top() == [(5.0, "alice"), (10.0, "bob")]
+    assert leaderboard.results == [(5.0, "alice"), (10.0, "bob"), (20.0, "carol")]
+
+
+def test_load(leaderboard: Leaderboard) -> None:
+    leaderboard.load([("bob", 20.0), ("carol", 10.0), ("bob", 15.0)])
+    leaderboard.load([("alice", 12.0), ("carol", 11.0)])
+
+    assert leaderboard.results == [(10.0, "carol"), (12.0, "alice"), (15.0, "bob")]
+    assert leaderboard.best == {"alice": 12.0, "bob": 15.0, "carol": 10.0}
+
+
+def test_get_response(leaderboard: Leaderboard, clock: Clock) -> None:
+    leaderboard.add("alice", 12.3456)
+    response = leaderboard.get_response()
+
+    assert response.body == (
+        b'{"leaderboard":[{"rank":1,"player":"%s","seconds":12.346}]}'
+        % get_player_name("alice").encode()
+    )
+    assert leaderboard.get_response() is response
+
+
+def test_get_response_is_rebuilt_once_per_interval(
+    leaderboard: Leaderboard, clock: Clock
+) -> None:
+    leaderboard.add("alice", 30.0)
+    first = leaderboard.get_response()
+
+    leaderboard.add("bob", 20.0)
+    assert leaderboard.get_response() is first
+
+    clock.now += 5.0
+    assert leaderboard.get_response() is not first
+    assert leaderboard.rebuilds == 2
+
+
+def test_get_response_is_kept_if_top_is_same(
+    leaderboard: Leaderboard, clock: Clock
+) -> None:
+    leaderboard.add("alice", 10.0)
+    leaderboard.add("bob", 20.0)
+    response = leaderboard.get_response()
+
+    clock.now += 5.0
+    leaderboard.add("carol", 30.0)
+
+    assert leaderboard.get_response() is response
+    assert leaderboard.rebuilds == 1
+
+
+def test_leaderboard_endpoint(
+    monkeypatch: MonkeyPatch, tmp_path: Path, loop: asyncio.AbstractEventLoop
+) -> None:
+    monkeypatch.setattr(settings, "PROGRESS_ENABLED", True)
+    monkeypatch.setattr(settings, "PROGRESS_DATABASE", str(tmp_path / "progress.db"))
+    monkeypatch.setattr(settings, "LEADERBOARD_REFRESH_INTERVAL", 0.0)
+    app = get_application()
+
+    def client_factory() -> Client:
+        return ASGIClient(app)
+
+    with TestClient(app) as client:
+        loop.run_until_complete(run(client_factory, 3, 3))
+        response = client.get(app.url_path_for("leaderboard"))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [item["rank"] for item in response.json()["leaderboard"]] == [1, 2, 3]
+
+    # Results are restored from stored progress on startup
+    app = get_application()
+
+    with TestClient(app) as client:
+        assert client.get("/leaderboard").json() == response.json()
+
+
+def test_workers_share_leaderboard(
+    tmp_path: Path, loop: asyncio.AbstractEventLoop
+) -> None:
+    database = str(tmp_path / "progress.db")
+    first_progress = ProgressStore(database)
+    second_progress = ProgressStore(database)
+    first_sync = LeaderboardSync(Leaderboard(), first_progress)
+    second_sync = LeaderboardSync(Leaderboard(), second_progress)
+
+    # Level 12 is stored through one worker before level 1 through the other
+    second_progress.record("alice", 12, now=40.0)
+    loop.run_until_complete(second_progress.flush())
+    loop.run_until_complete(second_sync.sync())
+
+    assert second_sync.leaderboard.results == []
+
+    first_progress.record("alice", 1, now=10.0)
+    first_progress.record("bob", 1, now=20.0)
+    first_progress.record("bob", 12, now=25.0)
+    loop.run_until_complete(first_progress.flush())
+
+    for sync in (first_sync, second_sync):
+        loop.run_until_complete(sync.sync())
+
+        assert sync.leaderboard.results == [(5.0, "bob"), (30.0, "alice")]
+
+    # Completions, which were already loaded, aren't loaded again
+    assert first_progress.load_completions(1, 12, first_sync.last_row) == (
+        [],
+        first_sync.last_row,
+    )
+
+
+def test_finish_does_not_read_database(
+    monkeypatch: MonkeyPatch, tmp_path: Path, loop: asyncio.AbstractEventLoop
+) -> None:
+    monkeypatch.setattr(settings, "PROGRESS_ENABLED", True)
+    monkeypatch.setattr(settings, "PROGRESS_DATABASE", str(tmp_path / "progress.db"))
+    headers = {"X-Player-Token": "alice"}
+
+    # Progress is written to the database, when the first worker stops
+    with TestClient(get_application()) as client:
+        client.get("/level/1", headers={"X-Password": passwords.PLAIN, **headers})
+
+    app = get_application()
+    progress: ProgressStore = app.state.progress
+
+    with TestClient(app) as client:
+        monkeypatch.setattr(progress, "load", None)
+        client.get("/level/12", headers={"X-Password": passwords.FINISH, **headers})
+
+        assert app.state.leaderboard.best == {}
+
+        # Completion through two workers is added by sync
+        loop.run_until_complete(progress.flush())
+        sync = LeaderboardSync(app.state.leaderboard, progress)
+        loop.run_until_complete(sync.sync())
+
+    assert list(app.state.leaderboard.best) == ["alice"]
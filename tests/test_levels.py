@@ -25,6 +25,15 @@ def test_wrong_password(level: Level, app: Starlette, client: TestClient) -> Non
     assert response.text == "X-Password header is wrong"
 
 
+def test_non_ascii_password(client: TestClient, app: Starlette) -> None:
+    response = client.get(
+        app.url_path_for("level:plain"), headers={"X-Password": "qwértý"}
+    )
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert response.text == "X-Password header is wrong"
+
+
 def test_plain(client: TestClient, app: Starlette) -> None:
     response = client.get(
         app.url_path_for("level:plain"), headers={"X-Password": passwords.PLAIN}
@@ -100,6 +109,18 @@ def test_user_agent_is_not_ie_6(client: TestClient, app: Starlette) -> None:
     )
 
 
+def test_user_agent_is_opera(client: TestClient, app: Starlette) -> None:
+    response = client.get(
+        app.url_path_for("level:user_agent"),
+        headers={
+            "X-Password": passwords.USER_AGENT,
+            "User-Agent": "Mozilla/4.0 (compatible; MSIE 6.0; Windows NT 5.1) Opera 8.5",
+        },
+    )
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
 def test_user_agent(client: TestClient, app: Starlette) -> None:
     response = client.get(
         app.url_path_for("level:user_agent"),
@@ -136,6 +157,21 @@ def test_accept_language_is_not_russian(client: TestClient, app: Starlette) -> N
     assert response.text == "Я говорю только по русски, товарищ."
 
 
+@pytest.mark.parametrize("accept_language", ["true-ish", "ru;q=0", "en, rus"])
+def test_accept_language_looks_russian(
+    client: TestClient, app: Starlette, accept_language: str
+) -> None:
+    response = client.get(
+        app.url_path_for("level:accept_language"),
+        headers={
+            "X-Password": passwords.ACCEPT_LANGUAGE,
+            "Accept-Language": accept_language,
+        },
+    )
+
+    assert response.status_code == status.HTTP_406_NOT_ACCEPTABLE
+
+
 def test_accept_language(client: TestClient, app: Starlette) -> None:
     response = client.get(
         app.url_path_for("level:accept_language"),
@@ -299,6 +335,39 @@ def test_mask(client: TestClient, app: Starlette) -> None:
     assert response.json() == {"password": passwords.FINISH}
 
 
+def test_mask_batch(client: TestClient, app: Starlette) -> None:
+    response = client.post(
+        app.url_path_for("level:mask"),
+        headers={"X-Password": passwords.MASK},
+        json={"secrets": ["eeeeeeeeeeeeeeeeeeee", secrets.MASK]},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"passwords": ["***u****7***********", passwords.FINISH]}
+
+
+@pytest.mark.parametrize(
+    "secrets_, errors",
+    [
+        ([], {"secrets": ["Length must be between 1 and 100."]}),
+        (["foo"] * 101, {"secrets": ["Length must be between 1 and 100."]}),
+        ("foo", {"secrets": ["Not a valid list."]}),
+        (["foo", 1], {"secrets": {"1": ["Not a valid string."]}}),
+    ],
+)
+def test_mask_batch_is_invalid(
+    secrets_: object, errors: dict, client: TestClient, app: Starlette
+) -> None:
+    response = client.post(
+        app.url_path_for("level:mask"),
+        headers={"X-Password": passwords.MASK},
+        json={"secrets": secrets_},
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == {"errors": errors}
+
+
 def test_finish(client: TestClient, app: Starlette) -> None:
     response = client.get(
         app.url_path_for("level:finish"), headers={"X-Password": passwords.FINISH},
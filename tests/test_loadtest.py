@@ -0,0 +1,83 @@
+import asyncio
+from typing import List
+
+import pytest
+from starlette.applications import Starlette
+
+from http_quest.loadtest import (
+    ASGIClient,
+    Client,
+    percentile,
+    read_response,
+    run,
+    run_in_process,
+)
+
+
+@pytest.mark.parametrize("batch_mask", [False, True])
+def test_run(batch_mask: bool, app: Starlette) -> None:
+    def client_factory() -> Client:
+        return ASGIClient(app)
+
+    stats, _elapsed = asyncio.run(run(client_factory, 2, 2, batch_mask=batch_mask))
+
+    assert (stats.completed, stats.failed) == (2, 0)
+    assert len(stats.latencies["level:redirect"]) == 2 * 21
+    assert len(stats.latencies["level:finish"]) == 2
+
+
+def test_run_in_process() -> None:
+    events: List[str] = []
+    app = Starlette(
+        on_startup=[lambda: events.append("startup")],
+        on_shutdown=[lambda: events.append("shutdown")],
+    )
+
+    stats, _elapsed = asyncio.run(run_in_process(app, 1, 1))
+
+    assert events == ["startup", "shutdown"]
+    assert (stats.completed, stats.failed) == (0, 1)
+    assert stats.errors == {"PlayerError: home returned 404": 1}
+
+
+def test_read_response_chunked() -> None:
+    async def read() -> None:
+        reader = asyncio.StreamReader()
+        reader.feed_data(
+            b"HTTP/1.1 307 Temporary Redirect\r\n"
+            b"Location: /level/8?secret=foo\r\n"
+            b"Transfer-Encoding: chunked\r\n\r\n"
+            b"3\r\nfoo\r\n0\r\n\r\n"
+        )
+        response = await read_response(reader)
+
+        assert response.status == 307
+        assert response.headers["location"] == "/level/8?secret=foo"
+        assert response.body == b"foo"
+
+    asyncio.run(read())
+
+
+def test_read_response_content_length() -> None:
+    async def read() -> None:
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nokHTTP")
+        response = await read_response(reader)
+
+        assert response.status == 200
+        assert response.text == "ok"
+
+    asyncio.run(read())
+
+
+def test_percentile() -> None:
+    values = [float(value) for value in range(1, 101)]
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([1.0], 95) == 1
+
+
+def test_client_is_abstract() -> None:
+    with pytest.raises(TypeError):
+        Client()  # type: ignore
@@ -0,0 +1,112 @@
+import sys
+import tracemalloc
+from typing import Iterator
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from starlette import status
+from starlette.datastructures import Secret
+from starlette.testclient import TestClient
+
+from http_quest import settings
+from http_quest.app import get_application
+from http_quest.leaderboard import Leaderboard
+from http_quest.memory import MemoryTracker, get_group, get_module_names, get_rss
+
+
+@pytest.fixture
+def tracker() -> Iterator[MemoryTracker]:
+    tracker = MemoryTracker(frames=5)
+    yield tracker
+    tracker.stop()
+
+
+def test_get_rss() -> None:
+    rss = get_rss()
+
+    if sys.platform.startswith("linux"):
+        assert rss is not None and rss > 1024 * 1024
+
+
+def test_get_group() -> None:
+    traceback = tracemalloc.Traceback(
+        (
+            (sys.modules["json"].__file__, 1),
+            (sys.modules["http_quest.leaderboard"].__file__, 2),
+            (sys.modules["json.decoder"].__file__, 3),
+        )
+    )
+
+    assert get_group(traceback, get_module_names()) == "http_quest.leaderboard"
+
+
+def test_get_group_outside_of_package() -> None:
+    traceback = tracemalloc.Traceback(((sys.modules["json.decoder"].__file__, 1),))
+
+    assert get_group(traceback, get_module_names()) == "json"
+
+
+def test_diff_groups_growth_by_module(tracker: MemoryTracker) -> None:
+    leaderboard = Leaderboard()
+    tracker.start()
+
+    for index in range(10000):
+        leaderboard.add(f"player-{index}", float(index))
+
+    report = tracker.diff()
+    modules = {module["module"]: module for module in report["modules"]}
+
+    assert modules["http_quest.leaderboard"]["size_diff"] > 100_000
+    assert modules["http_quest.leaderboard"]["count_diff"] > 5000
+    assert report["sites"]
+
+
+def test_diff_without_start(tracker: MemoryTracker) -> None:
+    with pytest.raises(RuntimeError):
+        tracker.diff()
+
+
+def test_get_report(tracker: MemoryTracker) -> None:
+    report = tracker.get_report()
+
+    assert report["started"] is True
+    assert tracker.tracing
+
+    report = tracker.get_report(limit=3)
+
+    assert "started" not in report
+    assert len(report["sites"]) <= 3
+    assert report["traced"]["current"] > 0
+
+
+def test_memory_endpoint(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", Secret("admin"))
+    client = TestClient(get_application())
+    headers = {"X-Admin-Token": "admin"}
+
+    try:
+        response = client.get("/admin/memory", headers=headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["started"] is True
+
+        response = client.get("/admin/memory?limit=5", headers=headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "modules" in response.json()
+
+        response = client.get("/admin/memory?limit=many", headers=headers)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    finally:
+        response = client.get("/admin/memory?stop=1", headers=headers)
+
+    assert response.json()["stopped"] is True
+    assert not tracemalloc.is_tracing()
+
+
+def test_memory_endpoint_wrong_token(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", Secret("admin"))
+    client = TestClient(get_application())
+
+    assert client.get("/admin/memory").status_code == status.HTTP_403_FORBIDDEN
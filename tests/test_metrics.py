@@ -0,0 +1,108 @@
+import os
+from pathlib import Path
+
+from starlette import status
+from starlette.applications import Starlette
+from starlette.testclient import TestClient
+
+from http_quest import levels, passwords
+from http_quest.metrics import UNMATCHED_ROUTE, Metrics, get_endpoint_names, key_by_id
+
+
+def test_get_endpoint_names(app: Starlette) -> None:
+    names = get_endpoint_names(app.routes)
+
+    assert names[levels.plain] == "level:plain"
+    assert names[levels.mask] == "level:mask"
+    assert "home" in names.values()
+
+
+def test_key_by_id() -> None:
+    assert key_by_id({levels.plain: "level:plain", levels.mask: "level:mask"}) == {
+        id(levels.plain): "level:plain",
+        id(levels.mask): "level:mask",
+    }
+
+
+def test_observe() -> None:
+    metrics = Metrics({levels.plain: "level:plain"})
+
+    metrics.observe(levels.plain, 200, 0.003)
+    metrics.observe(levels.plain, 403, 0.2)
+    metrics.observe(levels.plain, 418, 10.0)
+    metrics.observe(None, 404, 0.0001)
+    content = metrics.render()
+
+    assert 'http_requests_total{route="level:plain",status="200"} 1' in content
+    assert 'http_requests_total{route="level:plain",status="403"} 1' in content
+    assert 'http_requests_total{route="level:plain",status="other"} 1' in content
+    assert f'http_requests_total{{route="{UNMATCHED_ROUTE}",status="404"}} 1' in content
+    assert (
+        'http_request_duration_seconds_bucket{route="level:plain",le="0.0025"} 0'
+        in content
+    )
+    assert (
+        'http_request_duration_seconds_bucket{route="level:plain",le="0.005"} 1'
+        in content
+    )
+    assert (
+        'http_request_duration_seconds_bucket{route="level:plain",le="0.25"} 2'
+        in content
+    )
+    assert (
+        'http_request_duration_seconds_bucket{route="level:plain",le="+Inf"} 3'
+        in content
+    )
+    assert 'http_request_duration_seconds_count{route="level:plain"} 3' in content
+    assert 'http_request_duration_seconds_sum{route="level:plain"} 10.203' in content
+
+
+def test_collect_sums_workers(tmp_path: Path) -> None:
+    endpoint_names = {levels.plain: "level:plain"}
+    first = Metrics(endpoint_names, str(tmp_path), "metrics-1.db")
+    second = Metrics(endpoint_names, str(tmp_path), "metrics-2.db")
+
+    first.observe(levels.plain, 200, 0.001)
+    second.observe(levels.plain, 200, 0.001)
+    second.observe(levels.plain, 200, 0.001)
+
+    assert 'http_requests_total{route="level:plain",status="200"} 3' in first.render()
+
+
+def test_collect_skips_foreign_files(tmp_path: Path) -> None:
+    (tmp_path / "metrics-1.db").write_bytes(b"\x00" * 16)
+    metrics = Metrics({levels.plain: "level:plain"}, str(tmp_path), "metrics-2.db")
+
+    metrics.observe(levels.plain, 200, 0.001)
+
+    assert 'route="level:plain",status="200"} 1' in metrics.render()
+
+
+def test_add_collector() -> None:
+    metrics = Metrics({})
+
+    metrics.add_collector(
+        lambda: ["# TYPE quest_players gauge", "quest_players 42", 'hits{a="b"} 1']
+    )
+    output = metrics.render()
+
+    # Collected values are of a single worker
+    assert "# TYPE quest_players gauge\n" in output
+    assert f'quest_players{{pid="{os.getpid()}"}} 42\n' in output
+    assert f'hits{{pid="{os.getpid()}",a="b"}} 1\n' in output
+
+
+def test_metrics_endpoint(client: TestClient, app: Starlette) -> None:
+    client.get(app.url_path_for("level:plain"), headers={"X-Password": "wrong"})
+    client.get(app.url_path_for("level:plain"), headers={"X-Password": passwords.PLAIN})
+    client.get("/unknown")
+
+    response = client.get(app.url_path_for("metrics"))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert 'http_requests_total{route="level:plain",status="200"}' in response.text
+    assert 'http_requests_total{route="level:plain",status="403"}' in response.text
+    assert f'http_requests_total{{route="{UNMATCHED_ROUTE}",status="404"}}' in (
+        response.text
+    )
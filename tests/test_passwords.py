@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from starlette import status
+from starlette.applications import Starlette
+from starlette.testclient import TestClient
+
+from http_quest import passwords
+from http_quest.loadtest import ASGIClient, Client, run
+from http_quest.quests import DEFAULT_QUEST
+
+
+@pytest.fixture
+def derived(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(DEFAULT_QUEST, "key", b"key")
+
+
+def test_derive_password() -> None:
+    password = passwords.derive_password(b"key", "alice", 1)
+
+    assert len(password) == passwords.LENGTH
+    assert password.isalnum()
+    assert password == passwords.derive_password(b"key", "alice", 1)
+    assert password != passwords.derive_password(b"key", "alice", 2)
+    assert password != passwords.derive_password(b"key", "bob", 1)
+    assert password != passwords.derive_password(b"other", "alice", 1)
+
+
+def test_get_password_static() -> None:
+    assert DEFAULT_QUEST.get_password(1) == passwords.PLAIN
+    assert DEFAULT_QUEST.get_password(12, "alice") == passwords.FINISH
+
+
+@pytest.mark.usefixtures("derived")
+def test_get_password_derived() -> None:
+    assert DEFAULT_QUEST.get_password(1) == passwords.PLAIN
+    assert DEFAULT_QUEST.get_password(1, "alice") == passwords.derive_password(
+        b"key", "alice", 1
+    )
+
+
+@pytest.mark.usefixtures("derived")
+def test_home_requires_player(client: TestClient, app: Starlette) -> None:
+    response = client.get(app.url_path_for("home"))
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert response.text == "X-Player-Token header is required"
+
+
+@pytest.mark.usefixtures("derived")
+def test_level_requires_player(client: TestClient, app: Starlette) -> None:
+    response = client.get(
+        app.url_path_for("level:plain"), headers={"X-Password": passwords.PLAIN}
+    )
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert response.text == "X-Player-Token header is required"
+
+
+@pytest.mark.usefixtures("derived")
+def test_level_rejects_password_of_other_player(
+    client: TestClient, app: Starlette
+) -> None:
+    response = client.get(
+        app.url_path_for("level:plain"),
+        headers={
+            "X-Password": DEFAULT_QUEST.get_password(1, "bob"),
+            "X-Player-Token": "alice",
+        },
+    )
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert response.text == "X-Password header is wrong"
+
+
+@pytest.mark.usefixtures("derived")
+def test_level_returns_derived_password(client: TestClient, app: Starlette) -> None:
+    response = client.get(
+        app.url_path_for("level:plain"),
+        headers={
+            "X-Password": DEFAULT_QUEST.get_password(1, "alice"),
+            "X-Player-Token": "alice",
+        },
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"password": DEFAULT_QUEST.get_password(2, "alice")}
+
+
+@pytest.mark.usefixtures("derived")
+@pytest.mark.parametrize("batch_mask", [False, True])
+def test_playthrough(batch_mask: bool, app: Starlette) -> None:
+    def client_factory() -> Client:
+        return ASGIClient(app)
+
+    stats, _elapsed = asyncio.run(run(client_factory, 2, 2, batch_mask=batch_mask))
+
+    assert (stats.completed, stats.failed) == (2, 0)
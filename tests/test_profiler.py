@@ -0,0 +1,131 @@
+import asyncio
+from collections import Counter
+from time import perf_counter
+
+from _pytest.monkeypatch import MonkeyPatch
+from starlette import status
+from starlette.applications import Starlette
+from starlette.datastructures import Secret
+from starlette.testclient import TestClient
+from starlette.types import Receive, Scope, Send
+
+from http_quest import levels, settings
+from http_quest.app import get_application
+from http_quest.profiler import BACKGROUND, Profiler, ProfilerMiddleware
+
+
+def get_admin_application(monkeypatch: MonkeyPatch) -> Starlette:
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", Secret("admin"))
+
+    return get_application()
+
+
+def busy_loop(seconds: float) -> None:
+    deadline = perf_counter() + seconds
+
+    while perf_counter() < deadline:
+        pass
+
+
+async def slow_mask(scope: Scope, receive: Receive, send: Send) -> None:
+    scope["endpoint"] = levels.mask
+    busy_loop(0.2)
+
+
+def test_profile_attributes_samples_to_route(loop: asyncio.AbstractEventLoop) -> None:
+    profiler = Profiler({levels.mask: "level:mask"}, interval=0.001)
+    app = ProfilerMiddleware(slow_mask, profiler)
+
+    async def run() -> Counter:
+        profile = asyncio.ensure_future(profiler.profile(0.3))
+        await asyncio.sleep(0.01)
+        await app({"type": "http"}, None, None)  # type: ignore
+        return await profile
+
+    stacks = loop.run_until_complete(run())
+    mask_stacks = Counter(
+        {
+            stack: count
+            for stack, count in stacks.items()
+            if stack.startswith("level:mask;")
+        }
+    )
+    stack, _count = mask_stacks.most_common(1)[0]
+
+    assert stack.endswith("tests.test_profiler:slow_mask;tests.test_profiler:busy_loop")
+    assert not profiler.running
+    assert profiler.scopes == {}
+
+
+def test_background_tasks(loop: asyncio.AbstractEventLoop) -> None:
+    profiler = Profiler({}, interval=0.001)
+
+    async def background() -> None:
+        busy_loop(0.1)
+
+    async def run() -> Counter:
+        profile = asyncio.ensure_future(profiler.profile(0.15))
+        await asyncio.sleep(0.01)
+        await asyncio.ensure_future(background())
+        return await profile
+
+    stacks = loop.run_until_complete(run())
+
+    assert any(stack.startswith(f"{BACKGROUND};") for stack in stacks)
+
+
+def test_middleware_does_nothing_when_not_running(
+    loop: asyncio.AbstractEventLoop,
+) -> None:
+    profiler = Profiler({})
+    app = ProfilerMiddleware(slow_mask, profiler)
+
+    loop.run_until_complete(app({"type": "http"}, None, None))  # type: ignore
+
+    assert profiler.scopes == {}
+
+
+def test_render() -> None:
+    stacks = Counter({"level:mask;a;b": 3, "(idle);c": 5})
+
+    assert Profiler.render(stacks) == "(idle);c 5\nlevel:mask;a;b 3\n"
+
+
+def test_profile_endpoint(monkeypatch: MonkeyPatch) -> None:
+    client = TestClient(get_admin_application(monkeypatch))
+
+    response = client.get(
+        "/admin/profile", params={"seconds": "0.05"}, headers={"X-Admin-Token": "admin"}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.text.startswith("(")
+
+
+def test_profile_endpoint_wrong_token(monkeypatch: MonkeyPatch) -> None:
+    client = TestClient(get_admin_application(monkeypatch))
+
+    assert client.get("/admin/profile").status_code == status.HTTP_403_FORBIDDEN
+
+    response = client.get("/admin/profile", headers={"X-Admin-Token": "wrong"})
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_profile_endpoint_invalid_seconds(monkeypatch: MonkeyPatch) -> None:
+    client = TestClient(get_admin_application(monkeypatch))
+
+    for seconds in ("abc", "0", "3600"):
+        response = client.get(
+            "/admin/profile",
+            params={"seconds": seconds},
+            headers={"X-Admin-Token": "admin"},
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_profile_endpoint_is_disabled_without_token(client: TestClient) -> None:
+    response = client.get("/admin/profile", headers={"X-Admin-Token": ""})
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
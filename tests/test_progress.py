@@ -0,0 +1,119 @@
+import asyncio
+import threading
+from pathlib import Path
+from typing import List
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from starlette.testclient import TestClient
+
+from http_quest import passwords, settings
+from http_quest.app import get_application
+from http_quest.progress import MAX_PLAYER_LENGTH, PlayerProgress, ProgressStore
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> ProgressStore:
+    return ProgressStore(str(tmp_path / "progress.db"), queue_size=2, cache_size=2)
+
+
+def test_record(store: ProgressStore) -> None:
+    store.record("alice", 1, now=10.0)
+    store.record("alice", 2, now=20.0)
+    store.record("alice", 1, now=30.0)
+
+    progress = store.get("alice")
+
+    assert progress is not None
+    assert progress.highest_level == 2
+    assert progress.visits == {1: (10.0, 30.0), 2: (20.0, 20.0)}
+
+
+def test_record_evicts_players(store: ProgressStore) -> None:
+    store.record("alice", 1)
+    store.record("bob", 1)
+    store.record("carol", 1)
+
+    assert store.get("alice") is None
+    assert store.get("carol") is not None
+
+
+def test_record_queue_is_bounded(store: ProgressStore) -> None:
+    store.record("alice", 1)
+    store.record("alice", 2)
+    store.record("alice", 3)
+    store.record("alice", 1)
+
+    assert store.dropped == 1
+
+
+def test_flush(store: ProgressStore, loop: asyncio.AbstractEventLoop) -> None:
+    store.record("alice", 1, now=10.0)
+    loop.run_until_complete(store.flush())
+    store.record("alice", 1, now=30.0)
+    store.record("alice", 2, now=40.0)
+    loop.run_until_complete(store.stop())
+
+    progress = store.load("alice")
+
+    assert progress.highest_level == 2
+    assert progress.visits == {1: (10.0, 30.0), 2: (40.0, 40.0)}
+
+
+def test_load_waits_for_lock(store: ProgressStore) -> None:
+    # Connection is shared by threadpool threads, so reads take the lock too
+    loaded: List[PlayerProgress] = []
+    thread = threading.Thread(target=lambda: loaded.append(store.load("alice")))
+
+    with store._lock:
+        thread.start()
+        thread.join(0.1)
+
+        assert thread.is_alive()
+
+    thread.join(1)
+
+    assert loaded[0].highest_level == 0
+
+
+@pytest.mark.parametrize(
+    "headers,cookies",
+    [({"X-Player-Token": "alice"}, {}), ({}, {"player_token": "alice"})],
+)
+def test_levels_record_progress(
+    monkeypatch: MonkeyPatch,
+    tmp_path: Path,
+    loop: asyncio.AbstractEventLoop,
+    headers: dict,
+    cookies: dict,
+) -> None:
+    monkeypatch.setattr(settings, "PROGRESS_ENABLED", True)
+    monkeypatch.setattr(settings, "PROGRESS_DATABASE", str(tmp_path / "progress.db"))
+    app = get_application()
+
+    with TestClient(app) as client:
+        client.get(
+            "/level/1",
+            headers={"X-Password": passwords.PLAIN, **headers},
+            cookies=cookies,
+        )
+        client.get("/level/2", headers={"X-Password": "wrong", **headers})
+
+    assert app.state.progress.load("alice").highest_level == 1
+
+
+def test_levels_ignore_invalid_player(
+    monkeypatch: MonkeyPatch, tmp_path: Path, loop: asyncio.AbstractEventLoop
+) -> None:
+    monkeypatch.setattr(settings, "PROGRESS_ENABLED", True)
+    monkeypatch.setattr(settings, "PROGRESS_DATABASE", str(tmp_path / "progress.db"))
+    app = get_application()
+    player = "a" * (MAX_PLAYER_LENGTH + 1)
+
+    with TestClient(app) as client:
+        client.get(
+            "/level/1",
+            headers={"X-Password": passwords.PLAIN, "X-Player-Token": player},
+        )
+
+    assert len(app.state.progress.players) == 0
@@ -0,0 +1,275 @@
+import asyncio
+import json
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from starlette import status
+from starlette.applications import Starlette
+from starlette.testclient import TestClient
+
+from http_quest import passwords, settings
+from http_quest.app import get_application
+from http_quest.quests import DEFAULT_QUEST, QuestStore, parse_quest
+
+# Quest of a workshop, all passwords and secrets differ from the default quest
+WORKSHOP = {
+    "passwords": [f"workshop-password-{level:02d}" for level in range(1, 13)],
+    "secrets": {
+        "robots": "workshop-robots",
+        "mask": "workshop-mask-secret",
+        "redirect": ["workshop-hop-1", "workshop-hop-2", "workshop-hop-3"],
+    },
+}
+
+
+def get_password(level: int) -> str:
+    password: str = WORKSHOP["passwords"][level - 1]  # type: ignore
+
+    return password
+
+
+@pytest.fixture
+def quests_dir(tmp_path: Path) -> Path:
+    (tmp_path / "workshop.json").write_text(json.dumps(WORKSHOP))
+    (tmp_path / "broken.json").write_text(json.dumps({"passwords": []}))
+
+    return tmp_path
+
+
+@pytest.fixture
+def quest_app(monkeypatch: MonkeyPatch, quests_dir: Path) -> Starlette:
+    monkeypatch.setattr(settings, "QUESTS_DIR", str(quests_dir))
+    monkeypatch.setattr(settings, "QUESTS_HOST_SUFFIX", "quest.test")
+
+    return get_application()
+
+
+@pytest.fixture
+def quest_client(quest_app: Starlette) -> TestClient:
+    return TestClient(quest_app)
+
+
+def test_parse_quest() -> None:
+    quest = parse_quest("workshop", WORKSHOP)
+
+    assert quest.name == "workshop"
+    assert quest.get_password(1) == get_password(1)
+    assert quest.get_password(12, "alice") == get_password(12)
+    assert quest.robots_secret == "workshop-robots"
+    assert quest.redirect_chain.first == "workshop-hop-1"
+    assert len(quest.responses) == 10
+    assert quest.responses[0].body == f'{{"password":"{get_password(2)}"}}'.encode()
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {},
+        [],
+        {"passwords": WORKSHOP["passwords"]},
+        {**WORKSHOP, "passwords": WORKSHOP["passwords"][:-1]},  # type: ignore
+        {**WORKSHOP, "passwords": "password"},
+        {**WORKSHOP, "passwords": [*WORKSHOP["passwords"][:-1], ""]},  # type: ignore
+        {**WORKSHOP, "secrets": {**WORKSHOP["secrets"], "mask": "short"}},  # type: ignore
+        {**WORKSHOP, "secrets": {**WORKSHOP["secrets"], "redirect": []}},  # type: ignore
+        {**WORKSHOP, "secrets": {**WORKSHOP["secrets"], "robots": 1}},  # type: ignore
+    ],
+)
+def test_parse_invalid_quest(data: Any) -> None:
+    with pytest.raises(ValueError):
+        parse_quest("workshop", data)
+
+
+def test_parse_quest_key() -> None:
+    # Every quest gets own key, so players can't share passwords between quests
+    workshop = parse_quest("workshop", WORKSHOP, b"key")
+    other = parse_quest("other", WORKSHOP, b"key")
+    own_key = parse_quest("workshop", {**WORKSHOP, "password_key": "own"}, b"key")
+
+    assert workshop.key not in (b"", b"key", other.key)
+    assert own_key.key == b"own"
+    assert workshop.get_password(1) == get_password(1)
+    assert workshop.get_password(1, "alice") == passwords.derive_password(
+        workshop.key, "alice", 1
+    )
+
+
+def test_quest_size() -> None:
+    # Definitions are loaded before tracing, only quests themselves are measured
+    definitions = [
+        {
+            "passwords": [
+                f"{index:08d}-password-{level:02d}" for level in range(1, 13)
+            ],
+            "secrets": {
+                "robots": f"{index:08d}-robots",
+                "mask": f"{index:08d}-mask-secret",
+                "redirect": [f"{index:08d}-hop-{hop}" for hop in range(20)],
+            },
+        }
+        for index in range(100)
+    ]
+
+    tracemalloc.start()
+
+    try:
+        before, _peak = tracemalloc.get_traced_memory()
+        quests = [
+            parse_quest(f"quest-{index}", data)
+            for index, data in enumerate(definitions)
+        ]
+        after, _peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert len(quests) == 100
+    assert (after - before) / len(quests) < 16 * 1024
+
+
+def test_default_quest(quest_client: TestClient) -> None:
+    response = quest_client.get("/level/1", headers={"X-Password": passwords.PLAIN})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"password": passwords.REVERSE}
+
+
+@pytest.mark.parametrize(
+    "url, headers",
+    [
+        ("/q/workshop/level/1", {}),
+        ("/level/1", {"Host": "workshop.quest.test"}),
+        ("/level/1", {"Host": "Workshop.Quest.Test:8000"}),
+    ],
+)
+def test_select_quest(
+    quest_client: TestClient, url: str, headers: Dict[str, str]
+) -> None:
+    response = quest_client.get(url, headers={"X-Password": get_password(1), **headers})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"password": get_password(2)}
+
+
+def test_quest_rejects_default_password(quest_client: TestClient) -> None:
+    response = quest_client.get(
+        "/q/workshop/level/1", headers={"X-Password": passwords.PLAIN}
+    )
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert response.text == "X-Password header is wrong"
+
+
+@pytest.mark.parametrize(
+    "url, headers",
+    [
+        ("/q/unknown/level/1", {}),
+        ("/q/Workshop/level/1", {}),
+        ("/q/..%2Fworkshop/level/1", {}),
+        ("/level/1", {"Host": "unknown.quest.test"}),
+    ],
+)
+def test_quest_is_not_found(
+    quest_client: TestClient, url: str, headers: Dict[str, str]
+) -> None:
+    response = quest_client.get(url, headers={"X-Password": get_password(1), **headers})
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.text == "Quest is not found"
+
+
+def test_invalid_quest(quest_client: TestClient) -> None:
+    with pytest.raises(ValueError):
+        quest_client.get("/q/broken/level/1")
+
+
+def test_quest_home_and_robots(quest_client: TestClient) -> None:
+    assert quest_client.get("/q/workshop/").text == get_password(1)
+    assert "workshop-robots" in quest_client.get("/q/workshop/robots.txt").text
+
+
+def test_quest_redirect(quest_client: TestClient) -> None:
+    response = quest_client.get(
+        "/q/workshop/level/8", headers={"X-Password": get_password(8)}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"password": get_password(9)}
+    assert len(response.history) == 3
+    assert response.url == (
+        "http://testserver/q/workshop/level/8?secret=workshop-hop-3"
+    )
+
+
+def test_quest_mask(quest_client: TestClient) -> None:
+    response = quest_client.post(
+        "/q/workshop/level/11",
+        headers={"X-Password": get_password(11)},
+        json={"secret": "workshop-mask-secret"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"password": get_password(12)}
+
+
+def test_quest_is_loaded_once(quest_app: Starlette, quest_client: TestClient) -> None:
+    store: QuestStore = quest_app.state.quests
+
+    assert store.loads == 0
+
+    for _ in range(3):
+        quest_client.get("/q/workshop/level/1", headers={"X-Password": get_password(1)})
+
+    assert store.loads == 1
+    assert 'quest_cache_requests_total{result="hit"} 2' in store.collect()
+
+
+def test_unknown_quest_is_not_cached(
+    quests_dir: Path, loop: asyncio.AbstractEventLoop
+) -> None:
+    store = QuestStore(str(quests_dir), cache_size=1)
+
+    assert loop.run_until_complete(store.get("workshop")) is not None
+    assert loop.run_until_complete(store.get("unknown")) is None
+    assert loop.run_until_complete(store.get("workshop")) is not None
+    assert store.loads == 1
+
+
+def test_missing_quest_is_cached_for_a_while(
+    quests_dir: Path, loop: asyncio.AbstractEventLoop
+) -> None:
+    now = [100.0]
+    store = QuestStore(str(quests_dir), missing_ttl=10, clock=lambda: now[0])
+
+    assert loop.run_until_complete(store.get("later")) is None
+
+    # File isn't read again, until the missing quest expires
+    (quests_dir / "later.json").write_text(json.dumps(WORKSHOP))
+    assert loop.run_until_complete(store.get("later")) is None
+    assert "quests_missing 1" in store.collect()
+
+    now[0] += 10
+    assert loop.run_until_complete(store.get("later")) is not None
+
+
+def test_invalid_quest_is_cached_for_a_while(
+    quests_dir: Path, loop: asyncio.AbstractEventLoop
+) -> None:
+    now = [100.0]
+    store = QuestStore(str(quests_dir), missing_ttl=10, clock=lambda: now[0])
+
+    for _ in range(2):
+        with pytest.raises(ValueError, match="broken"):
+            loop.run_until_complete(store.get("broken"))
+
+    assert store.loads == 1
+
+    (quests_dir / "broken.json").write_text(json.dumps(WORKSHOP))
+    now[0] += 10
+    assert loop.run_until_complete(store.get("broken")) is not None
+
+
+def test_default_quest_is_unchanged() -> None:
+    assert DEFAULT_QUEST.passwords == passwords.LEVELS
@@ -0,0 +1,143 @@
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from starlette import status
+from starlette.testclient import TestClient
+
+from http_quest import passwords, settings
+from http_quest.app import get_application
+from http_quest.ratelimit import (
+    RateLimiter,
+    get_rate_limited_response,
+    get_retry_after,
+    parse_rate_limits,
+)
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_parse_rate_limits() -> None:
+    assert parse_rate_limits("") == {}
+    assert parse_rate_limits("level:guess_number=5:20, level:mask=0.5:3") == {
+        "level:guess_number": (5.0, 20),
+        "level:mask": (0.5, 3),
+    }
+
+
+@pytest.mark.parametrize("value", ["level:mask", "level:mask=5", "level:mask=a:b"])
+def test_parse_rate_limits_invalid(value: str) -> None:
+    with pytest.raises(ValueError):
+        parse_rate_limits(value)
+
+
+def test_acquire() -> None:
+    clock = Clock()
+    limiter = RateLimiter(rate=2, burst=3, clock=clock)
+
+    assert [limiter.acquire("alice") for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire("alice") == pytest.approx(0.5)
+    assert limiter.acquire("bob") == 0
+
+    clock.now += 0.5
+
+    assert limiter.acquire("alice") == 0
+    assert limiter.acquire("alice") == pytest.approx(0.5)
+
+
+def test_acquire_many_tokens() -> None:
+    clock = Clock()
+    limiter = RateLimiter(rate=2, burst=3, clock=clock)
+
+    # Request for more tokens than there are takes nothing
+    assert limiter.acquire("alice", 4) == pytest.approx(0.5)
+    assert limiter.acquire("alice", 2) == 0
+    assert limiter.acquire("alice", 2) == pytest.approx(0.5)
+    assert limiter.acquire("alice") == 0
+
+
+def test_acquire_keeps_memory_bounded() -> None:
+    clock = Clock()
+    limiter = RateLimiter(rate=1, burst=1, shards=4, max_keys=40, clock=clock)
+
+    for index in range(10000):
+        limiter.acquire(f"client-{index}")
+        clock.now += 0.001
+
+    assert len(limiter) <= 40
+
+
+def test_acquire_drops_refilled_buckets_first() -> None:
+    clock = Clock()
+    limiter = RateLimiter(rate=1, burst=1, shards=1, max_keys=2, clock=clock)
+
+    limiter.acquire("alice")
+    clock.now += 2
+    limiter.acquire("bob")
+    limiter.acquire("carol")
+
+    assert list(limiter.shards[0]) == ["bob", "carol"]
+    assert limiter.acquire("bob") > 0
+
+
+def test_get_retry_after() -> None:
+    assert get_retry_after(0.01) == 1
+    assert get_retry_after(1.5) == 2
+
+
+def test_get_rate_limited_response() -> None:
+    response = get_rate_limited_response(3)
+
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert (b"retry-after", b"3") in response.raw_headers
+    assert get_rate_limited_response(3) is response
+
+
+@pytest.mark.parametrize("key", ["ip", "client"])
+def test_levels_are_rate_limited(monkeypatch: MonkeyPatch, key: str) -> None:
+    monkeypatch.setattr(settings, "RATE_LIMITS", "level:guess_number=0.1:2")
+    monkeypatch.setattr(settings, "RATE_LIMIT_KEY", key)
+    client = TestClient(get_application())
+
+    def guess(player: str) -> int:
+        response = client.post(
+            "/level/10",
+            headers={"X-Password": passwords.GUESS_NUMBER, "X-Player-Token": player},
+            json={"number": 1},
+        )
+        if response.status_code == status.HTTP_429_TOO_MANY_REQUESTS:
+            assert response.headers["Retry-After"] == "10"
+        return response.status_code
+
+    assert [guess("alice") for _ in range(3)] == [403, 403, 429]
+    assert guess("bob") == (429 if key == "ip" else 403)
+
+
+def test_mask_batch_takes_token_per_secret(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "RATE_LIMITS", "level:mask=0.1:5")
+    client = TestClient(get_application())
+
+    def check(secrets: int) -> int:
+        response = client.post(
+            "/level/11",
+            headers={"X-Password": passwords.MASK},
+            json={"secrets": ["x" * len(passwords.FINISH)] * secrets},
+        )
+        return response.status_code
+
+    assert [check(3), check(3), check(1), check(1)] == [200, 429, 200, 429]
+
+
+def test_levels_are_not_limited_by_default(client: TestClient) -> None:
+    for _ in range(50):
+        response = client.post(
+            "/level/10",
+            headers={"X-Password": passwords.GUESS_NUMBER},
+            json={"number": 1},
+        )
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
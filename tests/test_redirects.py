@@ -0,0 +1,98 @@
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from starlette import status
+from starlette.applications import Starlette
+from starlette.testclient import TestClient
+
+from http_quest import passwords, secrets
+from http_quest.quests import DEFAULT_QUEST
+from http_quest.redirects import RedirectChain, SignedRedirectChain, StaticRedirectChain
+
+
+def test_static_redirect_chain() -> None:
+    chain = StaticRedirectChain(secrets.REDIRECT)
+
+    assert chain.first == secrets.REDIRECT[0]
+    assert chain.get_next_secret(secrets.REDIRECT[0]) == secrets.REDIRECT[1]
+    assert chain.get_next_secret(secrets.REDIRECT[-1]) is None
+
+    with pytest.raises(KeyError):
+        chain.get_next_secret("qwerty")
+
+
+def test_signed_redirect_chain() -> None:
+    chain = SignedRedirectChain(b"key", 1000)
+    secret = chain.first
+    hops = 1
+
+    while True:
+        next_secret = chain.get_next_secret(secret)
+        if next_secret is None:
+            break
+        secret = next_secret
+        hops += 1
+
+    assert hops == 1000
+    assert chain.first == SignedRedirectChain(b"key", 5).first
+    assert chain.first != SignedRedirectChain(b"other", 1000).first
+
+
+@pytest.mark.parametrize(
+    "secret", ["", "qwerty", "0000000000", "00000000001", "0", "１", "+1"]
+)
+def test_signed_redirect_chain_secret_is_wrong(secret: str) -> None:
+    chain = SignedRedirectChain(b"key", 10)
+
+    with pytest.raises(KeyError):
+        chain.get_next_secret(secret)
+
+
+def test_signed_redirect_chain_out_of_range() -> None:
+    chain = SignedRedirectChain(b"key", 10)
+
+    with pytest.raises(KeyError):
+        chain.get_next_secret(SignedRedirectChain(b"key", 20).get_secret(10))
+
+
+def test_signed_redirect_chain_is_empty() -> None:
+    with pytest.raises(ValueError):
+        SignedRedirectChain(b"key", 0)
+
+
+def test_redirect_signed_chain(
+    client: TestClient, app: Starlette, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setattr(
+        DEFAULT_QUEST, "redirect_chain", SignedRedirectChain(b"key", 25)
+    )
+
+    response = client.get(
+        app.url_path_for("level:redirect"), headers={"X-Password": passwords.REDIRECT}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"password": passwords.ROBOTS}
+    assert len(response.history) == 25
+
+
+def test_redirect_location_depends_on_host(client: TestClient, app: Starlette) -> None:
+    url = app.url_path_for("level:redirect")
+    locations = [
+        client.get(
+            url,
+            headers={"X-Password": passwords.REDIRECT, "Host": host},
+            allow_redirects=False,
+        ).headers["location"]
+        for host in ["example.com", "example.org", "example.com"]
+    ]
+
+    assert locations == [
+        f"http://example.com{url}?secret={secrets.REDIRECT[0]}",
+        f"http://example.org{url}?secret={secrets.REDIRECT[0]}",
+        f"http://example.com{url}?secret={secrets.REDIRECT[0]}",
+    ]
+
+
+def test_redirect_chain_is_abstract() -> None:
+    with pytest.raises(TypeError):
+        RedirectChain()  # type: ignore
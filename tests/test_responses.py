@@ -0,0 +1,40 @@
+from typing import List
+
+from starlette.types import Message
+
+from http_quest.responses import CachedResponse, PasswordResponse
+
+
+async def receive() -> Message:
+    return {"type": "http.request"}
+
+
+def test_cached_response_is_same_as_rendered() -> None:
+    response = PasswordResponse("foo", headers={"X-Real-Password": "bar"})
+    cached_response = CachedResponse(response)
+
+    assert cached_response.status_code == response.status_code
+    assert cached_response.body == b'{"password":"foo"}'
+    assert cached_response.raw_headers == response.raw_headers
+
+
+def test_cached_response_headers_are_not_shared() -> None:
+    cached_response = CachedResponse(PasswordResponse("foo"))
+    messages: List[Message] = []
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+
+    for _ in range(2):
+        coroutine = cached_response({}, receive, send)
+        try:
+            coroutine.send(None)
+        except StopIteration:
+            pass
+
+    start_message = messages[0]
+    start_message["headers"].append((b"x-foo", b"bar"))
+
+    assert (b"x-foo", b"bar") not in cached_response.raw_headers
+    assert (b"x-foo", b"bar") not in messages[2]["headers"]
+    assert messages[1] == {"type": "http.response.body", "body": b'{"password":"foo"}'}
@@ -0,0 +1,91 @@
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from starlette import status
+from starlette.applications import Starlette
+from starlette.testclient import TestClient
+
+from http_quest import passwords, settings
+from http_quest.app import get_application
+from http_quest.routing import DispatchMount
+
+from .conftest import Level
+
+
+@pytest.fixture
+def fast_app(monkeypatch: MonkeyPatch) -> Starlette:
+    monkeypatch.setattr(settings, "FAST_ROUTER", True)
+
+    return get_application()
+
+
+@pytest.fixture
+def fast_client(fast_app: Starlette) -> TestClient:
+    return TestClient(fast_app)
+
+
+def test_dispatch_mount_is_used(fast_app: Starlette) -> None:
+    assert any(isinstance(route, DispatchMount) for route in fast_app.routes)
+
+
+def test_url_path_for(level: Level, app: Starlette, fast_app: Starlette) -> None:
+    route_name = level.get_route_name()
+
+    assert fast_app.url_path_for(route_name) == app.url_path_for(route_name)
+
+
+def test_require_password(
+    level: Level, fast_app: Starlette, fast_client: TestClient
+) -> None:
+    url = fast_app.url_path_for(level.get_route_name())
+    response = fast_client.request(level.method, url)
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert response.text == "X-Password header is required"
+
+
+def test_plain(fast_app: Starlette, fast_client: TestClient) -> None:
+    response = fast_client.get(
+        fast_app.url_path_for("level:plain"), headers={"X-Password": passwords.PLAIN}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"password": passwords.REVERSE}
+
+
+def test_redirect(fast_app: Starlette, fast_client: TestClient) -> None:
+    response = fast_client.get(
+        fast_app.url_path_for("level:redirect"),
+        headers={"X-Password": passwords.REDIRECT},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"password": passwords.ROBOTS}
+    assert len(response.history) == 20
+
+
+def test_method_not_allowed(fast_app: Starlette, fast_client: TestClient) -> None:
+    response = fast_client.get(
+        fast_app.url_path_for("level:delete"), headers={"X-Password": passwords.DELETE}
+    )
+
+    assert response.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
+    assert response.text == "Method Not Allowed"
+
+
+@pytest.mark.parametrize("path", ["/level/13", "/level/", "/levels/1"])
+def test_not_found(path: str, fast_client: TestClient) -> None:
+    response = fast_client.get(path)
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.text == "Not Found"
+
+
+def test_trailing_slash_redirect(fast_client: TestClient) -> None:
+    response = fast_client.get(
+        "/level/1/?foo=bar",
+        headers={"X-Password": passwords.PLAIN},
+        allow_redirects=False,
+    )
+
+    assert response.status_code == status.HTTP_307_TEMPORARY_REDIRECT
+    assert response.headers["location"] == "http://testserver/level/1?foo=bar"
@@ -0,0 +1,165 @@
+import asyncio
+import os
+import signal
+from pathlib import Path
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from gunicorn.config import Config
+from starlette.applications import Starlette
+from uvicorn.config import Config as UvicornConfig
+
+from http_quest.health import Drainer
+from http_quest.server import (
+    RSS_CHECK_TICKS,
+    DrainingServer,
+    Server,
+    get_cpu_quota,
+    get_options,
+    get_workers_count,
+)
+
+
+def write_cgroup_v1(root: Path, quota: int, period: int = 100000) -> None:
+    (root / "cpu").mkdir()
+    (root / "cpu" / "cpu.cfs_quota_us").write_text(f"{quota}\n")
+    (root / "cpu" / "cpu.cfs_period_us").write_text(f"{period}\n")
+
+
+@pytest.mark.parametrize(
+    "content, quota", [("max 100000\n", None), ("250000 100000\n", 2.5)]
+)
+def test_get_cpu_quota_cgroup_v2(tmp_path: Path, content: str, quota: float) -> None:
+    (tmp_path / "cpu.max").write_text(content)
+
+    assert get_cpu_quota(tmp_path) == quota
+
+
+@pytest.mark.parametrize("value, quota", [(-1, None), (50000, 0.5), (300000, 3.0)])
+def test_get_cpu_quota_cgroup_v1(tmp_path: Path, value: int, quota: float) -> None:
+    write_cgroup_v1(tmp_path, value)
+
+    assert get_cpu_quota(tmp_path) == quota
+
+
+def test_get_cpu_quota_without_cgroup(tmp_path: Path) -> None:
+    assert get_cpu_quota(tmp_path) is None
+
+
+@pytest.mark.parametrize("cpus, quota, workers", [(8, 2.5, 2), (8, 0.5, 1), (2, 4, 2)])
+def test_get_workers_count(
+    monkeypatch: MonkeyPatch, tmp_path: Path, cpus: int, quota: float, workers: int,
+) -> None:
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: set(range(cpus)))
+    write_cgroup_v1(tmp_path, int(quota * 100000))
+
+    assert get_workers_count(tmp_path) == workers
+
+
+def test_get_workers_count_without_quota(
+    monkeypatch: MonkeyPatch, tmp_path: Path
+) -> None:
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: {0, 1, 2})
+
+    assert get_workers_count(tmp_path) == 3
+
+
+def test_server_config() -> None:
+    options = get_options("127.0.0.1:9000", 3, 10, 512, 1000, 100)
+    config: Config = Server(options).cfg
+
+    assert config.bind == ["127.0.0.1:9000"]
+    assert config.workers == 3
+    assert config.preload_app is True
+    assert config.keepalive == 10
+    assert config.backlog == 512
+    assert config.max_requests == 1000
+    assert config.max_requests_jitter == 100
+    assert config.worker_class_str == "http_quest.server.Worker"
+    assert config.forwarded_allow_ips == ["*"]
+
+
+def test_server_config_forwarded_allow_ips() -> None:
+    options = get_options(
+        "127.0.0.1:9000", 1, 5, 2048, 0, 0, forwarded_allow_ips="10.0.0.1,10.0.0.2"
+    )
+
+    assert Server(options).cfg.forwarded_allow_ips == ["10.0.0.1", "10.0.0.2"]
+
+
+def test_server_loads_application() -> None:
+    from http_quest.asgi import application
+
+    options = get_options("127.0.0.1:9000", 1, 5, 2048, 0, 0)
+
+    assert Server(options).load() is application
+
+
+def test_get_options_detects_workers() -> None:
+    assert get_options("127.0.0.1:9000", 0, 5, 2048, 0, 0)["workers"] >= 1
+
+
+def get_draining_server(drainer: Drainer) -> DrainingServer:
+    return DrainingServer(UvicornConfig(app=None, loop="asyncio"), drainer)
+
+
+def test_draining_server_waits_for_requests(loop: asyncio.AbstractEventLoop) -> None:
+    drainer = Drainer(timeout=1.0, poll_interval=0.001)
+    server = get_draining_server(drainer)
+    drainer.in_flight = 1
+
+    async def stop() -> None:
+        server.handle_exit(signal.SIGTERM, None)
+        await asyncio.sleep(0.01)
+
+        assert drainer.draining
+        assert not server.should_exit
+
+        drainer.in_flight = 0
+        await asyncio.sleep(0.01)
+
+    loop.run_until_complete(stop())
+
+    assert server.should_exit
+    assert not server.force_exit
+
+
+def test_draining_server_deadline(loop: asyncio.AbstractEventLoop) -> None:
+    drainer = Drainer(timeout=0.01, poll_interval=0.001)
+    server = get_draining_server(drainer)
+    drainer.in_flight = 1
+
+    async def stop() -> None:
+        server.handle_exit(signal.SIGTERM, None)
+        await asyncio.sleep(0.05)
+
+    loop.run_until_complete(stop())
+
+    assert server.should_exit
+    assert server.force_exit
+
+
+def test_draining_server_second_signal() -> None:
+    drainer = Drainer()
+    drainer.drain()
+    server = get_draining_server(drainer)
+
+    server.handle_exit(signal.SIGTERM, None)
+
+    assert server.should_exit
+
+
+@pytest.mark.parametrize(
+    "max_rss, should_exit", [(0, False), (1, True), (2 ** 50, False)]
+)
+def test_draining_server_recycles_on_rss(
+    loop: asyncio.AbstractEventLoop, max_rss: int, should_exit: bool
+) -> None:
+    config = UvicornConfig(app=Starlette(), loop="asyncio", lifespan="off")
+    config.load()
+    server = DrainingServer(config, None, max_rss)
+
+    assert loop.run_until_complete(server.on_tick(RSS_CHECK_TICKS)) is should_exit
+    # Memory is checked only every few seconds and not right after start
+    assert loop.run_until_complete(server.on_tick(1)) is False
+    assert loop.run_until_complete(server.on_tick(0)) is False
@@ -0,0 +1,123 @@
+import asyncio
+import os
+import time
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from starlette import status
+from starlette.testclient import TestClient
+
+from http_quest import passwords, settings
+from http_quest.app import get_application
+from http_quest.shedding import LoadShedder
+
+
+def test_get_pressure() -> None:
+    shedder = LoadShedder(max_lag=0.5, max_in_flight=10)
+
+    assert shedder.get_pressure() == 0
+
+    shedder.lag = 0.25
+    shedder.in_flight = 2
+
+    assert shedder.get_pressure() == 0.5
+
+    shedder.in_flight = 15
+
+    assert shedder.get_pressure() == 1.5
+
+
+def test_disabled_thresholds() -> None:
+    shedder = LoadShedder(max_lag=0, max_in_flight=0)
+    shedder.lag = 10
+    shedder.in_flight = 1000
+
+    assert shedder.get_pressure() == 0
+    assert not shedder.should_shed("/level/1")
+
+
+@pytest.mark.parametrize(
+    "lag, normal, priority",
+    [(0.4, False, False), (0.6, True, False), (1.1, True, True)],
+)
+def test_priority_paths_are_shed_last(lag: float, normal: bool, priority: bool) -> None:
+    shedder = LoadShedder(max_lag=0.5, priority_paths=["/level/12"])
+    shedder.lag = lag
+
+    assert shedder.should_shed("/level/1") is normal
+    assert shedder.should_shed("/level/12") is priority
+    assert shedder.shed == {"normal": int(normal), "priority": int(priority)}
+
+
+def test_priority_paths_of_quests() -> None:
+    shedder = LoadShedder(
+        max_lag=0.5, priority_paths=["/level/12"], quest_path_prefix="/q"
+    )
+    shedder.lag = 0.6
+
+    assert shedder.should_shed("/q/workshop/level/12") is False
+    assert shedder.should_shed("/level/12") is False
+    assert shedder.should_shed("/q/workshop/level/1") is True
+    assert shedder.should_shed("/quiz/level/12") is True
+
+
+def test_observe_lag_is_smoothed() -> None:
+    shedder = LoadShedder()
+
+    shedder.observe_lag(1.0)
+
+    assert shedder.lag == 0.5
+
+    shedder.observe_lag(0.0)
+
+    assert shedder.lag == 0.25
+
+
+def test_measure_lag(loop: asyncio.AbstractEventLoop) -> None:
+    shedder = LoadShedder(interval=0.01)
+
+    async def block_loop() -> None:
+        await shedder.start()
+        await asyncio.sleep(0)
+        # Blocking call keeps lag task from waking up in time
+        time.sleep(0.1)
+        await asyncio.sleep(0.02)
+        await shedder.stop()
+
+    loop.run_until_complete(block_loop())
+
+    assert shedder.lag >= 0.02
+
+
+def test_collect() -> None:
+    shedder = LoadShedder()
+    shedder.in_flight = 3
+    lines = shedder.collect()
+
+    assert "http_requests_in_flight 3" in lines
+    assert 'http_requests_shed_total{priority="normal"} 0' in lines
+
+
+def test_overloaded_application(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "SHEDDING_ENABLED", True)
+    app = get_application()
+    client = TestClient(app)
+    app.state.shedder.lag = 0.75
+
+    response = client.get("/level/1", headers={"X-Password": passwords.PLAIN})
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["retry-after"] == "1"
+
+    response = client.get("/level/12", headers={"X-Password": passwords.FINISH})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert app.state.shedder.in_flight == 0
+
+    response = client.get("/metrics")
+
+    assert (
+        f'http_requests_shed_total{{pid="{os.getpid()}",priority="normal"}} 1'
+        in response.text
+    )
+    assert 'http_requests_total{route="unmatched",status="503"} 1' in response.text
@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+from typing import Dict
+
+# Cold import of the application takes about 120ms on a developer machine,
+# budget leaves headroom for slow CI runners. Update it only on purpose.
+IMPORT_TIME_BUDGET_MS = 250
+
+# Heavy modules, which are imported on first use instead of startup
+LAZY_MODULES = ("marshmallow", "sqlite3", "urllib.request")
+
+
+def get_import_times() -> Dict[str, int]:
+    """Return cumulative import time of every module in microseconds."""
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import http_quest.asgi"],
+        env={**os.environ, "BUGSNAG_API_KEY": "secret"},
+        stderr=subprocess.PIPE,
+        check=True,
+        universal_newlines=True,
+    )
+    times = {}
+
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _self, cumulative, module = line[len("import time:") :].split("|")
+        times[module.strip()] = int(cumulative)
+
+    return times
+
+
+def test_import_time_budget() -> None:
+    # The best of several runs is the least affected by noise
+    import_time = min(get_import_times()["http_quest.asgi"] for _ in range(3))
+
+    assert import_time / 1000 <= IMPORT_TIME_BUDGET_MS
+
+
+def test_heavy_modules_are_lazy() -> None:
+    times = get_import_times()
+
+    assert [module for module in LAZY_MODULES if module in times] == []
@@ -1,6 +1,14 @@
 import pytest
 
-from http_quest.utils import base64_decode, base64_encode, get_masked_password
+from http_quest.utils import (
+    LRUCache,
+    PasswordMask,
+    base64_decode,
+    base64_encode,
+    get_masked_password,
+    get_masked_passwords,
+    parse_sample_rates,
+)
 
 
 def test_base64_encode() -> None:
@@ -42,3 +50,53 @@ def test_get_masked_password() -> None:
     assert get_masked_password("mark", "alex", "bill") == "****"
     assert get_masked_password("mark", "alex", "billy") == "****"
     assert get_masked_password("mark", "alex", "jon") == "****"
+
+
+def test_lru_cache() -> None:
+    cache: LRUCache[str, int] = LRUCache(maxsize=2)
+    cache.set("foo", 1)
+    cache.set("bar", 2)
+
+    assert cache.get("foo") == 1
+
+    cache.set("baz", 3)
+
+    assert cache.get("bar") is None
+    assert cache.get("foo") == 1
+    assert cache.get("baz") == 3
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_get_masked_passwords() -> None:
+    assert get_masked_passwords("mark", "alex", ["alex", "alem", "olix", "jon"]) == [
+        "mark",
+        "mar*",
+        "*a*k",
+        "****",
+    ]
+    assert get_masked_passwords("mark", "alex", []) == []
+
+
+def test_get_masked_passwords_password_is_bigger_than_secret() -> None:
+    with pytest.raises(ValueError) as excinfo:
+        get_masked_passwords("mark", "jon", ["jon"])
+
+    assert str(excinfo.value) == "Password and secret should be the same length"
+
+
+def test_password_mask_non_ascii() -> None:
+    assert PasswordMask("пароль", "secret").apply("sxxxxt") == "п****ь"
+    assert PasswordMask("mark", "alex").apply("alеx") == "ma*k"
+    assert PasswordMask("mark", "алex").apply("алexx") == "mark"
+
+
+def test_parse_sample_rates() -> None:
+    assert parse_sample_rates("") == {}
+    assert parse_sample_rates("KeyError=0.5, ValueError=0") == {
+        "KeyError": 0.5,
+        "ValueError": 0.0,
+    }
+
+    with pytest.raises(ValueError):
+        parse_sample_rates("KeyError")
@@ -0,0 +1,108 @@
+from typing import Any, Type
+
+import pytest
+from marshmallow import (
+    EXCLUDE,
+    Schema,
+    ValidationError,
+    fields,
+    validate,
+    validates_schema,
+)
+
+from http_quest import schemas, settings
+from http_quest.schemas import Level8Schema, SecretSchema
+from http_quest.validators import compile_schema
+
+
+class OptionalSchema(Schema):
+    name = fields.String(missing="anonymous")
+    age = fields.Integer(allow_none=True, data_key="years")
+    email = fields.Email()
+    tags = fields.List(fields.String(), validate=validate.Length(max=2))
+    level = fields.Integer(strict=True)
+
+
+class ExcludeSchema(Schema):
+    class Meta:
+        unknown = EXCLUDE
+
+    secret = fields.String(required=True)
+
+
+class HookSchema(Schema):
+    secret = fields.String(required=True)
+
+    @validates_schema
+    def validate_secret(self, data: Any, **kwargs: Any) -> None:
+        if data["secret"] == "foo":
+            raise ValidationError("Secret can't be foo.", "secret")
+
+
+BODIES = [
+    {},
+    [],
+    "",
+    None,
+    1,
+    {"secret": "foo"},
+    {"secret": ""},
+    {"secret": None},
+    {"secret": 1},
+    {"secret": ["foo"]},
+    {"secret": {"foo": "bar"}},
+    {"secret": "foo", "bar": 1},
+    {"bar": 1, "baz": 2},
+    {"number": 372},
+    {"number": "372"},
+    {"number": " 372 "},
+    {"number": 1.5},
+    {"number": 1e300},
+    {"number": True},
+    {"number": None},
+    {"number": 0},
+    {"number": 1000},
+    {"number": 1001},
+    {"number": "foobar"},
+    {"number": [1]},
+    {"name": "mark", "years": "42", "level": 1, "tags": ["a", "b"]},
+    {"years": None, "level": "1", "email": "foo", "tags": ["a", "b", "c"]},
+    {"age": 1, "tags": [1], "email": "me@2tunnels.com"},
+    {"secrets": []},
+    {"secrets": ["foo", "bar"]},
+    {"secrets": ["foo", 1]},
+    {"secrets": "foo"},
+    {"secrets": ["foo"] * (settings.MASK_BATCH_SIZE + 1)},
+]
+# Compiled validators use private parts of marshmallow, so every application
+# schema is compared with marshmallow itself
+APPLICATION_SCHEMAS = [
+    value
+    for value in vars(schemas).values()
+    if isinstance(value, type) and issubclass(value, Schema) and value is not Schema
+]
+
+
+def load(schema_class: Type[Schema], body: Any) -> Any:
+    try:
+        return schema_class().load(body), {}
+    except ValidationError as exc:
+        return {}, exc.messages
+
+
+@pytest.mark.parametrize(
+    "schema_class", [*APPLICATION_SCHEMAS, OptionalSchema, ExcludeSchema, HookSchema],
+)
+@pytest.mark.parametrize("body", BODIES)
+def test_compile_schema(schema_class: Type[Schema], body: Any) -> None:
+    expected_data, expected_errors = load(schema_class, body)
+    data, errors = compile_schema(schema_class)(body)
+
+    assert errors == expected_errors
+
+    if not expected_errors:
+        assert data == expected_data
+
+
+def test_application_schemas() -> None:
+    assert {Level8Schema, SecretSchema} < set(APPLICATION_SCHEMAS)